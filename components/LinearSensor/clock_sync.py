@@ -0,0 +1,161 @@
+"""
+Online host/bridge clock alignment.
+
+The bridge answers 'T' with its micros() counter in hex. Timing that
+exchange on the host gives an NTP-style estimate: the device read its
+clock somewhere between the host's send and receive, best guessed as the
+midpoint, with an uncertainty of half the round trip. Exchanges that
+were slowed by USB scheduling or a busy host are noise, so exchanges are
+grouped into buckets (at least `filter_size` of them spanning at least
+`bucket_span` seconds), only the minimum-delay one of each bucket is
+kept, and a least-squares line through the kept points gives the offset
+and the drift between the two clocks.
+
+In streaming mode the bridge cannot be polled, but every frame carries
+its device timestamp. Arrival time minus the one-way latency learnt from
+the round trips gives the same kind of point, filtered the same way.
+
+With a fit in place, device timestamps map straight to host time.
+Polled samples carry no device timestamp, so their acquisition time is
+estimated as request time plus the one-way latency.
+"""
+
+from collections import deque
+from typing import Optional
+
+_US_WRAP = 1 << 32
+
+
+class ClockSync:
+    def __init__(self, filter_size: int = 8, bucket_span: float = 0.25, window: int = 64,
+                 min_drift_span: float = 2.0):
+        """
+        filter_size    : minimum exchanges per min-delay bucket
+        bucket_span    : minimum seconds of device time per bucket
+        window         : filtered points kept for the drift fit
+        min_drift_span : seconds of device time the points must span before drift is fitted
+        """
+        self.filter_size = filter_size
+        self.bucket_span = bucket_span
+        self.min_drift_span = min_drift_span
+        self._points = deque(maxlen=window)     # (device_s, host_s)
+        self._bucket = []                       # (delay, device_s, host_s)
+        self._bucket_kind = None
+        self._rtts = deque(maxlen=window)       # min RTT of each bucket of round trips
+
+        self._last_us = None                    # last unwrapped device reading, microseconds
+
+        self.exchanges = 0
+        self.skew = 1.0                         # host seconds per device second
+        self._device_ref = None
+        self._host_ref = None
+
+    # ── Device clock ──────────────────────────────────────────────────────────
+    def _nearest_us(self, device_us32: int) -> int:
+        """The unwrapped reading closest to the last one; does not advance the unwrap state."""
+        device_us32 &= _US_WRAP - 1
+        if self._last_us is None:
+            return device_us32
+        us = self._last_us - (self._last_us & (_US_WRAP - 1)) + device_us32
+        if us - self._last_us > _US_WRAP // 2:
+            us -= _US_WRAP
+        elif self._last_us - us > _US_WRAP // 2:
+            us += _US_WRAP
+        return us
+
+    def unwrap(self, device_us32: int) -> float:
+        """Device micros() (uint32, wraps every ~71.6 min) to monotonic device seconds."""
+        self._last_us = self._nearest_us(device_us32)
+        return self._last_us / 1e6
+
+    # ── Measurements ──────────────────────────────────────────────────────────
+    def add_round_trip(self, t_send: float, device_us32: int, t_recv: float):
+        """One timed 'T' exchange, host times from time.time()."""
+        rtt = t_recv - t_send
+        if rtt < 0:
+            return
+        self._add("rtt", rtt, self.unwrap(device_us32), (t_send + t_recv) / 2)
+
+    def add_arrival(self, device_us32: int, t_arrival: float):
+        """A streamed frame's device timestamp and the host time it was read."""
+        device_s = self.unwrap(device_us32)
+        host_s = t_arrival - (self.one_way_latency or 0.0)
+        # Offset is near constant within a bucket, so the smallest
+        # (arrival - device) is the least delayed frame
+        self._add("arrival", t_arrival - device_s, device_s, host_s)
+
+    def _add(self, kind, delay, device_s, host_s):
+        if kind != self._bucket_kind:
+            self._flush()
+            self._bucket_kind = kind
+        self._bucket.append((delay, device_s, host_s))
+        self.exchanges += 1
+        if len(self._bucket) >= self.filter_size and device_s - self._bucket[0][1] >= self.bucket_span:
+            self._flush()
+        self._fit()
+
+    def _flush(self):
+        if not self._bucket:
+            return
+        best = min(self._bucket)
+        if self._bucket_kind == "rtt":
+            self._rtts.append(best[0])
+        self._points.append(best[1:])
+        self._bucket = []
+
+    def _fit(self):
+        points = list(self._points)
+        if self._bucket:
+            points.append(min(self._bucket)[1:])    # provisional until the bucket fills
+        n = len(points)
+        device_mean = sum(d for d, _ in points) / n
+        host_mean = sum(h for _, h in points) / n
+
+        skew = 1.0
+        if n >= 3 and points[-1][0] - points[0][0] >= self.min_drift_span:
+            sxx = sum((d - device_mean) ** 2 for d, _ in points)
+            sxy = sum((d - device_mean) * (h - host_mean) for d, h in points)
+            # Crystal drift is tens of ppm; anything wildly off is a bad fit, not a clock
+            if sxx > 0 and abs(sxy / sxx - 1.0) < 0.01:
+                skew = sxy / sxx
+
+        self.skew = skew
+        self._device_ref = device_mean
+        self._host_ref = host_mean
+
+    # ── Estimates ─────────────────────────────────────────────────────────────
+    @property
+    def synced(self) -> bool:
+        return self._host_ref is not None
+
+    @property
+    def min_rtt(self) -> Optional[float]:
+        rtts = list(self._rtts)
+        if self._bucket and self._bucket_kind == "rtt":
+            rtts.append(min(self._bucket)[0])
+        return min(rtts) if rtts else None
+
+    @property
+    def one_way_latency(self) -> Optional[float]:
+        """Host->device transport latency, assuming a symmetric link."""
+        rtt = self.min_rtt
+        return rtt / 2 if rtt is not None else None
+
+    @property
+    def drift_ppm(self) -> float:
+        """Device clock rate error against the host; positive means the bridge runs fast."""
+        return (1.0 / self.skew - 1.0) * 1e6
+
+    def to_host(self, device_us32: int) -> Optional[float]:
+        """
+        Host time.time() at which the device read `device_us32` on its clock.
+        Stateless: the reading is unwrapped next to the last measurement, so
+        frames of a batch can be mapped after its newest one was measured.
+        """
+        if not self.synced:
+            return None
+        return self._host_ref + self.skew * (self._nearest_us(device_us32) / 1e6 - self._device_ref)
+
+    def acquisition_time(self, t_send: float) -> float:
+        """Best estimate of when a polled request sent at `t_send` was sampled by the bridge."""
+        return t_send + (self.one_way_latency or 0.0)
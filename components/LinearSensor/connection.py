@@ -0,0 +1,174 @@
+"""
+Self-healing serial connection to the sensor bridge.
+
+Wraps a pyserial port and reopens it after USB glitches without ever
+blocking the caller: while the device is gone, exchange() returns None
+immediately and a reopen is attempted at most once per backoff interval
+(doubling up to max_backoff). If a USB VID/PID is configured the device
+is looked up by ID on every reopen, so it is found again even when it
+re-enumerates as a different /dev/ttyACM* node.
+"""
+
+import time
+from typing import Optional
+
+import serial
+from serial.tools import list_ports
+
+# Consecutive empty reads before a silent port is treated as gone. A re-enumerated
+# device can leave the old handle open but permanently silent.
+MAX_SILENT_READS = 5
+
+
+def find_port(vid: int, pid: int, serial_number: Optional[str] = None) -> Optional[str]:
+    """Return the device path of the first port matching USB VID/PID (and serial number, if given)."""
+    for info in list_ports.comports():
+        if info.vid != vid or info.pid != pid:
+            continue
+        if serial_number is not None and info.serial_number != serial_number:
+            continue
+        return info.device
+    return None
+
+
+class SerialConnection:
+    def __init__(
+        self,
+        port: Optional[str] = None,
+        baudrate: int = 115200,
+        timeout: float = 1,
+        vid: Optional[int] = None,
+        pid: Optional[int] = None,
+        serial_number: Optional[str] = None,
+        initial_backoff: float = 0.05,
+        max_backoff: float = 2.0,
+    ):
+        if port is None and (vid is None or pid is None):
+            raise ValueError("Either a port or a USB vid/pid pair is required")
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.vid = vid
+        self.pid = pid
+        self.serial_number = serial_number
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self.ser = None
+        self.device = None              # path actually opened
+        self.disconnects = 0
+        self.reconnects = 0
+        self.down_since = None          # time.time() the link was lost, None while up
+        self.last_outage = 0.0          # duration of the most recent outage in seconds
+
+        self._backoff = initial_backoff
+        self._next_attempt = 0.0
+        self._silent_reads = 0
+        self._wanted = False            # open() requested and not yet disconnect()ed
+        self._ever_connected = False
+
+    @property
+    def connected(self) -> bool:
+        return self.ser is not None and self.ser.is_open
+
+    def seconds_until_retry(self) -> float:
+        """
+        How long exchange() will keep returning None without touching the
+        port: 0 while connected or when a reopen is due, max_backoff after
+        disconnect().
+        """
+        if self.connected:
+            return 0.0
+        if not self._wanted:
+            return self.max_backoff
+        return max(0.0, self._next_attempt - time.monotonic())
+
+    def resolve_port(self) -> Optional[str]:
+        if self.vid is not None and self.pid is not None:
+            found = find_port(self.vid, self.pid, self.serial_number)
+            if found is not None:
+                return found
+        return self.port
+
+    def open(self) -> bool:
+        """(Re)open the port, closing any previous handle first."""
+        self._wanted = True
+        self.close()
+        device = self.resolve_port()
+        if device is None:
+            self._schedule_retry()
+            return False
+        try:
+            self.ser = serial.Serial(device, self.baudrate, timeout=self.timeout)
+        except (serial.SerialException, OSError) as e:
+            self.ser = None
+            if self.down_since is None:
+                print(f"Connection failed: {e}")
+                if self._ever_connected:
+                    self.down_since = time.time()
+            self._schedule_retry()
+            return False
+
+        self.device = device
+        self._silent_reads = 0
+        self._backoff = self.initial_backoff
+        if self.down_since is not None:
+            self.last_outage = time.time() - self.down_since
+            self.down_since = None
+            self.reconnects += 1
+            print(f"Reconnected to {device} after {self.last_outage:.3f}s")
+        else:
+            print(f"Connected to {device} at {self.baudrate} baud")
+        self._ever_connected = True
+        return True
+
+    def disconnect(self):
+        """Close the port and stop reconnecting until open() is called again."""
+        self._wanted = False
+        self.close()
+
+    def close(self):
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except (serial.SerialException, OSError):
+                pass
+        self.ser = None
+
+    def exchange(self, payload: bytes) -> Optional[bytes]:
+        """
+        Write a request and read one response line.
+        Returns None without blocking while the device is unavailable.
+        """
+        if not self.connected:
+            if not self._wanted or time.monotonic() < self._next_attempt:
+                return None
+            if not self.open():
+                return None
+
+        try:
+            self.ser.write(payload)
+            response = self.ser.readline()
+        except (serial.SerialException, OSError) as e:
+            self._mark_down(f"Serial link lost: {e}")
+            return None
+
+        if response:
+            self._silent_reads = 0
+        else:
+            self._silent_reads += 1
+            if self._silent_reads >= MAX_SILENT_READS:
+                self._mark_down(f"No response after {self._silent_reads} reads")
+        return response
+
+    def _mark_down(self, reason: str):
+        if self.down_since is None:
+            self.down_since = time.time()
+            self.disconnects += 1
+            print(f"{reason}; reconnecting to {self.device or self.port} in the background")
+        self.close()
+        self._next_attempt = 0.0    # first reopen is tried on the very next exchange
+
+    def _schedule_retry(self):
+        self._next_attempt = time.monotonic() + self._backoff
+        self._backoff = min(self.max_backoff, self._backoff * 2)
@@ -0,0 +1,68 @@
+"""
+Time-indexed store of recent sensor samples.
+
+Samples are kept in two parallel, time-ordered lists with a moving start
+offset, so a time window is found with two bisects and sliced out in
+O(log n + k), and expiry is a pointer bump. The dead prefix is compacted
+once it outgrows the live part, which keeps appends amortised O(1) and
+memory bounded by the retention window however long the session runs.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+
+
+class SampleStore:
+    def __init__(self, retention_s: float = 30.0):
+        self.retention_s = retention_s
+        self._t: List[float] = []
+        self._v: List[float] = []
+        self._start = 0             # index of the oldest retained sample
+        self._lock = threading.Lock()
+
+        self.appended = 0
+        self.expired = 0
+
+    def append(self, t: float, value: float):
+        with self._lock:
+            if self._t and t < self._t[-1]:
+                # Rare: a late sample from another thread; keep the lists sorted
+                i = bisect_right(self._t, t, lo=self._start)
+                self._t.insert(i, t)
+                self._v.insert(i, value)
+            else:
+                self._t.append(t)
+                self._v.append(value)
+            self.appended += 1
+            self._expire(self._t[-1] - self.retention_s)
+
+    def _expire(self, cutoff: float):
+        start = bisect_left(self._t, cutoff, lo=self._start)
+        self.expired += start - self._start
+        self._start = start
+        if start > 1024 and start > len(self._t) - start:
+            del self._t[:start]
+            del self._v[:start]
+            self._start = 0
+
+    def window(self, t0: float, t1: float) -> Tuple[List[float], List[float]]:
+        """Times and values of the samples with t0 <= t <= t1, oldest first."""
+        with self._lock:
+            lo = bisect_left(self._t, t0, lo=self._start)
+            hi = bisect_right(self._t, t1, lo=lo)
+            return self._t[lo:hi], self._v[lo:hi]
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            if len(self._t) == self._start:
+                return None
+            return self._t[-1], self._v[-1]
+
+    @property
+    def oldest_time(self) -> Optional[float]:
+        with self._lock:
+            return self._t[self._start] if len(self._t) > self._start else None
+
+    def __len__(self) -> int:
+        return len(self._t) - self._start
@@ -1,14 +1,45 @@
-import serial
 import time
 from datetime import datetime
+from typing import NamedTuple, Optional
+
+from .clock_sync import ClockSync
+from .connection import SerialConnection
+
+class Sample(NamedTuple):
+    t: float        # host time.time() when the request was sent
+    raw: int        # raw sensor count
+    mm: float       # calibrated position
+    seq: int        # increments by one per returned sample
+    gap: float      # seconds lost to a disconnect just before this sample, 0.0 if none
+    t_acq: float    # estimated host time.time() at which the bridge took the sample
 
 class   LinearSensorReader:
-    def __init__(self, port, baudrate=115200):
+    def __init__(self, port, baudrate=115200, timeout=1, vid=None, pid=None, serial_number=None,
+                 reconnect_backoff=0.05, max_reconnect_backoff=2.0, clock_sync_interval=0.0):
         self.port = port
         self.baudrate = baudrate
-        self.ser = None
+        self.timeout = timeout
+        self.connection = SerialConnection(port, baudrate, timeout=timeout,
+                                           vid=vid, pid=pid, serial_number=serial_number,
+                                           initial_backoff=reconnect_backoff,
+                                           max_backoff=max_reconnect_backoff)
         self.running = False
 
+        # One 'T' round trip is slipped in between samples every clock_sync_interval
+        # seconds; 0 disables probing for bridge firmware without the 'T' command
+        self.clock = ClockSync()
+        self.clock_sync_interval = clock_sync_interval
+        self._next_clock_probe = 0.0
+
+        self._seq = 0
+        self._last_sample_time = None
+        self._seen_reconnects = 0
+
+        # Running totals, read by run_core's metrics registry
+        self.samples_read = 0
+        self.parse_errors = 0
+        self.command_errors = 0
+
         # Auto-generated calibration table
         # Generated on: 2026-04-09 13:21:28
         # Samples per point: 50
@@ -43,46 +74,101 @@ class   LinearSensorReader:
         ]
 
 
+    @property
+    def ser(self):
+        return self.connection.ser
+
+    @property
+    def disconnects(self) -> int:
+        return self.connection.disconnects
+
+    @property
+    def link_up(self) -> bool:
+        return self.connection.connected
+
+    def seconds_until_retry(self) -> float:
+        """Time until the next reopen attempt while the link is down (0 while it is up)."""
+        return self.connection.seconds_until_retry()
+
     def connect(self) -> bool:
-        try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-            print(f"Connected to {self.port} at {self.baudrate} baud")
-            return True
-        except Exception as e:
-            print(f"Connection failed: {e}")
-            return False
+        """Open the port; safe to call again, the previous handle is closed first."""
+        return self.connection.open()
 
     def disconnect(self):
-        if self.ser and self.ser.is_open:
-            self.ser.close()
+        if self.connection.connected:
             print("Disconnected")
+        self.connection.disconnect()
 
     def send_command(self, command):
-        """Send a single character command"""
-        if not self.ser or not self.ser.is_open:
-            print("Not connected!")
+        """Send a single character command. Returns None while the device is reconnecting."""
+        response = self.connection.exchange(command.encode('ascii'))
+        if response is None:
             return None
 
         try:
-            self.ser.write(command.encode('ascii'))
-            response = self.ser.readline().decode('ascii').strip()
-            return response
-        except Exception as e:
+            return response.decode('ascii').strip()
+        except UnicodeDecodeError as e:
+            self.command_errors += 1
             print(f"Command error: {e}")
             return None
 
-    def get_position(self):
+    def probe_clock(self) -> bool:
+        """Time one 'T' exchange and feed it to the clock estimator."""
+        t_send = time.time()
+        response = self.send_command('T')
+        t_recv = time.time()
+        if not response:
+            return False
+        try:
+            device_us = int(response.split()[-1], 16)
+        except ValueError:
+            self.parse_errors += 1
+            print(f"Parse error in serial_reader probe_clock: raw response = {response}")
+            return False
+        self.clock.add_round_trip(t_send, device_us, t_recv)
+        return True
+
+    def sync_clock(self, probes=16) -> bool:
+        """Burst of clock probes, e.g. right after connecting or before streaming."""
+        for _ in range(probes):
+            self.probe_clock()
+        self._next_clock_probe = time.time() + self.clock_sync_interval
+        return self.clock.synced
+
+    def read_sample(self) -> Optional[Sample]:
+        """Read one position sample, tagged with sequence number, reconnect gap and acquisition time."""
+        if self.clock_sync_interval and time.time() >= self._next_clock_probe:
+            self._next_clock_probe = time.time() + self.clock_sync_interval
+            self.probe_clock()
+
+        t = time.time()
         response = self.send_command('F')
+        if not response:
+            return None
+
+        try:
+            hex_part = response.split()[0]
+            raw_value = int(hex_part, 16)
+        except Exception as e:
+            self.parse_errors += 1
+            print(f"Parse error in serial_reader get_position: {e}, raw response = {response}")
+            return None
 
-        if response:
-            try:
-                hex_part = response.split()[0]
-                decimal_value = int(hex_part, 16)
-                return self.interpolate(decimal_value)
-            except Exception as e:
-                print(f"Parse error in serial_reader get_position: {e}, raw response = {response}")
-                return None
-        return None
+        gap = 0.0
+        if self.connection.reconnects != self._seen_reconnects:
+            self._seen_reconnects = self.connection.reconnects
+            if self._last_sample_time is not None:
+                gap = t - self._last_sample_time
+
+        self._seq += 1
+        self._last_sample_time = t
+        self.samples_read += 1
+        return Sample(t, raw_value, self.interpolate(raw_value), self._seq, gap,
+                      self.clock.acquisition_time(t))
+
+    def get_position(self):
+        sample = self.read_sample()
+        return sample.mm if sample is not None else None
 
     def interpolate(self, raw_value) -> float:
         """Interpolate raw sensor value to mm using calibration table"""
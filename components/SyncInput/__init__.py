@@ -0,0 +1 @@
+# Sync input module
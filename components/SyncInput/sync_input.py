@@ -0,0 +1,136 @@
+# Sync pulse input for Raspberry Pi, timed by pigpio hardware ticks
+# import Dispenser.SyncInput.sync_input as sync_input
+
+import time
+from collections import deque
+from typing import List, NamedTuple
+
+import pigpio
+
+# Pulse widths sent by the ESP32's syncStrokeStart(), in microseconds
+UP_PULSE_US = 200
+DOWN_PULSE_US = 600
+THRESHOLD_US = 400
+
+TICK_WRAP = 1 << 32     # pigpio ticks are uint32 microseconds, wrapping every ~71.6 minutes
+
+
+def tick_diff(t1: int, t2: int) -> int:
+    """Microseconds from tick t1 to tick t2, correct across one wrap (same as pigpio.tickDiff)."""
+    return (t2 - t1) & 0xFFFFFFFF
+
+
+class Edge(NamedTuple):
+    level: int          # 1 rising, 0 falling
+    tick: int           # pigpio tick of the edge
+    t: float            # tick mapped onto host time.time()
+
+
+class Pulse(NamedTuple):
+    t: float            # host time of the rising edge (motion start)
+    width_us: int       # measured from hardware ticks
+    direction: str      # "UP" or "DOWN"
+    confidence: float   # 1.0 at the nominal width, 0.0 at the threshold or far outside
+
+
+class SyncInput:
+    """
+    Records both edges of a sync pin with pigpio's DMA-sampled ticks, so
+    pulse widths are exact to a few microseconds however late Python gets
+    to run the callback. Edges are queued by the callback and handed out in
+    batches by drain() / drain_pulses(), mapped onto the same time.time()
+    timeline the sensor samples use.
+    """
+    def __init__(self, pi, gpio: int, pull=pigpio.PUD_DOWN, glitch_us: int = 50,
+                 up_width_us: int = UP_PULSE_US, down_width_us: int = DOWN_PULSE_US,
+                 threshold_us: int = THRESHOLD_US, reanchor_interval: float = 60.0):
+        self.pi = pi
+        self.gpio = gpio
+        self.up_width_us = up_width_us
+        self.down_width_us = down_width_us
+        self.threshold_us = threshold_us
+        self.reanchor_interval = reanchor_interval
+        self.glitch_us = glitch_us
+
+        self._edges = deque()       # (level, tick); appended by the pigpio callback thread
+        self._rising = None         # pending rising Edge waiting for its falling edge
+        self._anchor_tick = 0
+        self._anchor_time = 0.0
+        self._next_anchor = 0.0
+
+        self.edges_seen = 0
+        self.unpaired_edges = 0
+
+        pi.set_mode(gpio, pigpio.INPUT)
+        pi.set_pull_up_down(gpio, pull)
+        if glitch_us:
+            pi.set_glitch_filter(gpio, glitch_us)
+        self.anchor()
+        self._callback = pi.callback(gpio, pigpio.EITHER_EDGE, self._on_edge)
+
+    def _on_edge(self, gpio, level, tick):
+        # Runs on pigpio's callback thread: record and return, nothing else
+        if level != pigpio.TIMEOUT:
+            self._edges.append((level, tick))
+
+    # ── Tick -> host time ─────────────────────────────────────────────────────
+    def anchor(self, tries: int = 5):
+        """Pair the current tick with time.time(), keeping the tightest of `tries` brackets."""
+        best = None
+        for _ in range(tries):
+            before = time.time()
+            tick = self.pi.get_current_tick()
+            after = time.time()
+            if best is None or after - before < best[0]:
+                best = (after - before, tick, (before + after) / 2)
+        _, self._anchor_tick, self._anchor_time = best
+        self._next_anchor = time.monotonic() + self.reanchor_interval
+
+    def tick_to_time(self, tick: int) -> float:
+        diff = tick_diff(self._anchor_tick, tick)
+        if diff >= TICK_WRAP // 2:
+            diff -= TICK_WRAP       # edge happened before the anchor
+        return self._anchor_time + diff / 1e6
+
+    # ── Batched delivery ──────────────────────────────────────────────────────
+    def drain(self) -> List[Edge]:
+        """All edges recorded since the last call, oldest first."""
+        edges = []
+        while self._edges:
+            level, tick = self._edges.popleft()
+            # pigpio stamps a glitch-filtered edge once it has been stable for glitch_us
+            tick = (tick - self.glitch_us) & 0xFFFFFFFF
+            edges.append(Edge(level, tick, self.tick_to_time(tick)))
+        self.edges_seen += len(edges)
+        # Re-anchor after mapping, so queued ticks use the anchor they were recorded near
+        if time.monotonic() >= self._next_anchor:
+            self.anchor()
+        return edges
+
+    def drain_pulses(self) -> List[Pulse]:
+        """Completed pulses since the last call, classified from their hardware-timed width."""
+        pulses = []
+        for edge in self.drain():
+            if edge.level == 1:
+                if self._rising is not None:
+                    self.unpaired_edges += 1
+                self._rising = edge
+            elif self._rising is not None:
+                pulses.append(self.classify(self._rising, edge))
+                self._rising = None
+            else:
+                self.unpaired_edges += 1
+        return pulses
+
+    def classify(self, rising: Edge, falling: Edge) -> Pulse:
+        width = tick_diff(rising.tick, falling.tick)
+        if width < self.threshold_us:
+            direction, nominal = "UP", self.up_width_us
+        else:
+            direction, nominal = "DOWN", self.down_width_us
+        confidence = max(0.0, 1.0 - abs(width - nominal) / abs(self.threshold_us - nominal))
+        return Pulse(rising.t, width, direction, confidence)
+
+    def cancel(self):
+        self._callback.cancel()
+        self.pi.set_glitch_filter(self.gpio, 0)
@@ -9,7 +9,8 @@ from typing import Tuple
 from threading import Thread
 import logging
 
-# Default Pin Definitions
+# Default Pin Definitions, for standalone use; run_core passes the [tmc2209]
+# pins from station.toml instead (run_core/utils.py make_tmc2209)
 DIR_PIN = 5
 STEP_PIN = 19
 MS1_PIN = 16
@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from squatpress.analysis import overlay
+
+# All cycles of a multi-cycle capture overlaid, with the cycle mean +/- 1 SD. Cycles are
+# one LineCollection, or a density map past plotting.DENSITY_CYCLES; ground truth in the
+# capture's folder is aligned and drawn on top when there is any.
+filename = '../../csv/2026.02.27/sensor2_20260227_134448.csv'
+DENSITY = None            # True / False to force the density map or lines; None picks by cycle count
+SHOW_MEAN_BAND = True
+
+out, cycles = overlay.render(filename, out_dir='.', band=SHOW_MEAN_BAND, density=DENSITY, dpi=200)
+print(f"Saved overlay of {cycles} cycles to {out}")
+
@@ -1,8 +1,22 @@
+import sys
+from pathlib import Path
+
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
 import numpy as np
 
-filename = 'csv/sensor1_20260224_145305.csv'
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from squatpress.analysis import anomaly, plotting, segmentation
+from squatpress.analysis.alignment import align_cycles
+from squatpress.analysis.loader import Capture
+from squatpress.analysis.overlay import mean_band
+from squatpress.analysis.pipeline import Cycles
+
+# Without a display matplotlib already resolves to Agg; the figure is then only saved
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+filename = '../../csv/2026.02.24/sensor1_20260224_145305.csv'
 try:
     df = pd.read_csv(filename)
 except FileNotFoundError:
@@ -10,7 +24,7 @@ except FileNotFoundError:
     exit()
 
 # Load ground truth data from manual ruler measurements
-ground_truth_filename = 'csv/2026.02.24 golden truth (2).csv'
+ground_truth_filename = '../../csv/2026.02.24/2026.02.24 golden truth (2).csv'
 try:
     ground_truth = pd.read_csv(ground_truth_filename)
     has_ground_truth = True
@@ -20,55 +34,64 @@ except FileNotFoundError:
     has_ground_truth = False
 
 # --- SEGMENTATION ---
-# New cycle segmentation: detect when `time_s` resets/decreases between rows.
-# This matches the new logging method where each cycle's samples start at ~0s.
+# Cycles are split where `time_s` resets to ~0 (each cycle's samples start at ~0s)
+# and kept as row offsets into the columns; full-height cycles are packed together
+# for the alignment.
 PEAK_THRESHOLD_MM = 19.5
+RESET_THRESHOLD = -0.5      # a drop in time_s larger than this starts a new cycle
+EXCLUDE_ANOMALIES = True    # also drop cycles squatpress.analysis.anomaly flags (stuck reads, glitches, gaps)
 
-# Ensure numeric times
-df['time_s'] = pd.to_numeric(df['time_s'], errors='coerce')
-
-# Compute time differences between consecutive samples; a large negative jump indicates a new cycle
-df['time_diff'] = df['time_s'].diff().fillna(0)
-# Threshold to detect a reset to ~0.0 (choose -0.5s to be conservative)
-RESET_THRESHOLD = -0.5
-df['cycle_break'] = df['time_diff'] < RESET_THRESHOLD
-df['cycle_id'] = df['cycle_break'].cumsum()
+time_s = pd.to_numeric(df['time_s'], errors='coerce').to_numpy()
+position_mm = df['position_mm'].to_numpy(dtype=float)
+offsets = segmentation.split(time_s, reset_s=RESET_THRESHOLD)
 
-print(f"Detected {df['cycle_id'].nunique()} raw cycles (including any incomplete ones).")
-
-# Build candidate cycles (start, end indices) from cycle groups
-candidate_cycles = []
-for cid, grp in df.groupby('cycle_id'):
-    start_idx = grp.index[0]
-    end_idx = grp.index[-1]
-    candidate_cycles.append((start_idx, end_idx))
+print(f"Detected {len(offsets) - 1} raw cycles (including any incomplete ones).")
 
 # --- FILTER ---
-starts_filtered = []
-ends_filtered = []
-
-if candidate_cycles:
-    for start_idx, end_idx in candidate_cycles:
-        if start_idx >= len(df) or end_idx < start_idx:
-            continue
-        segment = df.loc[start_idx:end_idx].copy()
-        if segment.empty:
-            continue
-        peak_position = segment['position_mm'].max()
-        cycle_duration = segment['time_s'].iloc[-1] - segment['time_s'].iloc[0]
-        if peak_position >= PEAK_THRESHOLD_MM and cycle_duration > 0:
-            starts_filtered.append(start_idx)
-            ends_filtered.append(end_idx)
-
-cycles = len(starts_filtered)
+keep = segmentation.filter_cycles(time_s, position_mm, offsets, min_peak=PEAK_THRESHOLD_MM)
+if EXCLUDE_ANOMALIES:
+    raw = df['raw_value'].to_numpy() if 'raw_value' in df.columns else None
+    scores = anomaly.score(Capture(Path(filename), time_s, position_mm, raw, None, None))
+    flagged = keep & (scores.flags != 0)
+    for i in np.flatnonzero(flagged):
+        print(f"  cycle {i}: excluded ({anomaly.describe(scores.flags[i])})")
+    keep &= ~flagged
+
+cycles = int(keep.sum())
 print(f"Filtered to {cycles} valid cycles.\n")
 
 if cycles == 0:
     print("No valid cycles found after filtering. Exiting.")
     exit()
 
+# --- ALIGN CYCLES TO GROUND TRUTH ---
+# Every cycle gets its own time offset against the ground truth curve. All cycles are
+# resampled onto one grid (cycles x samples) and aligned in a single vectorized pass.
+(cycle_time, cycle_pos), cycle_offsets = segmentation.gather(offsets, keep, time_s, position_mm)
+cycle_time = segmentation.relative(cycle_time, cycle_offsets)     # each cycle starts at 0
+
+time_shift = np.zeros(cycles)
+if has_ground_truth:
+    ground_truth['norm_time'] = (ground_truth['frame'] - 1) / 240.0
+    alignment = align_cycles(cycle_time, cycle_pos, cycle_offsets,
+                             ground_truth['norm_time'].values, ground_truth['mm'].values)
+    time_shift = alignment.offsets
+
+    print("Per-cycle alignment to ground truth:")
+    print(f"  time offset : mean {time_shift.mean()*1000:.1f} ms, sd {time_shift.std()*1000:.1f} ms, "
+          f"range {time_shift.min()*1000:.1f} .. {time_shift.max()*1000:.1f} ms")
+    print(f"  RMS error   : median {np.median(alignment.rms):.3f} mm, max {alignment.rms.max():.3f} mm")
+    print(f"  bias        : mean {alignment.bias.mean():+.3f} mm")
+    print(f"  peak error  : median {np.median(alignment.max_error):.3f} mm, max {alignment.max_error.max():.3f} mm")
+    worst = np.argsort(alignment.rms)[::-1][:5]
+    print("  worst cycles: " + ", ".join(f"{i} ({alignment.rms[i]:.3f} mm)" for i in worst) + "\n")
+
 # --- OVERLAY CYCLES ---
+# All cycles are one LineCollection (a density map past plotting.DENSITY_CYCLES), so
+# drawing costs the same for 10 or 1000 cycles; the figure is saved with Agg and only
+# shown when a display is attached.
 N_CYCLES_TO_SHOW = "ALL"  # Set to integer (e.g., 10, 50) or "ALL" for all cycles
+SHOW_MEAN_BAND = True     # Overlay the cycle mean +/- 1 SD
 
 if N_CYCLES_TO_SHOW == "ALL":
     cycles_to_plot = cycles
@@ -77,111 +100,29 @@ else:
     cycles_to_plot = min(N_CYCLES_TO_SHOW, cycles)
     title_suffix = f"First {cycles_to_plot} Cycles"
 
-fig, ax = plt.subplots(figsize=(14, 7))
-
-colors = plt.cm.viridis(np.linspace(0, 1, cycles_to_plot))
-
-legend_labels = []
-all_y_list = []
-max_norm_time = 0.0
-for i in range(cycles_to_plot):
-    start_idx = starts_filtered[i]
-    end_idx = ends_filtered[i]
-    segment = df.iloc[start_idx:end_idx + 1].copy()
-
-    # Normalize time to start at 0
-    start_time = segment['time_s'].iloc[0]
-    segment['norm_time'] = segment['time_s'] - start_time
+shown = Cycles(cycle_time, cycle_pos, cycle_offsets[:cycles_to_plot + 1], time_shift[:cycles_to_plot], None)
 
-    ax.plot(segment['norm_time'], segment['position_mm'], 
-            linewidth=1.5, alpha=0.7, color=colors[i])
-    ax.scatter(segment['norm_time'], segment['position_mm'], 
-               s=8, alpha=0.5, color=colors[i])
-
-    all_y_list.append(segment['position_mm'].values)
-    if not segment['norm_time'].empty:
-        max_norm_time = max(max_norm_time, segment['norm_time'].max())
-
-    # Build compact legend labels
-    if i < 10 or i >= cycles_to_plot - 10:
-        legend_labels.append(f'Cycle {i}')
-    elif i == 10:
-        legend_labels.append('...')
+fig, ax = plt.subplots(figsize=(14, 7))
+artist = plotting.cycles(ax, shown.t, shown.mm, shown.offsets, shown.shifts, markers=cycles_to_plot <= 20)
+fig.colorbar(artist, ax=ax, label="Cycle" if isinstance(artist, LineCollection) else "Cycles per bin")
+if SHOW_MEAN_BAND and cycles_to_plot > 1:
+    grid, mean, sd = mean_band(shown)
+    plotting.band(ax, grid, mean, mean - sd, mean + sd)
 
 # --- OVERLAY GROUND TRUTH ---
 if has_ground_truth:
     print(f"\nGround Truth Data:")
     print(ground_truth)
-    
-    # Compute average first-movement time across all cycles
-    first_move_times = []
-    for i in range(cycles_to_plot):
-        seg = df.iloc[starts_filtered[i]:ends_filtered[i] + 1].copy()
-        moving = seg[seg['position_mm'] > 0.5]['time_s']
-        if not moving.empty:
-            first_move_times.append(moving.iloc[0])
-    
-    avg_first_move = np.mean(first_move_times) if first_move_times else 0.0
-    print(f"Average first-move time offset: {avg_first_move:.4f}s")
-    
-    ground_truth['norm_time'] = (ground_truth['frame'] - 1) / 240.0 + avg_first_move
-    
-    ax.plot(ground_truth['norm_time'], ground_truth['mm'], 
-            linewidth=4, color='red', alpha=0.9, label='Ground Truth (Ruler)', zorder=10)
-    ax.scatter(ground_truth['norm_time'], ground_truth['mm'], 
-               s=40, color='red', alpha=0.8, marker='X', edgecolors='darkred', linewidth=1, zorder=11)
-
-ax.set_xlabel('Time since cycle start (s)', fontsize=11)
+    plotting.truth_overlay(ax, ground_truth['norm_time'], ground_truth['mm'])
+
+ax.set_xlabel('Time since ground truth start (s)' if has_ground_truth else 'Time since cycle start (s)', fontsize=11)
 ax.set_ylabel('Position (mm)', fontsize=11)
-ax.set_title(f'{title_suffix} Overlayed (Normalized Time) with Ground Truth', fontsize=12)
+ax.set_title(f'{title_suffix} Overlayed (Per-Cycle Aligned) with Ground Truth', fontsize=12)
 ax.grid(True, alpha=0.3)
-
-# Build legend with ground truth
-if cycles_to_plot > 20:
-    handles = []
-    labels = []
-    for i in range(10):
-        h = plt.Line2D([0], [0], color=colors[i], linewidth=1.5, alpha=0.7)
-        handles.append(h)
-        labels.append(f'Cycle {i}')
-    
-    labels.append('...')
-    handles.append(plt.Line2D([0], [0], color='gray', linewidth=1, linestyle='--', alpha=0.5))
-    
-    for i in range(cycles_to_plot - 10, cycles_to_plot):
-        h = plt.Line2D([0], [0], color=colors[i], linewidth=1.5, alpha=0.7)
-        handles.append(h)
-        labels.append(f'Cycle {i}')
-    
-    if has_ground_truth:
-        h_truth = plt.Line2D([0], [0], color='red', linewidth=4, alpha=0.9, marker='X', markersize=6)
-        handles.append(h_truth)
-        labels.append('Ground Truth (Ruler)')
-    
-    ax.legend(handles, labels, loc='upper left', fontsize=9, ncol=1)
-else:
-    handles = [plt.Line2D([0], [0], color=colors[i], linewidth=1.5, alpha=0.7) for i in range(cycles_to_plot)]
-    labels = [f'Cycle {i}' for i in range(cycles_to_plot)]
-    
-    if has_ground_truth:
-        h_truth = plt.Line2D([0], [0], color='red', linewidth=4, alpha=0.9, marker='X', markersize=6)
-        handles.append(h_truth)
-        labels.append('Ground Truth (Ruler)')
-    
-    ax.legend(handles, labels, loc='upper left', fontsize=9)
-
-# Set x limits from 0 to max normalized time (with small margin)
-if max_norm_time <= 0:
-    ax.set_xlim(0, 1.2)
-else:
-    ax.set_xlim(0, max(1.2, max_norm_time * 1.05))
-
-all_y = np.concatenate(all_y_list) if all_y_list else np.array([0.0])
-y_min, y_max = all_y.min(), all_y.max()
-y_margin = (y_max - y_min) * 0.1 if (y_max - y_min) > 0 else 1.0
-ax.set_ylim(y_min - y_margin, y_max + y_margin)
+ax.legend(loc='upper left', fontsize=9)
 
 outname = f'sensor_{cycles_to_plot}_cycles.png'
 fig.savefig(outname, dpi=200, bbox_inches='tight')
 print(f"\nSaved overlay plot to {outname}")
-plt.show()
\ No newline at end of file
+if matplotlib.get_backend().lower() != "agg":
+    plt.show()
@@ -1,59 +1,25 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-
-TIME_OFFSET = -0.007
-
-# 1. Load Data
-truth_path  = '../../csv/2026.03.31/gt (1).csv'
-sensor_path = '../../csv/2026.03.31/sensor2_134943.csv'
-
-df_sensor = pd.read_csv(sensor_path)
-df_truth = pd.read_csv(truth_path)
-
-# 2. Synchronize to GPIO Trigger (T=0)
-# Sensor time is already relative to GPIO HIGH in your RPi script
-df_sensor['sync_time'] = df_sensor['time_s'] + TIME_OFFSET
+import sys
+from pathlib import Path
 
-# Ground truth time relative to the frame the LED turns ON (assume Frame 1)
-df_truth['sync_time'] = (df_truth['frame'] - 1) / 240.0
-
-# 3. Direct Comparison via Interpolation
-df_truth['sensor_val'] = np.interp(
-    df_truth['sync_time'], 
-    df_sensor['sync_time'], 
-    df_sensor['position_mm']
-)
-
-df_truth['error'] = df_truth['sensor_val'] - df_truth['mm']
-
-# 4. Visualization
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
+import matplotlib.pyplot as plt
 
-ax1.plot(df_sensor['sync_time'], df_sensor['position_mm'], label='Sensor Data', color='blue', alpha=0.4)
-ax1.scatter(df_truth['sync_time'], df_truth['mm'], color='red', label='Ground Truth', s=20)
-ax1.set_title("Trigger-Synchronized Comparison (GPIO T=0)")
-ax1.set_ylabel("Position (mm)")
-ax1.legend()
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from squatpress.analysis import plotting
+from squatpress.analysis.dtw import PHASES
+from squatpress.analysis.pipeline import SessionAnalysis
 
-ax2.stem(df_truth['sync_time'], df_truth['error'], linefmt='purple', markerfmt='o')
-ax2.set_ylabel("Error (mm)")
-ax2.set_xlabel("Time since GPIO Trigger (s)")
+DATA = Path(__file__).resolve().parents[2] / "csv"
 
-# Function to extract functional metrics
-def extract_metrics(time, pos):
-    auc = np.trapz(pos, time)
-    peak = np.max(pos)
-    # Velocity (central difference)
-    velocity = np.diff(pos) / np.diff(time)
-    peak_vel = np.max(velocity)
-    return {'auc': auc, 'peak': peak, 'peak_vel': peak_vel}
+# Sensor time is relative to GPIO HIGH; ground truth to the frame the LED turns ON (frame 1).
+# The residual offset is found by cross-correlation against the truth.
+a = SessionAnalysis(DATA / "2026.03.31/sensor2_134943.csv", DATA / "2026.03.31/gt (1).csv")
 
-sensor_metrics = extract_metrics(df_sensor['time_s'], df_sensor['position_mm'])
-truth_metrics = extract_metrics(df_truth['sync_time'], df_truth['mm'])
+print(f"AUC Error: {abs(a.metrics['auc_error_mm_s']):.4f}")
+print(f"Peak Height Error: {abs(a.metrics['peak_error_mm']):.4f} mm")
 
-print(f"AUC Error: {abs(sensor_metrics['auc'] - truth_metrics['auc']):.4f}")
-print(f"Peak Height Error: {abs(sensor_metrics['peak'] - truth_metrics['peak']):.4f} mm")
+# Non-rigid timing: DTW on top of the rigid offset, per phase (positive = sensor lags)
+for phase, lag, rms in zip(PHASES, a.warp.phase_lag[0], a.warp.phase_rms[0]):
+    print(f"{phase.capitalize()} timing error: {lag*1000:+.1f} ms mean, {rms*1000:.1f} ms RMS")
 
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+plotting.figure(a, ["comparison", "error"], height=5)
+plt.show()
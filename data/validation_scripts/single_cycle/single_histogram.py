@@ -1,26 +1,25 @@
-import pandas as pd
-import numpy as np
+import sys
+from pathlib import Path
+
 import matplotlib.pyplot as plt
 
-# Load Data
-df_sensor = pd.read_csv('../../csv/2026.04.09/sensor2_142307.csv')
-df_truth = pd.read_csv('../../csv/2026.04.09/gt (1).csv')
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from squatpress.analysis import plotting
+from squatpress.analysis.pipeline import SessionAnalysis
 
-# Syncing: Using the hardware trigger (GPIO T=0)
-df_truth['sync_time'] = (df_truth['frame'] - 1) / 240.0
-sensor_interp = np.interp(df_truth['sync_time'], df_sensor['time_s'], df_sensor['position_mm'])
+DATA = Path(__file__).resolve().parents[2] / "csv"
 
-# Error in Microns (Sensor - Truth)
-errors = (sensor_interp - df_truth['mm']) * 1000
+# Syncing: only the hardware trigger (GPIO T=0), no offset search
+a = SessionAnalysis(DATA / "2026.04.09/sensor2_142307.csv", DATA / "2026.04.09/gt (1).csv", offset=0.0)
 
-plt.figure(figsize=(8, 5))
-plt.hist(errors, bins=25, color='skyblue', edgecolor='black', alpha=0.7)
-plt.axvline(0, color='red', linestyle='dashed', label='Perfect Accuracy')
-plt.title("Sensor Reliability Histogram")
-plt.xlabel("Measurement Error (Microns)")
-plt.ylabel("Frequency (Count)")
-plt.legend()
+fig, ax = plt.subplots(figsize=(8, 5))
+plotting.histogram(ax, a)
 plt.show()
 
-print(f"Mean Error: {np.mean(errors):.2f} um")
-print(f"Standard Deviation: {np.std(errors):.2f} um")
\ No newline at end of file
+# Error in Microns (Sensor - Truth), at the truth points inside the sensor's time span.
+# The original script let np.interp clamp the points outside it to the sensor's first/last
+# value (mean -6.90 um); those are not measurements, so they are left out here.
+errors = a.errors[1] * 1000
+print(f"Mean Error: {errors.mean():.2f} um")
+print(f"Standard Deviation: {errors.std():.2f} um")
+print(f"Truth points outside the sensor's span (left out): {len(a.truth.t) - len(errors)}")
@@ -0,0 +1,180 @@
+"""
+Anomalous lift detection, one lift at a time as run_core records them.
+
+The linear sensor thread feeds every sample of a lift to a LiftTrace and
+scores it when the lift ends. The checks and Flag bits are the ones
+squatpress.analysis.anomaly applies offline to whole captures:
+
+  - shape: RMS distance (mm) from the median of the recent lifts, each
+    resampled to PHASE_POINTS points over its own duration;
+  - peak and duration: robust z-scores against the recent lifts;
+  - gaps: a reconnect gap, or no sample for more than max_gap_s;
+  - jumps: raw counts changing by more than max_jump_counts between
+    samples, and raw values that are not sensor counts (0, 0xFFFF).
+
+"Recent lifts" are the last `window` lifts that were not signal junk (gap,
+jump or invalid), so the reference follows slow drift but not glitches.
+The first min_lifts lifts are only checked for gaps and jumps. Everything
+is plain Python over at most window x PHASE_POINTS values, so scoring a
+lift takes a few milliseconds and pulls in no numeric libraries.
+
+The flags ride on LiftSummary.flags; lift_db.py keeps flagged lifts in its
+lift_anomalies table so analyses can leave them out.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Deque, List, NamedTuple, Sequence
+
+from metrics import REGISTRY
+
+# Same bits as squatpress.analysis.anomaly.Flag
+SHAPE, PEAK, DURATION, GAP, JUMP, INVALID = 1, 2, 4, 8, 16, 32
+FLAG_NAMES = {SHAPE: "shape", PEAK: "peak", DURATION: "duration", GAP: "gap", JUMP: "jump", INVALID: "invalid"}
+JUNK = GAP | JUMP | INVALID
+
+PHASE_POINTS = 50
+RAW_INVALID = (0, 0xFFFF)
+MAD_SCALE = 1.4826
+PEAK_SCALE_MM = 0.1         # z-score scales never go below these, as offline
+DURATION_SCALE_S = 0.02
+SHAPE_SCALE_MM = 0.25
+
+FLAGGED = REGISTRY.counter("squat_lifts_flagged", "Lifts flagged as anomalous, by reason", labels=("reason",))
+
+
+def describe(flags: int) -> str:
+    """'peak+duration' style list of the flags set."""
+    return "+".join(name for bit, name in FLAG_NAMES.items() if flags & bit)
+
+
+def _median(values: Sequence[float]) -> float:
+    s = sorted(values)
+    mid = len(s) // 2
+    return s[mid] if len(s) % 2 else 0.5 * (s[mid - 1] + s[mid])
+
+
+def _robust_z(x: float, history: Sequence[float], floor: float) -> float:
+    center = _median(history)
+    scale = max(MAD_SCALE * _median([abs(h - center) for h in history]), floor)
+    return (x - center) / scale
+
+
+def _phase_resample(t: Sequence[float], mm: Sequence[float], points: int = PHASE_POINTS) -> List[float]:
+    """mm at `points` evenly spaced fractions of the lift's duration, by linear interpolation."""
+    t0, span = t[0], t[-1] - t[0]
+    out, j = [], 0
+    for k in range(points):
+        target = t0 + span * k / (points - 1)
+        while j < len(t) - 2 and t[j + 1] < target:
+            j += 1
+        dt = t[j + 1] - t[j]
+        w = (target - t[j]) / dt if dt > 0 else 0.0
+        out.append(mm[j] + min(max(w, 0.0), 1.0) * (mm[j + 1] - mm[j]))
+    return out
+
+
+class LiftTrace:
+    """Samples of one lift as they are read."""
+    def __init__(self):
+        self.t: List[float] = []
+        self.mm: List[float] = []
+        self.max_gap = 0.0
+        self.max_jump = 0
+        self.invalid = 0
+        self._last_raw = None
+
+    def add(self, t: float, mm: float, raw=None, gap: float = 0.0):
+        if self.t:
+            self.max_gap = max(self.max_gap, t - self.t[-1])
+        self.max_gap = max(self.max_gap, gap)
+        if raw is not None:
+            if raw in RAW_INVALID:
+                self.invalid += 1
+            elif self._last_raw is not None:
+                self.max_jump = max(self.max_jump, abs(raw - self._last_raw))
+            if raw not in RAW_INVALID:
+                self._last_raw = raw
+        self.t.append(t)
+        self.mm.append(mm)
+
+
+class Verdict(NamedTuple):
+    flags: int
+    peak_z: float
+    duration_z: float
+    shape_mm: float
+    shape_z: float
+
+
+class LiftAnomalyDetector:
+    def __init__(self, window: int = 50, min_lifts: int = 10, z_limit: float = 5.0, max_gap_s: float = 0.1,
+                 max_jump_counts: int = 3000):
+        self.min_lifts = min_lifts
+        self.z_limit = z_limit
+        self.max_gap_s = max_gap_s
+        self.max_jump_counts = max_jump_counts
+        self._peaks: Deque[float] = deque(maxlen=window)
+        self._durations: Deque[float] = deque(maxlen=window)
+        self._shapes: Deque[List[float]] = deque(maxlen=window)
+        self._distances: Deque[float] = deque(maxlen=window)
+        self._template = None
+        # One detector outlives sensor thread restarts, so an old thread may still be scoring
+        self._lock = threading.Lock()
+
+    def score(self, trace: LiftTrace) -> Verdict:
+        """Flag one finished lift and, unless it is signal junk, add it to the reference."""
+        with self._lock:
+            verdict = self._score(trace)
+        return self._report(verdict)
+
+    def _score(self, trace: LiftTrace) -> Verdict:
+        flags = 0
+        if trace.max_gap > self.max_gap_s:
+            flags |= GAP
+        if trace.max_jump > self.max_jump_counts:
+            flags |= JUMP
+        if trace.invalid or len(trace.t) < 2 or trace.t[-1] <= trace.t[0]:
+            flags |= INVALID
+            return Verdict(flags, 0.0, 0.0, 0.0, 0.0)
+
+        peak, duration = max(trace.mm), trace.t[-1] - trace.t[0]
+        shape = _phase_resample(trace.t, trace.mm)
+        template = self._template
+        distance = 0.0
+        if template is not None:
+            distance = (sum((a - b) ** 2 for a, b in zip(shape, template)) / len(shape)) ** 0.5
+
+        peak_z = duration_z = shape_z = 0.0
+        if len(self._peaks) >= self.min_lifts:
+            peak_z = _robust_z(peak, self._peaks, PEAK_SCALE_MM)
+            duration_z = _robust_z(duration, self._durations, DURATION_SCALE_S)
+            if self._distances:
+                shape_z = _robust_z(distance, self._distances, SHAPE_SCALE_MM)
+            if shape_z > self.z_limit:
+                flags |= SHAPE
+            if abs(peak_z) > self.z_limit:
+                flags |= PEAK
+            if abs(duration_z) > self.z_limit:
+                flags |= DURATION
+
+        if not flags & JUNK:
+            self._peaks.append(peak)
+            self._durations.append(duration)
+            self._shapes.append(shape)
+            if template is not None:
+                self._distances.append(distance)
+            self._template = [_median(column) for column in zip(*self._shapes)]
+        return Verdict(flags, peak_z, duration_z, distance, shape_z)
+
+    @staticmethod
+    def _report(verdict: Verdict) -> Verdict:
+        if verdict.flags:
+            for bit, name in FLAG_NAMES.items():
+                if verdict.flags & bit:
+                    FLAGGED.labels(name).inc()
+            logging.warning(f"Anomalous lift ({describe(verdict.flags)}): peak z {verdict.peak_z:+.1f}, "
+                            f"duration z {verdict.duration_z:+.1f}, shape {verdict.shape_mm:.2f} mm "
+                            f"(z {verdict.shape_z:+.1f})")
+        return verdict
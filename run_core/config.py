@@ -0,0 +1,357 @@
+"""
+Station configuration for run_core.
+
+All hardware bindings and tuning knobs live in a single TOML file
+(run_core/station.toml by default). Top-level sections hold the defaults
+shared by every station; a `[stations.<name>.<section>]` table overrides
+individual keys for one station:
+
+    [linear_sensor]
+    port = "/dev/ttyACM1"
+
+    [stations.cage-3.linear_sensor]
+    port = "/dev/ttyACM0"
+
+The file is loaded once at startup into frozen dataclasses, so components
+get typed, validated, immutable settings instead of hard-coded values.
+"""
+
+import os
+import socket
+import tomllib
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Optional, Union, get_args, get_origin
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / "station.toml"
+CONFIG_ENV_VAR = "SQUAT_CONFIG"
+STATION_ENV_VAR = "SQUAT_STATION"
+
+# BCM numbers usable as plain GPIO on a Pi 4 header
+_BCM_PINS = range(0, 28)
+_BAUD_RATES = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600, 1000000, 2000000)
+# components/LinearSensor/connection.py MAX_SILENT_READS; not imported so pyserial stays lazy
+_SENSOR_SILENT_READS = 5
+
+
+class ConfigError(ValueError):
+    """Raised when the station configuration is missing, malformed or invalid."""
+
+
+def _require(condition: bool, message: str):
+    if not condition:
+        raise ConfigError(message)
+
+
+def _check_baudrate(baudrate: int):
+    _require(baudrate in _BAUD_RATES, f"unsupported baudrate {baudrate}")
+
+
+@dataclass(frozen=True)
+class LinearSensorSettings:
+    port: str = "/dev/ttyACM1"
+    baudrate: int = 115200
+    timeout: float = 1.0
+    usb_vid: Optional[int] = None       # if set with usb_pid, the port is found by USB ID
+    usb_pid: Optional[int] = None
+    serial_number: Optional[str] = None
+    reconnect_backoff: float = 0.05     # first retry delay after a disconnect, doubles per failure
+    max_reconnect_backoff: float = 2.0
+    clock_sync_interval: float = 0.0    # seconds between 'T' clock probes, 0 = off (needs bridge support)
+
+    def __post_init__(self):
+        _require(bool(self.port), "port must not be empty")
+        _check_baudrate(self.baudrate)
+        _require(self.timeout > 0, "timeout must be positive")
+        _require((self.usb_vid is None) == (self.usb_pid is None), "usb_vid and usb_pid must be set together")
+        for name in ("usb_vid", "usb_pid"):
+            value = getattr(self, name)
+            _require(value is None or 0 <= value <= 0xFFFF, f"{name} must be a 16-bit USB ID")
+        _require(0 < self.reconnect_backoff <= self.max_reconnect_backoff,
+                 "reconnect_backoff must be positive and at most max_reconnect_backoff")
+        _require(self.clock_sync_interval >= 0, "clock_sync_interval must not be negative")
+
+
+@dataclass(frozen=True)
+class LiftSettings:
+    mm_threshold: float = 10.0
+    release_margin_mm: float = 2.0      # stay in a lift until mm < threshold - margin
+    slope_threshold: float = 0.1        # average mm/sample that counts as rising
+    recent_window: int = 10             # samples used for the average slope
+    poll_interval: float = 0.01         # seconds between reads while inside a lift
+
+    def __post_init__(self):
+        _require(self.mm_threshold > 0, "mm_threshold must be positive")
+        _require(0 <= self.release_margin_mm < self.mm_threshold,
+                 "release_margin_mm must be in [0, mm_threshold)")
+        _require(self.recent_window >= 2, "recent_window must be at least 2")
+        _require(self.poll_interval >= 0, "poll_interval must not be negative")
+
+
+@dataclass(frozen=True)
+class AnomalySettings:
+    enabled: bool = False
+    window: int = 50                    # recent lifts the z-scores and the shape template come from
+    min_lifts: int = 10                 # lifts seen before peak, duration and shape are scored
+    z_limit: float = 5.0                # robust z-score that flags a lift
+    max_gap_s: float = 0.1              # longest time without a sample inside a lift
+    max_jump_counts: int = 3000         # largest raw count change between two samples
+
+    def __post_init__(self):
+        _require(self.window >= 2, "window must be at least 2")
+        _require(2 <= self.min_lifts <= self.window, "min_lifts must be in [2, window]")
+        _require(self.z_limit > 0, "z_limit must be positive")
+        _require(self.max_gap_s > 0, "max_gap_s must be positive")
+        _require(self.max_jump_counts > 0, "max_jump_counts must be positive")
+
+
+@dataclass(frozen=True)
+class PlotSettings:
+    enabled: Optional[bool] = None      # unset = plot only when a display is attached
+    sample_window: int = 200
+
+    def __post_init__(self):
+        _require(self.sample_window > 0, "sample_window must be positive")
+
+
+@dataclass(frozen=True)
+class PhotoInterruptorSettings:
+    clk: int = 1_600_000
+    threshold: float = 0.15
+    poll_interval: float = 0.1
+
+    def __post_init__(self):
+        _require(self.clk > 0, "clk must be positive")
+        _require(0 < self.threshold < 1, "threshold must be a fraction in (0, 1)")
+        _require(self.poll_interval > 0, "poll_interval must be positive")
+
+
+@dataclass(frozen=True)
+class DispenserSettings:
+    port: str = "/dev/ttyUSB0"
+    baudrate: int = 115200
+
+    def __post_init__(self):
+        _require(bool(self.port), "port must not be empty")
+        _check_baudrate(self.baudrate)
+
+
+@dataclass(frozen=True)
+class TMC2209Settings:
+    dir_pin: int = 5
+    step_pin: int = 19
+    ms1_pin: int = 16
+    ms2_pin: int = 21
+    en_pin: int = 26                    # 0 = enable pin not wired
+    spr: int = 200
+
+    def __post_init__(self):
+        pins = {
+            "dir_pin": self.dir_pin, "step_pin": self.step_pin,
+            "ms1_pin": self.ms1_pin, "ms2_pin": self.ms2_pin, "en_pin": self.en_pin,
+        }
+        for name, pin in pins.items():
+            _require(pin in _BCM_PINS, f"{name}={pin} is not a BCM GPIO number")
+        used = [pin for pin in pins.values() if pin != 0]
+        _require(len(used) == len(set(used)), f"pins must be unique, got {pins}")
+        _require(self.spr > 0, "spr must be positive")
+
+
+@dataclass(frozen=True)
+class EventLogSettings:
+    path: str = "/home/mice/mice-squat/logs/events.journal"
+    sync_every: int = 64                # fsync + index entry after this many events...
+    sync_interval: float = 5.0          # ...or this many seconds, whichever comes first
+
+    def __post_init__(self):
+        _require(bool(self.path), "path must not be empty")
+        _require(self.sync_every >= 1, "sync_every must be at least 1")
+        _require(self.sync_interval > 0, "sync_interval must be positive")
+
+
+@dataclass(frozen=True)
+class LogRotationSettings:
+    log_file: str = "/home/mice/mice-squat/logs/run_core.log"  # "" = log to the console only
+    max_bytes: int = 16 * 1024 * 1024   # roll the event journal / log file at this size...
+    interval: float = 86400.0           # ...or at each local multiple of this many seconds (0 = size only)
+    keep: int = 30                      # rotated segments kept per log (0 = all)
+    max_age_days: float = 90.0          # and none older than this (0 = no limit)
+    compress: bool = True               # gzip closed log file segments (journal segments stay seekable)
+
+    def __post_init__(self):
+        _require(self.max_bytes >= 0, "max_bytes must not be negative")
+        _require(self.interval >= 0, "interval must not be negative")
+        _require(self.max_bytes > 0 or self.interval > 0, "set max_bytes or interval (or both)")
+        _require(self.keep >= 0, "keep must not be negative")
+        _require(self.max_age_days >= 0, "max_age_days must not be negative")
+
+
+@dataclass(frozen=True)
+class LiftDbSettings:
+    enabled: bool = True
+    path: str = "/home/mice/mice-squat/logs/lifts.sqlite3"
+    batch_size: int = 32                # statements per transaction
+    flush_interval: float = 2.0         # commit whatever is queued after this many seconds
+
+    def __post_init__(self):
+        _require(bool(self.path), "path must not be empty")
+        _require(self.batch_size >= 1, "batch_size must be at least 1")
+        _require(self.flush_interval > 0, "flush_interval must be positive")
+
+
+@dataclass(frozen=True)
+class MetricsSettings:
+    enabled: bool = True
+    host: str = "127.0.0.1"             # keep local; expose via a reverse proxy if needed
+    port: int = 9108
+
+    def __post_init__(self):
+        _require(0 < self.port < 65536, f"port {self.port} out of range")
+
+
+@dataclass(frozen=True)
+class ProfilingSettings:
+    enabled: bool = False
+    sample_every: int = 16              # time 1 in N outermost hot-path calls
+    output: str = "/tmp/squat_profile.json"
+
+    def __post_init__(self):
+        _require(self.sample_every >= 1, "sample_every must be at least 1")
+        _require(bool(self.output), "output must not be empty")
+
+
+@dataclass(frozen=True)
+class WatchdogSettings:
+    enabled: bool = True
+    check_interval: float = 0.5
+    sensor_stall_timeout: float = 6.0   # no valid position read for this long = stalled
+    ltc_stall_timeout: float = 2.0
+    stop_timeout: float = 2.0           # wait this long for a failed worker to exit before reopening its port
+    restart_backoff: float = 1.0        # doubles per consecutive failure
+    max_backoff: float = 30.0
+
+    def __post_init__(self):
+        _require(self.check_interval > 0, "check_interval must be positive")
+        _require(self.sensor_stall_timeout > self.check_interval,
+                 "sensor_stall_timeout must exceed check_interval")
+        _require(self.ltc_stall_timeout > self.check_interval,
+                 "ltc_stall_timeout must exceed check_interval")
+        _require(self.stop_timeout > 0, "stop_timeout must be positive")
+        _require(0 < self.restart_backoff <= self.max_backoff,
+                 "restart_backoff must be positive and at most max_backoff")
+
+
+@dataclass(frozen=True)
+class StationSettings:
+    name: str
+    linear_sensor: LinearSensorSettings = field(default_factory=LinearSensorSettings)
+    lift: LiftSettings = field(default_factory=LiftSettings)
+    anomaly: AnomalySettings = field(default_factory=AnomalySettings)
+    plot: PlotSettings = field(default_factory=PlotSettings)
+    photo_interruptor: PhotoInterruptorSettings = field(default_factory=PhotoInterruptorSettings)
+    dispenser: DispenserSettings = field(default_factory=DispenserSettings)
+    tmc2209: TMC2209Settings = field(default_factory=TMC2209Settings)
+    event_log: EventLogSettings = field(default_factory=EventLogSettings)
+    lift_db: LiftDbSettings = field(default_factory=LiftDbSettings)
+    log_rotation: LogRotationSettings = field(default_factory=LogRotationSettings)
+    metrics: MetricsSettings = field(default_factory=MetricsSettings)
+    profiling: ProfilingSettings = field(default_factory=ProfilingSettings)
+    watchdog: WatchdogSettings = field(default_factory=WatchdogSettings)
+
+    def __post_init__(self):
+        _require(self.linear_sensor.port != self.dispenser.port,
+                 f"linear_sensor and dispenser share port {self.dispenser.port}")
+        if self.watchdog.enabled:
+            # Let the connection declare a silent port down before the watchdog restarts the thread
+            silent_s = _SENSOR_SILENT_READS * self.linear_sensor.timeout
+            _require(self.watchdog.sensor_stall_timeout >= silent_s,
+                     f"watchdog.sensor_stall_timeout must be at least {_SENSOR_SILENT_READS} x "
+                     f"linear_sensor.timeout ({silent_s:g} s)")
+            _require(self.watchdog.stop_timeout > self.linear_sensor.timeout,
+                     "watchdog.stop_timeout must exceed linear_sensor.timeout so a blocked read can finish")
+
+
+# Section name -> settings class, in file order
+_SECTIONS = {
+    f.name: f.default_factory for f in fields(StationSettings) if f.name != "name"
+}
+
+
+def _coerce(section: str, key: str, value, expected):
+    """Check a TOML value against the dataclass annotation, allowing int -> float."""
+    label = f"[{section}] {key}"
+    if get_origin(expected) is Union:
+        # Optional[X]: the key may simply be left out of the file
+        expected = next(arg for arg in get_args(expected) if arg is not type(None))
+    if expected is bool:
+        _require(isinstance(value, bool), f"{label} must be true/false, got {value!r}")
+        return value
+    if expected is int:
+        _require(isinstance(value, int) and not isinstance(value, bool),
+                 f"{label} must be an integer, got {value!r}")
+        return value
+    if expected is float:
+        _require(isinstance(value, (int, float)) and not isinstance(value, bool),
+                 f"{label} must be a number, got {value!r}")
+        return float(value)
+    if expected is str:
+        _require(isinstance(value, str), f"{label} must be a string, got {value!r}")
+        return value
+    raise ConfigError(f"{label} has unsupported type {expected}")
+
+
+def _build_section(section: str, values: dict):
+    cls = _SECTIONS[section]
+    annotations = {f.name: f.type for f in fields(cls)}
+
+    unknown = set(values) - set(annotations)
+    _require(not unknown, f"[{section}] unknown keys: {', '.join(sorted(unknown))}")
+
+    kwargs = {key: _coerce(section, key, value, annotations[key]) for key, value in values.items()}
+    try:
+        return cls(**kwargs)
+    except ConfigError as e:
+        raise ConfigError(f"[{section}] {e}") from None
+
+
+def _merge(defaults: dict, overrides: dict) -> dict:
+    merged = {section: dict(values) for section, values in defaults.items()}
+    for section, values in overrides.items():
+        _require(section in _SECTIONS, f"unknown section [{section}]")
+        merged.setdefault(section, {}).update(values)
+    return merged
+
+
+def default_station_name() -> str:
+    return os.environ.get(STATION_ENV_VAR) or socket.gethostname()
+
+
+def load_settings(path=None, station: Optional[str] = None) -> StationSettings:
+    """
+    Load the station configuration.
+    Args:
+        path: TOML file to read. Defaults to $SQUAT_CONFIG, then run_core/station.toml.
+        station: Station whose overrides to apply. Defaults to $SQUAT_STATION, then the hostname.
+            An explicitly requested station must exist in the file.
+    """
+    path = Path(path or os.environ.get(CONFIG_ENV_VAR) or DEFAULT_CONFIG_PATH)
+    try:
+        with open(path, "rb") as f:
+            raw = tomllib.load(f)
+    except FileNotFoundError:
+        raise ConfigError(f"Station config not found: {path}") from None
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigError(f"Invalid TOML in {path}: {e}") from None
+
+    stations = raw.pop("stations", {})
+    explicit = station is not None or STATION_ENV_VAR in os.environ
+    name = station or default_station_name()
+    if explicit:
+        _require(name in stations, f"station '{name}' is not defined in {path}")
+
+    for section in raw:
+        _require(section in _SECTIONS, f"unknown section [{section}] in {path}")
+
+    merged = _merge(raw, stations.get(name, {}))
+    sections = {section: _build_section(section, values) for section, values in merged.items()}
+    return StationSettings(name=name, **sections)
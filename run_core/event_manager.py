@@ -1,19 +1,41 @@
-import csv
 import logging
+import queue
+import time
 
 from events import EventType
+from journal import DEFAULT_SYNC_EVERY, DEFAULT_SYNC_INTERVAL, EventJournal
+from metrics import REGISTRY
 
-write_path = "/home/mice/mice-squat/logs/event_log.csv"
+EVENTS = REGISTRY.counter("squat_events", "Events handled by the event manager", labels=("event",))
+EVENT_LATENCY = REGISTRY.histogram("squat_event_latency_seconds",
+                                   "Delay from an event being raised to the manager handling it", labels=("event",))
+EVENT_QUEUE_DEPTH = REGISTRY.gauge("squat_event_queue_depth", "Events waiting for the event manager")
+
+write_path = "/home/mice/mice-squat/logs/events.journal"
 class EventManager:
-    def __init__(self, event_queue, dispenser):
+    def __init__(self, event_queue, dispenser, log_path=write_path,
+                 sync_every=DEFAULT_SYNC_EVERY, sync_interval=DEFAULT_SYNC_INTERVAL, lift_db=None, rotation=None):
         self.q = event_queue
         self.dispenser = dispenser
+        self.log_path = log_path
+        self.journal = EventJournal(log_path, sync_every=sync_every, sync_interval=sync_interval, rotation=rotation)
+        self.lift_db = lift_db
         self.ready_to_dispense = True
+        EVENT_QUEUE_DEPTH.set_function(self.q.qsize)
 
     def run(self):
         while True:
-            evt, payload, time = self.q.get()
-            self.log_event(evt, payload, time)
+            try:
+                # Wake up when buffered journal records are due, even if no further event arrives
+                evt, payload, t = self.q.get(timeout=self.journal.seconds_until_sync())
+            except queue.Empty:
+                self.journal.sync_if_due()
+                continue
+            EVENTS.labels(evt.name).inc()
+            EVENT_LATENCY.labels(evt.name).observe(time.time() - t)
+            self.log_event(evt, payload, t)
+            if self.lift_db is not None:
+                self.lift_db.observe(evt, payload, t)
             if evt == EventType.LIFT_DETECTED:
                 logging.info("Lift detected, dispensing pellet...")
                 print(f"[DEBUG] Lift detected event received in EventManager")
@@ -27,6 +49,4 @@ class EventManager:
 
     def log_event(self, evt, payload, t):
         logging.info(f"Event: {evt}, Payload: {payload}, Time: {t}")
-        with open(write_path, mode='a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([evt, payload, t])
+        self.journal.append(evt, payload, t)
@@ -3,6 +3,8 @@ This module defines event types used in the event management system.
 """
 
 from enum import Enum, auto
+from typing import NamedTuple
+
 class EventType(Enum):
     """
     Enumeration of different event types.
@@ -12,3 +14,16 @@ class EventType(Enum):
     PELLET_DISPENSED = auto()
     PELLET_DETECTED = auto()
     PELLET_TAKEN = auto()
+
+
+class LiftSummary(NamedTuple):
+    """
+    Payload of LIFT_COMPLETED: the whole lift, measured by the linear sensor thread.
+    """
+    start: float            # time.time() of LIFT_DETECTED
+    end: float
+    peak_mm: float
+    auc_mm_s: float         # trapezoidal integral of position over the lift
+    tut_s: float            # time under tension: time spent above the lift threshold
+    samples: int
+    flags: int = 0          # anomaly.py flag bits, 0 = normal lift (or not scored)
@@ -0,0 +1,431 @@
+"""
+Crash-safe, append-only binary journal of EventManager events.
+
+The journal replaces event_log.csv. Every event is one fixed-size 32 byte
+record protected by a CRC32:
+
+    b"EV" | event u8 | payload kind u8 | seq u32 | t f64 | payload f64 | reserved u32 | crc32 u32
+
+after a 32 byte file header (b"SQEJ", version, record size, creation time).
+Records are flushed to the OS as they are written, so a crashed process
+loses nothing; every `sync_every` records (or `sync_interval` seconds after
+an unsynced record, checked by sync_if_due() while the writer is idle too:
+EventManager calls it when its queue stays empty) the journal is fsync'd
+and a sync point is appended to the sparse time index
+in `<journal>.idx`: one (first record, count, t_min, t_max) entry per block
+of records. Event times are not strictly ordered (threads stamp events
+before queueing them), hence a range per block rather than a single time.
+
+On open, the writer drops a partial trailing record and index entries
+that point past the end of the file, then re-checks the records after the
+last sync point and truncates at the first one that fails its CRC.
+Everything up to the last sync point was fsync'd and is trusted.
+
+JournalReader.query(t0, t1, types) only reads the blocks whose time range
+overlaps [t0, t1], plus the short unindexed tail.
+
+With a RotationPolicy the live journal rolls over by size or wall-clock
+time into `events-<stamp>.journal` segments (index alongside), which are
+pruned by the policy's retention but never compressed, so they stay
+seekable. The reader treats the segments and the live file as one journal.
+
+    python run_core/journal.py info  /home/mice/mice-squat/logs/events.journal
+    python run_core/journal.py dump  events.journal --from 2026-04-16T09:00 --type LIFT_COMPLETED > lifts.csv
+    python run_core/journal.py import-csv event_log.csv events.journal
+"""
+
+import argparse
+import csv
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from events import EventType, LiftSummary
+from log_rotation import RotationPolicy, next_rollover, rotate_file, segments
+
+MAGIC = b"SQEJ"
+VERSION = 1
+RECORD_MAGIC = b"EV"
+
+_HEADER = struct.Struct("<4sHHd16x")
+_RECORD = struct.Struct("<2sBBIddII")
+_INDEX = struct.Struct("<QIdd")
+HEADER_SIZE = _HEADER.size
+RECORD_SIZE = _RECORD.size
+
+DEFAULT_SYNC_EVERY = 64
+DEFAULT_SYNC_INTERVAL = 5.0
+
+# Payload kinds; events carry a position (float), a sensor state (bool) or nothing.
+# LIFT_COMPLETED's LiftSummary is journaled as its peak position.
+_NONE, _FLOAT, _BOOL, _INT = range(4)
+
+
+class JournalError(ValueError):
+    pass
+
+
+class Event(NamedTuple):
+    seq: int
+    event: Union[EventType, int]        # int only for event values this build does not know
+    payload: Union[None, float, bool, int]
+    t: float
+
+
+def index_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".idx")
+
+
+def _pack(seq: int, evt: EventType, payload, t: float) -> bytes:
+    if payload is None:
+        kind, value = _NONE, 0.0
+    elif isinstance(payload, bool):
+        kind, value = _BOOL, float(payload)
+    elif isinstance(payload, int):
+        kind, value = _INT, float(payload)
+    elif isinstance(payload, float):
+        kind, value = _FLOAT, payload
+    elif isinstance(payload, LiftSummary):
+        # The full summary goes to the lift database; the journal keeps the peak
+        kind, value = _FLOAT, payload.peak_mm
+    else:
+        raise TypeError(f"cannot journal {type(payload).__name__} payload for {evt.name}")
+    body = _RECORD.pack(RECORD_MAGIC, evt.value, kind, seq & 0xFFFFFFFF, t, value, 0, 0)[:-4]
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def _unpack(buf, offset: int = 0) -> Optional[Event]:
+    """Decode one record, or None if it is torn or corrupt."""
+    if len(buf) - offset < RECORD_SIZE:
+        return None
+    magic, value, kind, seq, t, payload, _, crc = _RECORD.unpack_from(buf, offset)
+    if magic != RECORD_MAGIC or zlib.crc32(buf[offset:offset + RECORD_SIZE - 4]) != crc:
+        return None
+    try:
+        evt = EventType(value)
+    except ValueError:
+        evt = value
+    if kind == _NONE:
+        payload = None
+    elif kind == _BOOL:
+        payload = bool(payload)
+    elif kind == _INT:
+        payload = int(payload)
+    return Event(seq, evt, payload, t)
+
+
+def _read_header(f):
+    data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE:
+        raise JournalError(f"{f.name} is too short to be an event journal")
+    magic, version, record_size, created = _HEADER.unpack(data)
+    if magic != MAGIC:
+        raise JournalError(f"{f.name} is not an event journal")
+    if version > VERSION or record_size != RECORD_SIZE:
+        raise JournalError(f"{f.name}: unsupported journal version {version} (record size {record_size})")
+    return created
+
+
+def _load_index(path: Path, n_records: int) -> List[tuple]:
+    """Index entries that are contiguous from record 0 and lie inside the journal."""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return []
+    entries = []
+    expected = 0
+    for offset in range(0, len(data) - _INDEX.size + 1, _INDEX.size):
+        entry = _INDEX.unpack_from(data, offset)
+        first, count = entry[0], entry[1]
+        if first != expected or first + count > n_records:
+            break
+        entries.append(entry)
+        expected = first + count
+    return entries
+
+
+class EventJournal:
+    """
+    Append side of the journal. Opening an existing journal recovers it
+    and continues after its last intact record.
+    """
+    def __init__(self, path, sync_every: int = DEFAULT_SYNC_EVERY, sync_interval: float = DEFAULT_SYNC_INTERVAL,
+                 rotation: Optional[RotationPolicy] = None):
+        self.path = Path(path)
+        self.index_path = index_path(self.path)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.rotation = rotation._replace(compress=False) if rotation is not None else None
+        self.truncated_bytes = 0
+        self.next_seq = 0
+
+        if self.path.exists() and self.path.stat().st_size > 0:
+            self._recover()
+        else:
+            self._create()
+        self._open()
+
+    def _create(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.created = time.time()
+        with open(self.path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, RECORD_SIZE, self.created))
+            f.flush()
+            os.fsync(f.fileno())
+        self.index_path.write_bytes(b"")
+        self.records = 0
+        self._indexed = 0
+        self._pending_t = []
+
+    def _open(self):
+        self._f = open(self.path, "ab")
+        self._index_f = open(self.index_path, "ab")
+        self._last_sync = time.monotonic()
+        self._rollover_at = next_rollover(self.created, self.rotation.interval) if self.rotation else float("inf")
+
+    def _recover(self):
+        size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            self.created = _read_header(f)
+            n_records = (size - HEADER_SIZE) // RECORD_SIZE
+            entries = _load_index(self.index_path, n_records)
+            indexed = entries[-1][0] + entries[-1][1] if entries else 0
+
+            # Everything before the last sync point was fsync'd; re-check the rest
+            f.seek(HEADER_SIZE + indexed * RECORD_SIZE)
+            tail = f.read((n_records - indexed) * RECORD_SIZE)
+        tail_events = []
+        for offset in range(0, len(tail), RECORD_SIZE):
+            event = _unpack(tail, offset)
+            if event is None:
+                break
+            tail_events.append(event)
+
+        self.records = indexed + len(tail_events)
+        end = HEADER_SIZE + self.records * RECORD_SIZE
+        if end < size:
+            self.truncated_bytes = size - end
+            logging.warning(f"Event journal {self.path}: dropped {self.truncated_bytes} bytes of torn/corrupt tail")
+            os.truncate(self.path, end)
+        with open(self.index_path, "wb") as f:
+            f.write(b"".join(_INDEX.pack(*entry) for entry in entries))
+
+        if tail_events:
+            self.next_seq = tail_events[-1].seq + 1
+        elif self.records:
+            with open(self.path, "rb") as f:
+                f.seek(end - RECORD_SIZE)
+                self.next_seq = _unpack(f.read(RECORD_SIZE)).seq + 1
+        else:
+            self.next_seq = 0
+        self._indexed = indexed
+        self._pending_t = [event.t for event in tail_events]
+
+    def append(self, evt: EventType, payload, t: float):
+        if self.rotation is not None and self.records and (
+                time.time() >= self._rollover_at or
+                (self.rotation.max_bytes and HEADER_SIZE + self.records * RECORD_SIZE >= self.rotation.max_bytes)):
+            self.rotate()
+        self._f.write(_pack(self.next_seq, evt, payload, t))
+        self._f.flush()
+        self.next_seq += 1
+        self.records += 1
+        self._pending_t.append(t)
+        if len(self._pending_t) >= self.sync_every:
+            self.sync()
+        else:
+            self.sync_if_due()
+
+    def seconds_until_sync(self) -> Optional[float]:
+        """Seconds until unsynced records are due for sync_if_due(); None when everything is synced."""
+        if not self._pending_t:
+            return None
+        return max(0.0, self.sync_interval - (time.monotonic() - self._last_sync))
+
+    def sync_if_due(self):
+        """sync() once records have waited sync_interval seconds; call it periodically between appends."""
+        if self._pending_t and time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """fsync the journal and record a sync point for the records since the last one."""
+        self._last_sync = time.monotonic()
+        if not self._pending_t:
+            return
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        count = len(self._pending_t)
+        self._index_f.write(_INDEX.pack(self._indexed, count, min(self._pending_t), max(self._pending_t)))
+        self._index_f.flush()
+        os.fsync(self._index_f.fileno())
+        self._indexed += count
+        self._pending_t = []
+
+    def rotate(self):
+        """Close the live journal as a segment and start a new one; sequence numbers carry on."""
+        self.close()
+        rotate_file(self.path, self.rotation or RotationPolicy(compress=False), companions=(".idx",))
+        self._create()
+        self._open()
+
+    def close(self):
+        self.sync()
+        self._f.close()
+        self._index_f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JournalReader:
+    """
+    Read side over the rotated segments and the live journal; safe to use
+    while a writer is appending (it sees the records present when each
+    query starts).
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        files = self.files()
+        if not files:
+            raise JournalError(f"No event journal at {self.path}")
+        with open(files[0], "rb") as f:
+            self.created = _read_header(f)
+
+    def files(self) -> List[Path]:
+        """Uncompressed rotated segments, oldest first, then the live journal."""
+        files = [p for p in segments(self.path) if p.suffix != ".gz"]
+        if self.path.exists():
+            files.append(self.path)
+        return files
+
+    @staticmethod
+    def _snapshot(path: Path):
+        n_records = max(0, (path.stat().st_size - HEADER_SIZE) // RECORD_SIZE)
+        entries = _load_index(index_path(path), n_records)
+        return n_records, entries
+
+    def __len__(self):
+        return sum(self._snapshot(path)[0] for path in self.files())
+
+    def _read_range(self, f, first: int, count: int) -> Iterator[Event]:
+        f.seek(HEADER_SIZE + first * RECORD_SIZE)
+        data = f.read(count * RECORD_SIZE)
+        for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+            event = _unpack(data, offset)
+            if event is not None:
+                yield event
+
+    def query(self, t0: Optional[float] = None, t1: Optional[float] = None,
+              types: Optional[Iterable[EventType]] = None) -> List[Event]:
+        """Events with t0 <= t <= t1 (either bound may be None), optionally of the given types, in journal order."""
+        lo = float("-inf") if t0 is None else t0
+        hi = float("inf") if t1 is None else t1
+        wanted = set(types) if types is not None else None
+
+        events = []
+        for path in self.files():
+            n_records, entries = self._snapshot(path)
+            ranges = [(first, count) for first, count, t_min, t_max in entries if t_max >= lo and t_min <= hi]
+            indexed = entries[-1][0] + entries[-1][1] if entries else 0
+            if indexed < n_records:
+                ranges.append((indexed, n_records - indexed))
+            if not ranges:
+                continue
+            with open(path, "rb") as f:
+                for first, count in ranges:
+                    for event in self._read_range(f, first, count):
+                        if lo <= event.t <= hi and (wanted is None or event.event in wanted):
+                            events.append(event)
+        return events
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self.query())
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+def _parse_time(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def _event_name(evt) -> str:
+    return evt.name if isinstance(evt, EventType) else str(evt)
+
+
+def import_csv(csv_path, journal_path) -> int:
+    """Copy an old event_log.csv ("EventType.X,payload,time" rows) into a journal."""
+    count = 0
+    with open(csv_path, newline="") as f, EventJournal(journal_path) as journal:
+        for row in csv.reader(f):
+            if len(row) != 3 or not row[0].startswith("EventType."):
+                continue
+            payload = row[1]
+            if payload in ("", "None"):
+                value = None
+            elif payload in ("True", "False"):
+                value = payload == "True"
+            else:
+                value = float(payload)
+            journal.append(EventType[row[0].split(".", 1)[1]], value, float(row[2]))
+            count += 1
+    return count
+
+
+def main():
+    p = argparse.ArgumentParser(description="Inspect the run_core event journal")
+    sub = p.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="record counts per event type and the time span")
+    info.add_argument("journal")
+    dump = sub.add_parser("dump", help="write events as CSV to stdout")
+    dump.add_argument("journal")
+    dump.add_argument("--from", dest="t0", type=_parse_time, help="unix time or ISO datetime")
+    dump.add_argument("--to", dest="t1", type=_parse_time, help="unix time or ISO datetime")
+    dump.add_argument("--type", dest="types", action="append", choices=[e.name for e in EventType])
+    imp = sub.add_parser("import-csv", help="convert an old event_log.csv")
+    imp.add_argument("csv")
+    imp.add_argument("journal")
+    args = p.parse_args()
+
+    if args.command == "import-csv":
+        print(f"Imported {import_csv(args.csv, args.journal)} events into {args.journal}")
+        return
+
+    reader = JournalReader(args.journal)
+    if args.command == "dump":
+        types = [EventType[name] for name in args.types] if args.types else None
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["seq", "event", "payload", "time"])
+        for event in reader.query(args.t0, args.t1, types):
+            writer.writerow([event.seq, _event_name(event.event), "" if event.payload is None else event.payload,
+                             f"{event.t:.6f}"])
+        return
+
+    events = reader.query()
+    files = reader.files()
+    n_records, entries = reader._snapshot(files[-1])
+    print(f"{args.journal}: {len(events)} records in {len(files)} file(s); live file has {n_records} records, "
+          f"{len(entries)} sync points, {n_records - (entries[-1][0] + entries[-1][1] if entries else 0)} after the last one")
+    if events:
+        first, last = min(e.t for e in events), max(e.t for e in events)
+        print(f"  {datetime.fromtimestamp(first):%Y-%m-%d %H:%M:%S} .. {datetime.fromtimestamp(last):%Y-%m-%d %H:%M:%S}")
+    counts = {}
+    for event in events:
+        counts[_event_name(event.event)] = counts.get(_event_name(event.event), 0) + 1
+    for name, count in sorted(counts.items()):
+        print(f"  {name:<18} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Per-lift records in a local SQLite database.
+
+EventManager feeds every event to LiftDatabase.observe(), which pairs them
+into one row per lift: station, session, start/end, peak, AUC and TUT (from
+the LiftSummary on LIFT_COMPLETED), the dispense latency (LIFT_DETECTED ->
+PELLET_DISPENSED) and the pellet-taken latency (PELLET_DISPENSED ->
+PELLET_TAKEN). Each piece is an upsert on (session, start), so a row fills in
+as its events arrive and a crash loses at most one batch. Lifts that
+anomaly.py flagged also get a lift_anomalies row (flag bits and reasons)
+under the same key, which the queries can leave out.
+
+Writes never happen on the event manager thread: statements are queued to a
+writer thread that owns the connection and commits them in batches (up to
+`batch_size` statements, or whatever arrived within `flush_interval`
+seconds) in a single transaction. The database runs in WAL mode so
+dashboards and analysis can read while the station is writing.
+
+Read-side aggregates live in LiftQueries, which opens the file read-only:
+
+    q = LiftQueries("/home/mice/mice-squat/logs/lifts.sqlite3")
+    q.counts(by="night", station="squat-2")        # [(night, station, lifts), ...]
+    q.trend("tut_s", by="week", exclude_flagged=True)  # [(week, station, lifts, mean, min, max), ...]
+
+or from the shell: python run_core/lift_db.py counts|trend|lifts|flagged <db> ...
+"""
+
+import argparse
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from events import EventType, LiftSummary
+from metrics import REGISTRY
+
+COMMIT_SECONDS = REGISTRY.histogram("squat_lift_db_commit_seconds", "Time to commit one batch of lift records")
+PENDING_WRITES = REGISTRY.gauge("squat_lift_db_pending_writes", "Lift record writes waiting for the database thread")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id          INTEGER PRIMARY KEY,
+    station     TEXT NOT NULL,
+    started     REAL NOT NULL,
+    ended       REAL
+);
+CREATE TABLE IF NOT EXISTS lifts (
+    id                      INTEGER PRIMARY KEY,
+    session_id              INTEGER NOT NULL REFERENCES sessions(id),
+    station                 TEXT NOT NULL,
+    started                 REAL NOT NULL,
+    ended                   REAL,
+    peak_mm                 REAL,
+    auc_mm_s                REAL,
+    tut_s                   REAL,
+    samples                 INTEGER,
+    dispense_latency_s      REAL,
+    pellet_taken_latency_s  REAL,
+    UNIQUE (session_id, started)
+);
+CREATE INDEX IF NOT EXISTS lifts_station_started ON lifts (station, started);
+CREATE INDEX IF NOT EXISTS lifts_started ON lifts (started);
+CREATE TABLE IF NOT EXISTS lift_anomalies (
+    session_id  INTEGER NOT NULL REFERENCES sessions(id),
+    started     REAL NOT NULL,
+    flags       INTEGER NOT NULL,
+    reasons     TEXT NOT NULL,
+    PRIMARY KEY (session_id, started)
+);
+"""
+
+_UPSERT = """
+INSERT INTO lifts (session_id, station, started, ended, peak_mm, auc_mm_s, tut_s, samples,
+                   dispense_latency_s, pellet_taken_latency_s)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (session_id, started) DO UPDATE SET
+    ended = coalesce(excluded.ended, ended),
+    peak_mm = coalesce(excluded.peak_mm, peak_mm),
+    auc_mm_s = coalesce(excluded.auc_mm_s, auc_mm_s),
+    tut_s = coalesce(excluded.tut_s, tut_s),
+    samples = coalesce(excluded.samples, samples),
+    dispense_latency_s = coalesce(excluded.dispense_latency_s, dispense_latency_s),
+    pellet_taken_latency_s = coalesce(excluded.pellet_taken_latency_s, pellet_taken_latency_s)
+"""
+
+_FLAG = """
+INSERT INTO lift_anomalies (session_id, started, flags, reasons) VALUES (?, ?, ?, ?)
+ON CONFLICT (session_id, started) DO UPDATE SET flags = excluded.flags, reasons = excluded.reasons
+"""
+
+_STOP = object()
+
+
+def connect(path, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        return sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")       # WAL + NORMAL: durable at checkpoints, no fsync per commit
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class LiftDatabase:
+    def __init__(self, path, station: str, batch_size: int = 32, flush_interval: float = 2.0):
+        self.path = Path(path)
+        self.station = station
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        conn = connect(self.path)
+        self.session_id = conn.execute("INSERT INTO sessions (station, started) VALUES (?, ?)",
+                                       (station, time.time())).lastrowid
+        conn.close()
+
+        self._writes = queue.Queue()
+        PENDING_WRITES.set_function(self._writes.qsize)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="lift_db")
+        self._thread.start()
+
+        self._lift_start = None
+        self._dispensed_at = None
+
+    # ── Event correlation (event manager thread) ─────────────────────────────
+    def observe(self, evt: EventType, payload, t: float):
+        if evt == EventType.LIFT_DETECTED:
+            self._lift_start, self._dispensed_at = t, None
+
+        elif evt == EventType.LIFT_COMPLETED and isinstance(payload, LiftSummary):
+            self._upsert(payload.start, ended=payload.end, peak_mm=payload.peak_mm, auc_mm_s=payload.auc_mm_s,
+                         tut_s=payload.tut_s, samples=payload.samples)
+            if payload.flags:
+                # Flags are only set when [anomaly] scoring is enabled, so its module is loaded already
+                from anomaly import describe
+
+                self._writes.put((_FLAG, (self.session_id, payload.start, payload.flags, describe(payload.flags))))
+
+        elif evt == EventType.PELLET_DISPENSED and self._lift_start is not None and self._dispensed_at is None:
+            self._dispensed_at = t
+            self._upsert(self._lift_start, dispense_latency_s=t - self._lift_start)
+
+        elif evt == EventType.PELLET_TAKEN and self._dispensed_at is not None:
+            self._upsert(self._lift_start, pellet_taken_latency_s=t - self._dispensed_at)
+            self._lift_start, self._dispensed_at = None, None
+
+    def _upsert(self, started, ended=None, peak_mm=None, auc_mm_s=None, tut_s=None, samples=None,
+                dispense_latency_s=None, pellet_taken_latency_s=None):
+        self._writes.put((_UPSERT, (self.session_id, self.station, started, ended, peak_mm, auc_mm_s, tut_s,
+                                    samples, dispense_latency_s, pellet_taken_latency_s)))
+
+    # ── Writer thread ────────────────────────────────────────────────────────
+    def _run(self):
+        conn = connect(self.path)
+        stopping = False
+        while not stopping:
+            item = self._writes.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._writes.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._commit(conn, batch)
+        conn.execute("UPDATE sessions SET ended = ? WHERE id = ?", (time.time(), self.session_id))
+        conn.close()
+
+    def _commit(self, conn, batch):
+        start = time.monotonic()
+        try:
+            conn.execute("BEGIN")
+            for sql, params in batch:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # Lift records are bookkeeping; never let them take the runtime down
+            logging.error(f"Lift database write of {len(batch)} records failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        COMMIT_SECONDS.observe(time.monotonic() - start)
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending writes and mark the session ended."""
+        self._writes.put(_STOP)
+        self._thread.join(timeout)
+
+
+# ── Queries ───────────────────────────────────────────────────────────────────
+# Buckets are in local time; a "night" runs noon to noon and is named by the evening's date.
+_BUCKETS = {
+    "day": "date(started, 'unixepoch', 'localtime')",
+    "night": "date(started, 'unixepoch', 'localtime', '-12 hours')",
+    "week": "strftime('%Y-W%W', started, 'unixepoch', 'localtime')",
+}
+METRICS = ("peak_mm", "auc_mm_s", "tut_s", "dispense_latency_s", "pellet_taken_latency_s", "duration_s")
+
+
+def _where(station: Optional[str], t0: Optional[float], t1: Optional[float],
+           exclude_flagged: bool = False, table: str = "lifts") -> Tuple[str, list]:
+    """WHERE clause on `table`'s columns, qualified so it also works on joins."""
+    clauses, params = [], []
+    if exclude_flagged:
+        clauses.append(f"NOT EXISTS (SELECT 1 FROM lift_anomalies a "
+                       f"WHERE a.session_id = {table}.session_id AND a.started = {table}.started)")
+    if station is not None:
+        clauses.append(f"{table}.station = ?")
+        params.append(station)
+    if t0 is not None:
+        clauses.append(f"{table}.started >= ?")
+        params.append(t0)
+    if t1 is not None:
+        clauses.append(f"{table}.started < ?")
+        params.append(t1)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class LiftQueries:
+    """Aggregates computed in SQL, so callers only receive the rows they plot."""
+    def __init__(self, path):
+        self.conn = connect(path, readonly=True)
+
+    def close(self):
+        self.conn.close()
+
+    def counts(self, by: str = "night", station: Optional[str] = None,
+               t0: Optional[float] = None, t1: Optional[float] = None, exclude_flagged: bool = False) -> List[tuple]:
+        """(bucket, station, lifts, pellets taken) per station and day/night/week."""
+        bucket = _BUCKETS[by]
+        where, params = _where(station, t0, t1, exclude_flagged)
+        return self.conn.execute(
+            f"SELECT {bucket} AS bucket, station, count(*), count(pellet_taken_latency_s) FROM lifts{where} "
+            f"GROUP BY bucket, station ORDER BY bucket, station", params).fetchall()
+
+    def trend(self, metric: str, by: str = "week", station: Optional[str] = None,
+              t0: Optional[float] = None, t1: Optional[float] = None, exclude_flagged: bool = False) -> List[tuple]:
+        """(bucket, station, n, mean, min, max) of one per-lift metric."""
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r}; expected one of {', '.join(METRICS)}")
+        column = "ended - started" if metric == "duration_s" else metric
+        bucket = _BUCKETS[by]
+        where, params = _where(station, t0, t1, exclude_flagged)
+        return self.conn.execute(
+            f"SELECT {bucket} AS bucket, station, count({column}), avg({column}), min({column}), max({column}) "
+            f"FROM lifts{where} GROUP BY bucket, station ORDER BY bucket, station", params).fetchall()
+
+    def lifts(self, station: Optional[str] = None, t0: Optional[float] = None, t1: Optional[float] = None,
+              limit: Optional[int] = None, exclude_flagged: bool = False) -> List[sqlite3.Row]:
+        where, params = _where(station, t0, t1, exclude_flagged)
+        self.conn.row_factory = sqlite3.Row
+        try:
+            sql = f"SELECT * FROM lifts{where} ORDER BY started"
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+            return self.conn.execute(sql, params).fetchall()
+        finally:
+            self.conn.row_factory = None
+
+    def flagged(self, station: Optional[str] = None, t0: Optional[float] = None,
+                t1: Optional[float] = None) -> List[tuple]:
+        """(station, session, started, flags, reasons) of every flagged lift, for exclusion elsewhere."""
+        where, params = _where(station, t0, t1, table="lifts")
+        return self.conn.execute(
+            f"SELECT lifts.station, lifts.session_id, lifts.started, a.flags, a.reasons FROM lifts "
+            f"JOIN lift_anomalies a ON a.session_id = lifts.session_id AND a.started = lifts.started{where} "
+            f"ORDER BY lifts.started", params).fetchall()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Query the run_core lift database")
+    p.add_argument("mode", choices=("counts", "trend", "lifts", "flagged"))
+    p.add_argument("db")
+    p.add_argument("--metric", default="tut_s", choices=METRICS, help="for trend")
+    p.add_argument("--by", default=None, choices=tuple(_BUCKETS), help="default: night for counts, week for trend")
+    p.add_argument("--station")
+    p.add_argument("--limit", type=int, default=50, help="for lifts")
+    p.add_argument("--exclude-flagged", action="store_true", help="leave out lifts flagged as anomalous")
+    args = p.parse_args()
+
+    q = LiftQueries(args.db)
+    if args.mode == "counts":
+        print(f"{'bucket':<12} {'station':<14} {'lifts':>6} {'taken':>6}")
+        for bucket, station, lifts, taken in q.counts(args.by or "night", args.station,
+                                                      exclude_flagged=args.exclude_flagged):
+            print(f"{bucket:<12} {station:<14} {lifts:>6} {taken:>6}")
+    elif args.mode == "trend":
+        print(f"{'bucket':<12} {'station':<14} {'n':>6} {'mean':>9} {'min':>9} {'max':>9}   ({args.metric})")
+        for bucket, station, n, mean, lo, hi in q.trend(args.metric, args.by or "week", args.station,
+                                                        exclude_flagged=args.exclude_flagged):
+            if n:
+                print(f"{bucket:<12} {station:<14} {n:>6} {mean:>9.3f} {lo:>9.3f} {hi:>9.3f}")
+    elif args.mode == "flagged":
+        print("station,session,started,flags,reasons")
+        for row in q.flagged(args.station):
+            print(",".join(str(v) for v in row))
+    else:
+        rows = q.lifts(args.station, limit=args.limit, exclude_flagged=args.exclude_flagged)
+        if rows:
+            print(",".join(rows[0].keys()))
+        for row in rows:
+            print(",".join("" if v is None else str(v) for v in row))
+    q.close()
+
+
+if __name__ == "__main__":
+    main()
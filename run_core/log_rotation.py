@@ -0,0 +1,303 @@
+"""
+Size- and time-bounded rotation for runtime logs.
+
+A log keeps a stable live path (what `tail -f` and readers open). When the
+live file reaches `max_bytes`, or the wall clock crosses the next multiple
+of `interval` in local time (86400 = midnight, 3600 = on the hour), it is
+renamed to a segment stamped with the rollover time:
+
+    events.journal  ->  events-20261019-000000.journal
+    run_core.log    ->  run_core-20261019-000000.log.gz
+
+Closed segments are gzip'd on a single background thread, which then
+prunes the log's segments down to `keep` and drops any older than
+`max_age_days`, so the writing thread only ever pays for a rename.
+
+RotatingFile is the text writer behind RotatingCSVWriter (capture scripts)
+and RotatingLogHandler (the run_core log file); EventJournal rotates its
+own binary segments with rotate_file(). Rows are flushed every
+`flush_interval` seconds instead of after each one.
+
+This module only uses the standard library and has no run_core imports, so
+capture scripts can use it as `run_core.log_rotation`.
+"""
+
+import csv
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+STAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class RotationPolicy(NamedTuple):
+    max_bytes: int = 16 * 1024 * 1024   # 0 = no size limit
+    interval: float = 86400.0           # seconds, aligned to local wall-clock time; 0 = size only
+    keep: int = 30                      # rotated segments kept per log; 0 = keep all
+    max_age_days: float = 0.0           # delete rotated segments older than this; 0 = no limit
+    compress: bool = True
+
+
+def next_rollover(t: float, interval: float) -> float:
+    """First local wall-clock multiple of `interval` after t (inf when time rotation is off)."""
+    if interval <= 0:
+        return float("inf")
+    offset = time.localtime(t).tm_gmtoff
+    return ((t + offset) // interval + 1) * interval - offset
+
+
+def _segment_re(path: Path) -> "re.Pattern":
+    return re.compile(rf"{re.escape(path.stem)}-(\d{{8}}-\d{{6}})(?:-(\d+))?{re.escape(path.suffix)}(?:\.gz)?$")
+
+
+def segments(path) -> List[Path]:
+    """Rotated segments of a log, oldest first (compressed ones included)."""
+    path = Path(path)
+    pattern = _segment_re(path)
+    if not path.parent.is_dir():
+        return []
+    found = []
+    for p in path.parent.iterdir():
+        match = pattern.match(p.name)
+        if match:
+            # Segments closed within the same second are numbered -1, -2, ... after the first
+            found.append(((match.group(1), int(match.group(2) or 0)), p))
+    return [p for _, p in sorted(found)]
+
+
+def segment_path(path, t: float) -> Path:
+    path = Path(path)
+    name = f"{path.stem}-{time.strftime(STAMP_FORMAT, time.localtime(t))}"
+    candidate, n = path.with_name(f"{name}{path.suffix}"), 1
+    while candidate.exists() or candidate.with_name(candidate.name + ".gz").exists():
+        candidate, n = path.with_name(f"{name}-{n}{path.suffix}"), n + 1
+    return candidate
+
+
+def prune(path, policy: RotationPolicy, now: Optional[float] = None, companions: Sequence[str] = ()):
+    """Apply the retention policy to a log's rotated segments (and their companion files)."""
+    now = time.time() if now is None else now
+    old = segments(path)
+    doomed = old[:-policy.keep] if policy.keep and len(old) > policy.keep else []
+    if policy.max_age_days > 0:
+        cutoff = now - policy.max_age_days * 86400
+        doomed += [p for p in old if p not in doomed and p.stat().st_mtime < cutoff]
+    for segment in doomed:
+        for victim in [segment, *(segment.with_name(segment.name + c) for c in companions)]:
+            try:
+                victim.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class _Compressor:
+    """One daemon thread per process that gzips closed segments and prunes afterwards."""
+    def __init__(self):
+        self._tasks = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, segment: Optional[Path], path: Path, policy: RotationPolicy, companions: Sequence[str]):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="log_compressor")
+                self._thread.start()
+        self._tasks.put((segment, path, policy, companions))
+
+    def _run(self):
+        while True:
+            segment, path, policy, companions = self._tasks.get()
+            try:
+                if segment is not None and policy.compress:
+                    _gzip(segment)
+                prune(path, policy, companions=companions)
+            except OSError as e:
+                logging.warning(f"Log rotation for {path} failed: {e}")
+            finally:
+                self._tasks.task_done()
+
+    def wait(self):
+        """Block until every submitted segment is compressed and pruned."""
+        self._tasks.join()
+
+
+def _gzip(segment: Path):
+    import gzip
+    import shutil
+
+    target = segment.with_name(segment.name + ".gz")
+    tmp = segment.with_name(segment.name + ".gz.tmp")
+    with open(segment, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(tmp, target)
+    segment.unlink()
+
+
+COMPRESSOR = _Compressor()
+
+
+def rotate_file(path, policy: RotationPolicy, t: Optional[float] = None, companions: Sequence[str] = ()) -> Path:
+    """
+    Rename a closed live file (and companion files such as ".idx") to a
+    stamped segment and hand it to the background compressor/pruner.
+    """
+    path = Path(path)
+    segment = segment_path(path, time.time() if t is None else t)
+    os.replace(path, segment)
+    for companion in companions:
+        live = path.with_name(path.name + companion)
+        if live.exists():
+            os.replace(live, segment.with_name(segment.name + companion))
+    COMPRESSOR.submit(segment, path, policy, companions)
+    return segment
+
+
+class RotatingFile:
+    """
+    Text file that rolls over by size or wall-clock time. `header` is
+    written at the top of every segment (e.g. a CSV header row).
+    """
+    def __init__(self, path, policy: RotationPolicy = RotationPolicy(), header: str = "",
+                 flush_interval: float = 1.0, encoding: str = "utf-8"):
+        self.path = Path(path)
+        self.policy = policy
+        self.header = header
+        self.flush_interval = flush_interval
+        self.encoding = encoding
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        now = time.time()
+        if self.path.exists() and self.path.stat().st_size > 0:
+            stat = self.path.stat()
+            # A file left over from an earlier period or already full is rotated before appending
+            if now >= next_rollover(stat.st_mtime, policy.interval) or \
+                    (policy.max_bytes and stat.st_size >= policy.max_bytes):
+                rotate_file(self.path, policy, now)
+        self._open(now)
+
+    def _open(self, now: float):
+        self._f = open(self.path, "a", newline="", encoding=self.encoding)
+        self._size = self._f.tell()
+        self._rollover_at = next_rollover(now, self.policy.interval)
+        self._last_flush = now
+        if self._size == 0 and self.header:
+            self._f.write(self.header)
+            self._size += self._encoded_len(self.header)
+
+    def _encoded_len(self, text: str) -> int:
+        """Bytes `text` takes on disk; ASCII skips the encode."""
+        return len(text) if text.isascii() else len(text.encode(self.encoding))
+
+    def write(self, text: str):
+        now = time.time()
+        if now >= self._rollover_at or (self.policy.max_bytes and self._size >= self.policy.max_bytes):
+            self.rotate(now)
+        self._f.write(text)
+        self._size += self._encoded_len(text)
+        if now - self._last_flush >= self.flush_interval:
+            self._f.flush()
+            self._last_flush = now
+
+    def rotate(self, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self._f.close()
+        rotate_file(self.path, self.policy, now)
+        self._open(now)
+
+    def flush(self):
+        self._f.flush()
+        self._last_flush = time.time()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Line:
+    """Minimal file object that captures one csv-formatted line."""
+    def __init__(self):
+        self.text = ""
+
+    def write(self, text):
+        self.text = text
+
+
+class RotatingCSVWriter:
+    """
+    csv.writer over a RotatingFile; every segment starts with the header row
+    so each one loads on its own (pd.read_csv reads the .gz segments as-is).
+    """
+    def __init__(self, path, fieldnames: Sequence[str], policy: RotationPolicy = RotationPolicy(),
+                 flush_interval: float = 1.0):
+        self.fieldnames = list(fieldnames)
+        self._line = _Line()
+        self._csv = csv.writer(self._line)
+        self._csv.writerow(self.fieldnames)
+        self.file = RotatingFile(path, policy, header=self._line.text, flush_interval=flush_interval)
+
+    @property
+    def path(self) -> Path:
+        return self.file.path
+
+    def writerow(self, row):
+        """A sequence in fieldnames order, or a dict keyed by fieldname."""
+        if isinstance(row, dict):
+            row = [row.get(name, "") for name in self.fieldnames]
+        self._csv.writerow(row)
+        self.file.write(self._line.text)
+
+    def writerows(self, rows: Iterable):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RotatingLogHandler(logging.Handler):
+    """logging handler writing to a RotatingFile; WARNING and above are flushed immediately."""
+    def __init__(self, path, policy: RotationPolicy = RotationPolicy(), flush_interval: float = 1.0):
+        super().__init__()
+        self.file = RotatingFile(path, policy, flush_interval=flush_interval)
+
+    def emit(self, record):
+        try:
+            self.file.write(self.format(record) + "\n")
+            if record.levelno >= logging.WARNING:
+                self.file.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            self.file.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            self.file.close()
+        finally:
+            self.release()
+        super().close()
@@ -1,38 +1,159 @@
+import argparse
+import atexit
+import logging
 import queue
-from collections import deque
+import signal
+import sys
+import threading
 
 from run_core.threads.dispenser_thread import DispenserThread
-from run_core.threads.linear_sensor_thread import LinearSensorThread
 from run_core.threads.ltc_thread import LTCThread
-from run_core.threads.linear_sensor_plot_thread import PlotThread
+from config import ConfigError, load_settings
 from event_manager import EventManager
+from log_rotation import RotatingLogHandler, RotationPolicy
+from metrics import start_http_server
+from supervisor import Supervisor
 
-from utils import init_hardware, init_pi, check_all_hardware
+from utils import (init_hardware, init_pi, check_all_hardware, display_available,
+                   make_anomaly_detector, make_linear_sensor_thread, reconnect_linear_sensor)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mice squat press runtime")
+    parser.add_argument("--config", help="Station config file (default: $SQUAT_CONFIG or run_core/station.toml)")
+    parser.add_argument("--station", help="Station overrides to apply (default: $SQUAT_STATION or hostname)")
+    display = parser.add_mutually_exclusive_group()
+    display.add_argument("--plot", dest="plot", action="store_true", default=None,
+                         help="Show the live linear sensor plot")
+    display.add_argument("--headless", dest="plot", action="store_false",
+                         help="Skip plotting entirely (default when no display is attached)")
+    return parser.parse_args(argv)
+
+def enable_profiling(profiling_settings, linear_sensor):
+    """Patch the hot paths with sampling timers and dump them on exit / SIGUSR1."""
+    import profiling
+    from run_core.threads.linear_sensor_thread import LinearSensorThread
+
+    profiling.enable(profiling_settings.sample_every)
+    if linear_sensor is not None:
+        profiling.instrument(type(linear_sensor), "read_sample", "send_command", "get_position", "interpolate")
+    profiling.instrument(LinearSensorThread, "validate_lift")
+    profiling.instrument(EventManager, "log_event")
+
+    output = profiling_settings.output
+    atexit.register(profiling.dump, output)
+
+    # dump() takes the profiler lock, which the interrupted main thread may hold,
+    # so the signal handler only asks and a worker thread does the dumping
+    dump_requested = threading.Event()
+
+    def dump_on_request():
+        while True:
+            dump_requested.wait()
+            dump_requested.clear()
+            profiling.dump(output)
+
+    threading.Thread(target=dump_on_request, daemon=True, name="profile-dump").start()
+    signal.signal(signal.SIGUSR1, lambda signum, frame: dump_requested.set())
+    logging.info(f"Hot-path profiling enabled (1 in {profiling_settings.sample_every}), dumping to {output}")
+
+def rotation_policy(log_rotation):
+    return RotationPolicy(log_rotation.max_bytes, log_rotation.interval, log_rotation.keep,
+                          log_rotation.max_age_days, log_rotation.compress)
+
+def enable_log_file(log_rotation):
+    """Send INFO and above to the rotating run_core log; the console keeps warnings and errors."""
+    handler = RotatingLogHandler(log_rotation.log_file, rotation_policy(log_rotation))
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(threadName)s] %(message)s"))
+    console = logging.StreamHandler()
+    console.setLevel(logging.WARNING)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.addHandler(console)
+    root.setLevel(logging.INFO)
+    atexit.register(handler.close)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        settings = load_settings(args.config, args.station)
+    except ConfigError as e:
+        logging.error(f"Invalid station configuration: {e}")
+        sys.exit(1)
+    if settings.log_rotation.log_file:
+        enable_log_file(settings.log_rotation)
+    logging.info(f"Loaded configuration for station '{settings.name}'")
+
+    plot_enabled = args.plot
+    if plot_enabled is None:
+        plot_enabled = settings.plot.enabled
+    if plot_enabled is None:
+        plot_enabled = display_available()
+
+    if settings.metrics.enabled:
+        try:
+            start_http_server(settings.metrics.port, settings.metrics.host)
+        except OSError as e:
+            # Metrics are diagnostics only; never block trials on them
+            logging.warning(f"Could not start metrics endpoint: {e}")
 
-def main():
     pi, linear_sensor, motor = None, None, None
 
     pi = init_pi()
-    linear_sensor, ltc, motor = init_hardware(pi)
+    linear_sensor, ltc, motor = init_hardware(pi, settings)
     check_all_hardware(pi, ltc, motor)
 
+    if settings.profiling.enabled:
+        enable_profiling(settings.profiling, linear_sensor)
+
     event_queue = queue.Queue()
-    plot_queue = queue.Queue()
+    plot_queue = queue.Queue() if plot_enabled else None
+    # One detector for every restart of the sensor thread, so its lift history survives
+    anomaly_detector = make_anomaly_detector(settings.anomaly)
 
-    linear_thread = LinearSensorThread(linear_sensor, event_queue, 
-                        plot_queue, mm_threshold=10, recent_lifts=deque())
-    ltc_thread = LTCThread(ltc, event_queue)
-    dispenser_thread = DispenserThread(motor, event_queue)
-    plot_thread = PlotThread(plot_queue, sample_window=200)
+    def new_linear_thread():
+        return make_linear_sensor_thread(linear_sensor, event_queue, plot_queue, settings.lift, anomaly_detector)
 
-    linear_thread.start()
-    ltc_thread.start()
+    def new_ltc_thread():
+        return LTCThread(ltc, event_queue, poll_interval=settings.photo_interruptor.poll_interval)
+
+    dispenser_thread = DispenserThread(motor, event_queue)
     dispenser_thread.start()
-    plot_thread.start()
-    
+
+    watchdog = settings.watchdog
+    if watchdog.enabled:
+        supervisor = Supervisor(watchdog.check_interval, watchdog.restart_backoff, watchdog.max_backoff,
+                                watchdog.stop_timeout)
+        supervisor.supervise("linear_sensor", new_linear_thread, watchdog.sensor_stall_timeout,
+                             on_restart=lambda: reconnect_linear_sensor(linear_sensor))
+        supervisor.supervise("ltc", new_ltc_thread, watchdog.ltc_stall_timeout)
+        supervisor.start()
+    else:
+        new_linear_thread().start()
+        new_ltc_thread().start()
+
+    if plot_enabled:
+        # matplotlib is only pulled in when a display will actually be used
+        from run_core.threads.linear_sensor_plot_thread import PlotThread
+
+        plot_thread = PlotThread(plot_queue, sample_window=settings.plot.sample_window)
+        plot_thread.start()
+
+    lift_db = None
+    if settings.lift_db.enabled:
+        # sqlite3 is only loaded when lift records are kept
+        from lift_db import LiftDatabase
+
+        lift_db = LiftDatabase(settings.lift_db.path, station=settings.name,
+                               batch_size=settings.lift_db.batch_size,
+                               flush_interval=settings.lift_db.flush_interval)
+        atexit.register(lift_db.close)
+
     # Main controller
-    manager = EventManager(event_queue, dispenser_thread)
+    event_log = settings.event_log
+    manager = EventManager(event_queue, dispenser_thread, log_path=event_log.path,
+                           sync_every=event_log.sync_every, sync_interval=event_log.sync_interval,
+                           lift_db=lift_db, rotation=rotation_policy(settings.log_rotation))
     manager.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
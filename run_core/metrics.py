@@ -0,0 +1,222 @@
+"""
+Lightweight runtime metrics for run_core.
+
+Counters, gauges and histograms are registered once at import time in a
+process-wide REGISTRY and updated from the hot paths. Each update is a
+lock-protected add (histograms also do one bisect over a short bucket
+list), so they are cheap enough to leave on in production.
+
+start_http_server() exposes the registry on a local port in the
+Prometheus text exposition format:
+
+    curl http://127.0.0.1:9108/metrics
+"""
+
+import logging
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers serial round trips (~1-5 ms) up to slow dispenses (~seconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonically increasing value. Can instead mirror a callable, e.g. a driver's own error count."""
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+    def _samples(self, name, label_names, label_values):
+        yield f"{name}_total{_format_labels(label_names, label_values)} {_format_value(self.get())}"
+
+
+class Gauge:
+    """Value that can go up and down, or be computed at scrape time from a callable."""
+    def __init__(self):
+        self._value = 0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+    def _samples(self, name, label_names, label_values):
+        yield f"{name}{_format_labels(label_names, label_values)} {_format_value(self.get())}"
+
+
+class Histogram:
+    """Fixed-bucket histogram; buckets are preallocated so observe() never allocates."""
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._upper_bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._upper_bounds) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def _samples(self, name, label_names, label_values):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self._upper_bounds + (math.inf,), counts):
+            cumulative += count
+            le = ("le", _format_value(bound))
+            yield f"{name}_bucket{_format_labels(label_names, label_values, le)} {cumulative}"
+        yield f"{name}_sum{_format_labels(label_names, label_values)} {_format_value(total)}"
+        yield f"{name}_count{_format_labels(label_names, label_values)} {cumulative}"
+
+
+class MetricFamily:
+    """A named metric, optionally split by labels into one child per label value tuple."""
+    def __init__(self, name: str, help_text: str, kind: str, factory: Callable, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.label_names:
+            self._children[()] = factory()
+
+    def labels(self, *values):
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def __getattr__(self, attr):
+        # Unlabelled families forward inc()/set()/observe() straight to their only child
+        if attr.startswith("_") or self.label_names:
+            raise AttributeError(attr)
+        return getattr(self._children[()], attr)
+
+    def render(self):
+        # 0.0.4 text format: HELP/TYPE name the series, and a counter's samples are <name>_total
+        exposed = f"{self.name}_total" if self.kind == "counter" else self.name
+        yield f"# HELP {exposed} {self.help}"
+        yield f"# TYPE {exposed} {self.kind}"
+        for values, child in list(self._children.items()):
+            yield from child._samples(self.name, self.label_names, values)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name, help_text, kind, factory, label_names):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = MetricFamily(name, help_text, kind, factory, label_names)
+                self._families[name] = family
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name} already registered as a {family.kind}")
+            return family
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, help_text, "counter", Counter, labels)
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, help_text, "gauge", Gauge, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> MetricFamily:
+        return self._register(name, help_text, "histogram", lambda: Histogram(buckets), labels)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for family in list(self._families.values()):
+            try:
+                lines.extend(family.render())
+            except Exception as e:
+                # A broken gauge callback must not take down the whole scrape
+                logging.warning(f"Failed to render metric {family.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def start_http_server(port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+    """Serve the registry at http://host:port/metrics from a daemon thread."""
+    # http.server drags in email/html/mimetypes; keep it off the startup path
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes every few seconds would otherwise flood stderr
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,277 @@
+"""
+Opt-in, sampling hot-path profiler for run_core.
+
+Functions are timed either by decorating them with @profiled("name"), by
+wrapping a block in `with section("name"):`, or by patching existing
+methods at startup with instrument(cls, "method", ...). Nothing is timed
+until enable() is called, and instrument() is only used when profiling is
+switched on, so the normal runtime pays nothing.
+
+Sampling is decided at the outermost instrumented call on each thread:
+one in every `sample_every` root calls is timed together with every
+instrumented call nested inside it, so nested paths such as
+"get_position;send_command" stay consistent. Timings land in
+preallocated log2 nanosecond histograms keyed by that path.
+
+Dump the collected data with dump() (also on exit and on SIGUSR1 when
+enabled from main.py) and inspect it with:
+
+    python run_core/profiling.py summary /tmp/squat_profile.json
+    python run_core/profiling.py folded  /tmp/squat_profile.json > out.folded
+    python run_core/profiling.py tree    /tmp/squat_profile.json
+"""
+
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+N_BUCKETS = 40                  # 2**39 ns ~ 9 minutes; anything longer lands in the last bucket
+DEFAULT_SAMPLE_EVERY = 16
+DEFAULT_OUTPUT = "/tmp/squat_profile.json"
+
+_UNSAMPLED = object()           # stack marker: inside a root call we chose not to time
+
+
+class PathStats:
+    """Per-path timing histogram. Buckets are allocated once, observe() only increments."""
+    __slots__ = ("count", "total_ns", "self_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.self_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * N_BUCKETS
+
+    def observe(self, elapsed_ns: int, self_ns: int):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.self_ns += self_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[min(elapsed_ns.bit_length(), N_BUCKETS - 1)] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count, "total_ns": self.total_ns, "self_ns": self.self_ns,
+            "max_ns": self.max_ns, "buckets": self.buckets,
+        }
+
+
+class Profiler:
+    def __init__(self, sample_every: int = DEFAULT_SAMPLE_EVERY):
+        self.enabled = False
+        self.sample_every = sample_every
+        self.started = time.time()
+        self._calls: Dict[str, int] = {}
+        self._paths: Dict[str, PathStats] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def _path_stats(self, path: str) -> PathStats:
+        stats = self._paths.get(path)
+        if stats is None:
+            with self._lock:
+                stats = self._paths.setdefault(path, PathStats())
+        return stats
+
+    @contextmanager
+    def section(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._stack()
+        self._calls[name] = self._calls.get(name, 0) + 1
+
+        if stack and stack[-1] is _UNSAMPLED:
+            yield
+            return
+        if not stack and self._calls[name] % self.sample_every:
+            stack.append(_UNSAMPLED)
+            try:
+                yield
+            finally:
+                stack.pop()
+            return
+
+        # frame: [path, start_ns, child_ns]
+        path = f"{stack[-1][0]};{name}" if stack else name
+        frame = [path, time.perf_counter_ns(), 0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter_ns() - frame[1]
+            self._path_stats(path).observe(elapsed, elapsed - frame[2])
+            if stack:
+                stack[-1][2] += elapsed
+
+    def wrap(self, fn, name: Optional[str] = None):
+        name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            with self.section(name):
+                return fn(*args, **kwargs)
+
+        wrapper.__wrapped_profiled__ = fn
+        return wrapper
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._paths.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            paths = {path: stats.to_dict() for path, stats in self._paths.items()}
+        return {
+            "started": self.started,
+            "dumped": time.time(),
+            "sample_every": self.sample_every,
+            "calls": dict(self._calls),
+            "paths": paths,
+        }
+
+    def dump(self, path: str = DEFAULT_OUTPUT):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+
+PROFILER = Profiler()
+
+
+def enable(sample_every: int = DEFAULT_SAMPLE_EVERY):
+    PROFILER.sample_every = max(1, int(sample_every))
+    PROFILER.started = time.time()
+    PROFILER.enabled = True
+
+
+def disable():
+    PROFILER.enabled = False
+
+
+def section(name: str):
+    """Context manager timing the enclosed block under `name`."""
+    return PROFILER.section(name)
+
+
+def profiled(name: Optional[str] = None):
+    """Decorator timing every sampled call of the function under `name`."""
+    def decorator(fn):
+        return PROFILER.wrap(fn, name)
+    return decorator
+
+
+def instrument(cls, *method_names: str):
+    """Patch methods of an existing class in place, e.g. instrument(TMC2209, "step")."""
+    for method_name in method_names:
+        original = getattr(cls, method_name)
+        if hasattr(original, "__wrapped_profiled__"):
+            continue
+        setattr(cls, method_name, PROFILER.wrap(original, method_name))
+
+
+def dump(path: str = DEFAULT_OUTPUT):
+    PROFILER.dump(path)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+def _percentile_ns(buckets, q):
+    """Upper bound of the log2 bucket holding the q-th quantile."""
+    total = sum(buckets)
+    if total == 0:
+        return 0
+    target = q * total
+    running = 0
+    for i, count in enumerate(buckets):
+        running += count
+        if running >= target:
+            return 1 << i
+    return 1 << (len(buckets) - 1)
+
+
+def _fmt_ns(ns):
+    if ns >= 1e9:
+        return f"{ns / 1e9:.2f}s"
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f}ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.1f}us"
+    return f"{ns:.0f}ns"
+
+
+def print_summary(data):
+    elapsed = data["dumped"] - data["started"]
+    print(f"Profile over {elapsed:.1f}s, sampling 1 in {data['sample_every']} root calls\n")
+    print(f"{'path':<45} {'calls':>10} {'sampled':>8} {'mean':>9} {'p50<=':>9} {'p99<=':>9} {'max':>9} {'self%':>6}")
+    print("-" * 112)
+    total_self = sum(s["self_ns"] for s in data["paths"].values()) or 1
+    for path, s in sorted(data["paths"].items(), key=lambda kv: kv[1]["self_ns"], reverse=True):
+        leaf = path.rsplit(";", 1)[-1]
+        mean = s["total_ns"] / s["count"] if s["count"] else 0
+        print(
+            f"{path:<45} {data['calls'].get(leaf, 0):>10} {s['count']:>8} "
+            f"{_fmt_ns(mean):>9} {_fmt_ns(_percentile_ns(s['buckets'], 0.5)):>9} "
+            f"{_fmt_ns(_percentile_ns(s['buckets'], 0.99)):>9} {_fmt_ns(s['max_ns']):>9} "
+            f"{100 * s['self_ns'] / total_self:>5.1f}%"
+        )
+
+    roots = [p for p in data["paths"] if ";" not in p]
+    print("\nEstimated call rates:")
+    for root in sorted(roots):
+        calls = data["calls"].get(root, 0)
+        print(f"  {root:<30} {calls / elapsed if elapsed > 0 else 0:>10.1f} /s")
+
+
+def print_folded(data):
+    """Brendan Gregg folded-stack format (self time in microseconds), for flamegraph.pl / speedscope."""
+    for path, s in sorted(data["paths"].items()):
+        print(f"{path} {s['self_ns'] // 1000}")
+
+
+def print_tree(data):
+    """Indented flame-style tree of inclusive time per path."""
+    total = sum(s["total_ns"] for p, s in data["paths"].items() if ";" not in p) or 1
+    for path in sorted(data["paths"]):
+        s = data["paths"][path]
+        depth = path.count(";")
+        name = path.rsplit(";", 1)[-1]
+        share = 100 * s["total_ns"] / total
+        bar = "#" * max(1, round(share / 2.5))
+        print(f"{'  ' * depth}{name:<{40 - 2 * depth}} {share:>5.1f}% {_fmt_ns(s['total_ns'] / max(s['count'], 1)):>9}  {bar}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Summarize a run_core hot-path profile dump")
+    p.add_argument("mode", choices=("summary", "folded", "tree"))
+    p.add_argument("profile", nargs="?", default=DEFAULT_OUTPUT)
+    args = p.parse_args()
+
+    with open(args.profile) as f:
+        data = json.load(f)
+
+    {"summary": print_summary, "folded": print_folded, "tree": print_tree}[args.mode](data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Supervisor for run_core worker threads.
+
+Each supervised worker is a WorkerThread that calls heartbeat() while it
+makes progress. The supervisor polls every `check_interval` seconds and
+treats a worker as failed when its thread has died (e.g. an uncaught
+exception) or its last heartbeat is older than its `stall_timeout`. A
+failed worker is asked to stop and given `stop_timeout` seconds to exit,
+its `on_restart` hook runs (used to reopen the serial port), and a fresh
+thread from its factory is started. A worker that does not exit in time
+is left alone and retried on a later check, so its replacement never
+shares the serial connection with it.
+
+Recovery time is measured from the last heartbeat of the failed worker
+to the first heartbeat of its replacement, logged, and exported as a
+metric, so a failure costs seconds instead of the rest of the night.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from metrics import REGISTRY
+
+RESTARTS = REGISTRY.counter("squat_worker_restarts", "Worker threads restarted by the supervisor",
+                            labels=("worker", "reason"))
+RECOVERY_SECONDS = REGISTRY.histogram("squat_worker_recovery_seconds",
+                                      "Time from a worker's last heartbeat to its replacement's first",
+                                      labels=("worker",),
+                                      buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600))
+HEARTBEAT_AGE = REGISTRY.gauge("squat_worker_heartbeat_age_seconds", "Seconds since each worker's last heartbeat",
+                               labels=("worker",))
+
+
+@dataclass
+class _Supervised:
+    name: str
+    factory: Callable[[], "threading.Thread"]
+    stall_timeout: float
+    on_restart: Optional[Callable[[], None]]
+    thread: "threading.Thread" = None
+    restarts: int = 0
+    backoff: float = 0.0
+    next_restart: float = 0.0
+    outage_start: Optional[float] = None    # last heartbeat before the failure
+    pending_heartbeats: int = 0             # heartbeat count of the replacement at start
+    last_recovery: Optional[float] = None
+    history: list = field(default_factory=list)
+
+
+class Supervisor(threading.Thread):
+    def __init__(self, check_interval: float = 0.5, restart_backoff: float = 1.0, max_backoff: float = 30.0,
+                 stop_timeout: float = 2.0):
+        super().__init__(daemon=True, name="supervisor")
+        self.check_interval = check_interval
+        self.stop_timeout = stop_timeout
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self._workers: Dict[str, _Supervised] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._install_excepthook()
+
+    def _install_excepthook(self):
+        # Keep the default traceback printing, but also remember the error on the worker
+        previous = threading.excepthook
+
+        def hook(args):
+            if hasattr(args.thread, "error"):
+                args.thread.error = args.exc_value
+            previous(args)
+
+        threading.excepthook = hook
+
+    def supervise(self, name: str, factory: Callable[[], "threading.Thread"], stall_timeout: float,
+                  on_restart: Optional[Callable[[], None]] = None, start: bool = True):
+        """
+        Register a worker.
+        Args:
+            name: Label used in logs and metrics.
+            factory: Returns a new, unstarted WorkerThread.
+            stall_timeout: Seconds without a heartbeat before the worker counts as stalled.
+            on_restart: Called before the replacement is built, e.g. to reconnect hardware.
+            start: Build and start the first thread now.
+        """
+        worker = _Supervised(name, factory, stall_timeout, on_restart)
+        if start:
+            worker.thread = factory()
+            worker.thread.start()
+        with self._lock:
+            self._workers[name] = worker
+        HEARTBEAT_AGE.labels(name).set_function(
+            lambda: time.monotonic() - getattr(worker.thread, "last_heartbeat", time.monotonic()))
+        return worker.thread
+
+    def thread(self, name: str):
+        return self._workers[name].thread
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            if worker.thread is not None and hasattr(worker.thread, "stop"):
+                worker.thread.stop()
+
+    def run(self):
+        while not self._stop_event.wait(self.check_interval):
+            with self._lock:
+                workers = list(self._workers.values())
+            for worker in workers:
+                try:
+                    self._check(worker)
+                except Exception as e:
+                    logging.exception(f"Supervisor failed while checking {worker.name}: {e}")
+
+    def _check(self, worker: _Supervised):
+        now = time.monotonic()
+        thread = worker.thread
+
+        if worker.outage_start is not None:
+            # Waiting for the replacement to prove it works
+            if thread is not None and thread.heartbeats > worker.pending_heartbeats:
+                recovery = thread.last_heartbeat - worker.outage_start
+                worker.last_recovery = recovery
+                worker.history.append((time.time(), recovery))
+                worker.outage_start = None
+                worker.backoff = 0.0
+                RECOVERY_SECONDS.labels(worker.name).observe(recovery)
+                logging.warning(f"Worker '{worker.name}' recovered in {recovery:.2f}s "
+                                f"(restart #{worker.restarts})")
+                return
+            if thread is not None and thread.is_alive() and now - thread.last_heartbeat < worker.stall_timeout:
+                return
+
+        reason = None
+        if thread is None or not thread.is_alive():
+            reason = "died"
+        elif now - thread.last_heartbeat > worker.stall_timeout:
+            reason = "stalled"
+        if reason is None or now < worker.next_restart:
+            return
+
+        if worker.outage_start is None:
+            worker.outage_start = getattr(thread, "last_heartbeat", now)
+        error = getattr(thread, "error", None)
+        logging.error(f"Worker '{worker.name}' {reason}"
+                      f"{f' with {type(error).__name__}: {error}' if error else ''}; restarting")
+        self._restart(worker, reason)
+
+    def _restart(self, worker: _Supervised, reason: str):
+        old = worker.thread
+        if old is not None and hasattr(old, "stop"):
+            old.stop()
+        if old is not None and old.is_alive():
+            # The old thread may still be inside a serial exchange; reopening under it races on the port
+            old.join(self.stop_timeout)
+            if old.is_alive():
+                logging.error(f"Worker '{worker.name}' did not exit within {self.stop_timeout:.1f}s; "
+                              f"retrying the restart later")
+                worker.next_restart = time.monotonic() + self.stop_timeout
+                return
+
+        worker.restarts += 1
+        RESTARTS.labels(worker.name, reason).inc()
+
+        # Back off on repeated failures so a missing device doesn't spin the CPU
+        worker.backoff = min(self.max_backoff, worker.backoff * 2 or self.restart_backoff)
+        worker.next_restart = time.monotonic() + worker.backoff
+
+        if worker.on_restart is not None:
+            try:
+                worker.on_restart()
+            except Exception as e:
+                logging.error(f"Restart hook for '{worker.name}' failed: {e}")
+                return
+
+        worker.thread = worker.factory()
+        worker.pending_heartbeats = worker.thread.heartbeats
+        worker.thread.start()
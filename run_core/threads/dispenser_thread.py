@@ -1,5 +1,9 @@
 import threading, time
 from events import EventType
+from metrics import REGISTRY
+
+DISPENSES = REGISTRY.counter("squat_dispenses", "Pellet dispense commands sent")
+DISPENSE_SECONDS = REGISTRY.histogram("squat_dispense_seconds", "Time spent in a single dispense command")
 
 class DispenserThread(threading.Thread):
     def __init__(self, motor, event_queue):
@@ -8,6 +12,9 @@ class DispenserThread(threading.Thread):
         self.queue = event_queue
 
     def dispense_pellet(self):
+        start = time.monotonic()
         self.motor.dispense("D")
+        DISPENSE_SECONDS.observe(time.monotonic() - start)
+        DISPENSES.inc()
         print(f"[DEBUG] Pellet dispensed in dispenser thread")
         self.queue.put((EventType.PELLET_DISPENSED, None, time.time()))
\ No newline at end of file
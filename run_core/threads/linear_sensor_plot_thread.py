@@ -1,5 +1,4 @@
 import threading
-import matplotlib.pyplot as plt
 import time
 from collections import deque
 
@@ -13,6 +12,9 @@ class PlotThread(threading.Thread):
         self.start_time = time.time()
 
     def run(self):
+        # Imported here so headless stations never pay for matplotlib at startup
+        import matplotlib.pyplot as plt
+
         plt.ion()
         fig, ax = plt.subplots(figsize=(10, 6))
         line, = ax.plot([], [], lw=2)
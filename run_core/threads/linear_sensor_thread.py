@@ -1,44 +1,79 @@
-import threading, time
+import logging
+import time
 from collections import deque
 from typing import Optional
-from events import EventType
+from events import EventType, LiftSummary
+from metrics import REGISTRY
+from run_core.threads.worker import WorkerThread
+
+SAMPLES = REGISTRY.counter("squat_linear_sensor_samples", "Position reads returned by the linear sensor")
+MISSED_SAMPLES = REGISTRY.counter("squat_linear_sensor_missed_samples", "Position reads that returned no value")
+PARSE_ERRORS = REGISTRY.counter("squat_linear_sensor_parse_errors", "Unparseable responses from the sensor bridge")
+COMMAND_ERRORS = REGISTRY.counter("squat_linear_sensor_command_errors", "Serial write/read failures")
+SAMPLE_RATE = REGISTRY.gauge("squat_linear_sensor_sample_rate_hz", "Achieved position read rate over the last second")
+READ_SECONDS = REGISTRY.histogram("squat_linear_sensor_read_seconds", "Serial round trip per position read")
+PLOT_QUEUE_DEPTH = REGISTRY.gauge("squat_plot_queue_depth", "Samples waiting for the plot thread")
+LIFTS = REGISTRY.counter("squat_lifts", "Lifts detected")
+DISCONNECTS = REGISTRY.counter("squat_linear_sensor_disconnects", "Serial link losses detected by the connection manager")
+GAP_SECONDS = REGISTRY.histogram("squat_linear_sensor_gap_seconds", "Sample gaps caused by serial reconnects",
+                                 buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
 
 """
 Thread to monitor linear sensor for lift detection events.
 """
-class LinearSensorThread(threading.Thread):
+class LinearSensorThread(WorkerThread):
     def __init__(
             self, 
             linear_sensor, 
             event_queue, 
             plot_queue, 
             mm_threshold=10, 
-            recent_lifts: Optional[deque]=None
+            recent_lifts: Optional[deque]=None,
+            release_margin_mm=2,
+            slope_threshold=0.1,
+            recent_window=10,
+            poll_interval=0.01,
+            anomaly_detector=None
     ):
-        super().__init__(daemon=True)
+        super().__init__(name="linear_sensor")
+        # The sensor is opened once by init_hardware and reopened by the supervisor/connection manager
         self.linear_sensor = linear_sensor
-        self.linear_sensor.connect()
 
         self.queue = event_queue
         self.plot_queue = plot_queue
 
         self.recent_lifts = recent_lifts
         self.threshold = mm_threshold
+        self.release_threshold = mm_threshold - release_margin_mm
+        self.slope_threshold = slope_threshold
+        self.recent_window = recent_window
+        self.poll_interval = poll_interval
+        # Scores every lift when [anomaly] is enabled; shared across restarts so it keeps its history
+        self.anomaly_detector = anomaly_detector
 
+        self.last_sample = None
         self.last_mm_value = None
         self.in_lift = False
 
+        self._rate_count = 0
+        self._rate_start = time.monotonic()
+        PARSE_ERRORS.set_function(lambda: getattr(self.linear_sensor, "parse_errors", 0))
+        COMMAND_ERRORS.set_function(lambda: getattr(self.linear_sensor, "command_errors", 0))
+        DISCONNECTS.set_function(lambda: getattr(self.linear_sensor, "disconnects", 0))
+        if plot_queue is not None:
+            PLOT_QUEUE_DEPTH.set_function(plot_queue.qsize)
+
     def run(self):
-        while True:
+        while not self.stopped:
             mm_value = self.read_mm_value()
-            self.plot_queue.put(mm_value)
-
-            # update recent lifts deque
-            if self.recent_lifts is not None:
-                if len(self.recent_lifts) > 10:
-                    self.recent_lifts.popleft()
-                self.recent_lifts.append(mm_value)
+            if mm_value is None and not self._link_up():
+                # The connection retries on its own backoff; reading before then returns None at once
+                self.stop_event.wait(self._retry_wait())
+                continue
+            if self.plot_queue is not None:
+                self.plot_queue.put(mm_value)
 
+            self.remember(mm_value)
             current_time = time.time()
 
             # lift validation logic
@@ -46,26 +81,95 @@ class LinearSensorThread(threading.Thread):
                 self.last_mm_value = mm_value
 
                 if self.validate_lift(mm_value):
+                    LIFTS.inc()
                     self.queue.put((EventType.LIFT_DETECTED, mm_value, current_time))
+                    summary = self.track_lift(mm_value, current_time)
+                    self.queue.put((EventType.LIFT_COMPLETED, summary, summary.end))
+
+    def track_lift(self, mm_value, start):
+        """Follow a lift until it is released and measure it."""
+        peak, auc, tut, samples = mm_value, 0.0, 0.0, 1
+        last_t, last_mm = start, mm_value
+        trace = None
+        if self.anomaly_detector is not None:
+            from anomaly import LiftTrace
+
+            trace = LiftTrace()
+            trace.add(start, mm_value, *self._raw_and_gap())
+        while not self.stopped:
+            if not self.validate_lift(mm_value):
+                break
+
+            # A missed read keeps the last position rather than ending the lift;
+            # a sensor that stays silent stops heartbeating and gets restarted
+            next_value = self.read_mm_value()
+            if next_value is not None:
+                mm_value = next_value
+                self.remember(mm_value)
+                now = time.time()
+                dt = now - last_t
+                auc += 0.5 * (last_mm + mm_value) * dt
+                if last_mm > self.threshold:
+                    tut += dt
+                peak = max(peak, mm_value)
+                samples += 1
+                last_t, last_mm = now, mm_value
+                if trace is not None:
+                    trace.add(now, mm_value, *self._raw_and_gap())
+
+            time.sleep(self.poll_interval)
+
+        end = time.time()
+        flags = self.anomaly_detector.score(trace).flags if trace is not None else 0
+        return LiftSummary(start, end, peak, auc, tut, samples, flags)
+
+    def _link_up(self) -> bool:
+        return getattr(self.linear_sensor, "link_up", True)
+
+    def _retry_wait(self) -> float:
+        """Seconds until the sensor connection next tries to reopen, at least one poll interval."""
+        retry = getattr(self.linear_sensor, "seconds_until_retry", None)
+        return max(self.poll_interval, retry() if retry is not None else 0.0)
+
+    def _raw_and_gap(self):
+        sample = self.last_sample
+        return (sample.raw, sample.gap) if sample is not None else (None, 0.0)
 
-                    while True:
-                        if not self.validate_lift(mm_value):
-                            break
-
-                        mm_value = self.read_mm_value()
-
-                        if self.recent_lifts is not None:
-                            if len(self.recent_lifts) > 10:
-                                self.recent_lifts.popleft()
-                            self.recent_lifts.append(mm_value)
-                        
-                        time.sleep(0.01)
-                        
-                    self.queue.put((EventType.LIFT_COMPLETED, mm_value, current_time))
-                    
     def read_mm_value(self):
-        return self.linear_sensor.get_position()
+        start = time.monotonic()
+        sample = self.linear_sensor.read_sample()
+        now = time.monotonic()
+        self.last_sample = sample
+        READ_SECONDS.observe(now - start)
+
+        mm_value = sample.mm if sample is not None else None
+        if sample is not None and sample.gap > 0:
+            GAP_SECONDS.observe(sample.gap)
+            logging.warning(f"Linear sensor resumed after a {sample.gap * 1000:.0f} ms gap (sample #{sample.seq})")
+
+        if mm_value is None:
+            # Reads while the link is down are reconnect gaps, reported by GAP_SECONDS instead
+            if self._link_up():
+                MISSED_SAMPLES.inc()
+        else:
+            SAMPLES.inc()
+            self._rate_count += 1
+            self.heartbeat()
+
+        if now - self._rate_start >= 1.0:
+            SAMPLE_RATE.set(self._rate_count / (now - self._rate_start))
+            self._rate_count = 0
+            self._rate_start = now
+        return mm_value
     
+    def remember(self, mm_value):
+        """Add a reading to the recent window used for slope estimation; missed reads are skipped."""
+        if self.recent_lifts is None or mm_value is None:
+            return
+        if len(self.recent_lifts) > self.recent_window:
+            self.recent_lifts.popleft()
+        self.recent_lifts.append(mm_value)
+
     def calculate_avg_slope(self) -> float:
         if self.recent_lifts is None or len(self.recent_lifts) < 2:
             return 0
@@ -85,15 +189,15 @@ class LinearSensorThread(threading.Thread):
         avg_slope = self.calculate_avg_slope()
         # print(f"[DEBUG] mm_value: {mm_value}, avg_slope: {avg_slope}, in_lift: {self.in_lift}")
 
-        if avg_slope >= 0.1 and mm_value > self.threshold:
+        if avg_slope >= self.slope_threshold and mm_value > self.threshold:
             self.in_lift = True
             return True
         
-        # even if the slope drops, stay in lift until below 8mm
-        if self.in_lift and mm_value > self.threshold - 2:
+        # even if the slope drops, stay in lift until below the release threshold
+        if self.in_lift and mm_value > self.release_threshold:
             return True
         
-        if mm_value < self.threshold - 2 or avg_slope <= 0.1:
+        if mm_value < self.release_threshold or avg_slope <= self.slope_threshold:
             self.in_lift = False
             return False
 
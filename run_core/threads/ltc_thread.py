@@ -1,20 +1,27 @@
-import threading, time
+import time
 from events import EventType
+from metrics import REGISTRY
+from run_core.threads.worker import WorkerThread
 
-class LTCThread(threading.Thread):
-    def __init__(self, LTC, event_queue):
-        super().__init__(daemon=True)
+PELLET_TRANSITIONS = REGISTRY.counter("squat_pellet_transitions", "Photo interruptor state changes", labels=("event",))
+
+class LTCThread(WorkerThread):
+    def __init__(self, LTC, event_queue, poll_interval=0.1):
+        super().__init__(name="ltc")
         self.LTC = LTC
         self.queue = event_queue
+        self.poll_interval = poll_interval
         self.last_state = self.LTC.get_detected()
 
     def run(self):
-        while True:
+        while not self.stopped:
+            self.heartbeat()
             current_state = self.LTC.get_detected()
             if current_state != self.last_state:
                 self.last_state = current_state
                 event_type = EventType.PELLET_DETECTED if current_state else EventType.PELLET_TAKEN
+                PELLET_TRANSITIONS.labels(event_type.name).inc()
                 self.queue.put((event_type, current_state, time.time()))
-            time.sleep(0.1)
+            time.sleep(self.poll_interval)
 
     
\ No newline at end of file
@@ -0,0 +1,25 @@
+import threading, time
+
+"""
+Base class for supervised runtime threads.
+"""
+class WorkerThread(threading.Thread):
+    def __init__(self, name=None):
+        super().__init__(daemon=True, name=name)
+        self.stop_event = threading.Event()
+        self.last_heartbeat = time.monotonic()
+        self.heartbeats = 0
+        self.error = None       # set by the supervisor's excepthook if run() raises
+
+    def heartbeat(self):
+        """Signal the supervisor that the worker is still making progress."""
+        self.last_heartbeat = time.monotonic()
+        self.heartbeats += 1
+
+    def stop(self):
+        """Ask the loop to exit at its next iteration."""
+        self.stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
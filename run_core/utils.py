@@ -3,34 +3,45 @@ This module contains utility functions for the main loop
 """
 
 import logging
-import pigpio
+import os
 import queue
 from collections import deque
 
-from Dispenser.ESP32Motor import ESP32Motor
-from Dispenser.PhotoInterruptor.PhotoInterruptor import PhotoInterruptor
-from Dispenser.LinearSensor.serial_reader import LinearSensorReader
-
 from run_core.threads.dispenser_thread import DispenserThread
 from run_core.threads.linear_sensor_thread import LinearSensorThread
 from run_core.threads.ltc_thread import LTCThread
 from event_manager import EventManager
 
-def init_hardware(pi):
+def init_hardware(pi, settings):
     """Initialize hardware components: linear sensor, photo interruptor, and motor."""
+    # Drivers are imported on demand so a crash-restart only loads what it uses
+    from Dispenser.ESP32Motor import ESP32Motor
+    from Dispenser.PhotoInterruptor.PhotoInterruptor import PhotoInterruptor
+    from Dispenser.LinearSensor.serial_reader import LinearSensorReader
+
     linear_sensor, ltc, motor = None, None, None
     try:
         logging.info("Initializing linear sensor...")
-        linear_sensor = LinearSensorReader('/dev/ttyACM1', 115200)
+        sensor_settings = settings.linear_sensor
+        linear_sensor = LinearSensorReader(sensor_settings.port, sensor_settings.baudrate,
+                                           timeout=sensor_settings.timeout,
+                                           vid=sensor_settings.usb_vid, pid=sensor_settings.usb_pid,
+                                           serial_number=sensor_settings.serial_number,
+                                           reconnect_backoff=sensor_settings.reconnect_backoff,
+                                           max_reconnect_backoff=sensor_settings.max_reconnect_backoff,
+                                           clock_sync_interval=sensor_settings.clock_sync_interval)
 
         if not linear_sensor.connect():
             raise Exception("Failed to connect to linear sensor")
+        if sensor_settings.clock_sync_interval and not linear_sensor.sync_clock():
+            logging.warning("Linear sensor did not answer clock probes; sample times are uncorrected")
 
         logging.info("Initializing photo interruptor...")
-        ltc = PhotoInterruptor(pi)
+        ltc = PhotoInterruptor(pi, clk=settings.photo_interruptor.clk,
+                               threshold=settings.photo_interruptor.threshold)
 
         logging.info("Initializing motor...")
-        motor = ESP32Motor(port = "/dev/ttyUSB0", baudrate=115200)
+        motor = ESP32Motor(port=settings.dispenser.port, baudrate=settings.dispenser.baudrate)
         if not motor.connect():
             raise Exception("Failed to connect to motor")
 
@@ -47,26 +58,74 @@ def init_hardware(pi):
 
 def init_pi():
     """Initialize pigpio and return the pi instance."""
+    import pigpio
+
     pi = pigpio.pi()
     if not pi.connected:
         logging.error("Failed to connect to pigpio daemon")
         return None
     return pi
 
+def reconnect_linear_sensor(linear_sensor):
+    """Close and reopen the sensor port; used by the watchdog before restarting its thread."""
+    logging.info("Reconnecting linear sensor...")
+    try:
+        linear_sensor.disconnect()
+    except Exception as e:
+        logging.warning(f"Error closing linear sensor: {e}")
+    if not linear_sensor.connect():
+        raise ConnectionError(f"Failed to reconnect linear sensor on {linear_sensor.port}")
+
+def display_available() -> bool:
+    """Check whether a GUI display is attached (X11 or Wayland)."""
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
 def check_all_hardware(pi, ltc, motor):
     """Check if all hardware components are initialized properly."""
     if not all([pi, ltc, motor]):
         logging.error("Hardware initialization failed. Exiting.")
         return None
 
-def init_threads(linear_sensor, ltc, motor):
+def make_linear_sensor_thread(linear_sensor, event_queue, plot_queue, lift_settings, anomaly_detector=None):
+    """Build the lift-detection thread from the [lift] settings."""
+    return LinearSensorThread(
+        linear_sensor, event_queue, plot_queue,
+        mm_threshold=lift_settings.mm_threshold,
+        recent_lifts=deque(),
+        release_margin_mm=lift_settings.release_margin_mm,
+        slope_threshold=lift_settings.slope_threshold,
+        recent_window=lift_settings.recent_window,
+        poll_interval=lift_settings.poll_interval,
+        anomaly_detector=anomaly_detector,
+    )
+
+def make_anomaly_detector(anomaly_settings):
+    """The [anomaly] lift scorer, or None when it is disabled."""
+    if not anomaly_settings.enabled:
+        return None
+    # Only loaded when lifts are scored
+    from anomaly import LiftAnomalyDetector
+
+    return LiftAnomalyDetector(window=anomaly_settings.window, min_lifts=anomaly_settings.min_lifts,
+                               z_limit=anomaly_settings.z_limit, max_gap_s=anomaly_settings.max_gap_s,
+                               max_jump_counts=anomaly_settings.max_jump_counts)
+
+def make_tmc2209(pi, tmc2209_settings, **kwargs):
+    """TMC2209 stepper driver on the [tmc2209] pins; kwargs (ms_mode, start_position) go to the driver."""
+    from Dispenser.TMC2209.tmc2209 import TMC2209
+
+    return TMC2209(dir_pin=tmc2209_settings.dir_pin, step_pin=tmc2209_settings.step_pin,
+                   ms1_pin=tmc2209_settings.ms1_pin, ms2_pin=tmc2209_settings.ms2_pin,
+                   en_pin=tmc2209_settings.en_pin, pi=pi, spr=tmc2209_settings.spr, **kwargs)
+
+def init_threads(linear_sensor, ltc, motor, settings):
     """Initialize and start threads for linear sensor, LTC, and dispenser."""
     event_queue = queue.Queue()
-    plot_queue = queue.Queue()
-    
-    linear_thread = LinearSensorThread(linear_sensor, event_queue, plot_queue, 
-                                       mm_threshold=10, recent_lifts=deque())
-    ltc_thread = LTCThread(ltc, event_queue)
+    plot_queue = None
+
+    linear_thread = make_linear_sensor_thread(linear_sensor, event_queue, plot_queue, settings.lift,
+                                              make_anomaly_detector(settings.anomaly))
+    ltc_thread = LTCThread(ltc, event_queue, poll_interval=settings.photo_interruptor.poll_interval)
     dispenser_thread = DispenserThread(motor, event_queue)
 
     linear_thread.start()
@@ -74,7 +133,9 @@ def init_threads(linear_sensor, ltc, motor):
     dispenser_thread.start()
 
     # Main controller
-    manager = EventManager(event_queue, dispenser_thread)
+    event_log = settings.event_log
+    manager = EventManager(event_queue, dispenser_thread, log_path=event_log.path,
+                           sync_every=event_log.sync_every, sync_interval=event_log.sync_interval)
     manager.run()
 
     return linear_sensor, ltc, motor, manager
@@ -0,0 +1,4 @@
+"""
+Host-side data tools for the squat press: capture session storage, the
+sensor calibration registry and offline analysis.
+"""
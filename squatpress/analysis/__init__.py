@@ -0,0 +1,18 @@
+"""
+Offline analysis of linear sensor captures against ground truth.
+
+    loader        capture CSV/.session and video ground-truth loading
+    segmentation  multi-cycle captures split into CSR cycle offsets in one pass
+    alignment     FFT time-offset search, single trace or every cycle of a session
+    dtw           banded DTW timing error per lift phase
+    metrics       AUC, time under tension, peak, velocity and error statistics
+    pipeline      SessionAnalysis: each stage computed once per session on demand
+    plotting      matplotlib panels for a SessionAnalysis and for whole multi-cycle sessions
+    overlay       headless PNG export of every cycle of each capture
+    ensemble      streamed per-session mean, percentile bands, bootstrap CIs and template lift
+    anomaly       per-cycle shape/peak/duration/gap/jump scores and flagged cycles for exclusion
+    cache         content-addressed disk cache for parsed captures and results
+    batch         the metric suite over every capture with ground truth, in parallel
+
+python -m squatpress.analysis runs any subset of these on any capture.
+"""
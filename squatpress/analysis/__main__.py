@@ -0,0 +1,94 @@
+"""
+Run any subset of the analysis on any capture:
+
+    python -m squatpress.analysis data/csv/2026.04.09/sensor2_142307.csv
+    python -m squatpress.analysis data/csv/2026.4.14/sensor2_no_gpio112145.csv --cycle 1 --timing \\
+        --plot comparison,error,offset --out plots/
+    python -m squatpress.analysis data/csv/2026.03.31/sensor2_134943.csv --metrics offset_ms,tut_error_ms --show
+
+The ground truth is the frame,mm CSV next to each capture unless --truth is
+given. Each session is loaded and aligned once, however many metrics and
+panels are asked for, and the results are kept in the disk cache
+(--no-cache to recompute).
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from .cache import Cache
+from .pipeline import SessionAnalysis
+from .plotting import PANELS
+
+
+def _names(value, choices, what):
+    names = [n.strip() for n in value.split(",") if n.strip()]
+    unknown = [n for n in names if n not in choices]
+    if unknown:
+        raise SystemExit(f"unknown {what}: {', '.join(unknown)} (choose from {', '.join(choices)})")
+    return names
+
+
+def main():
+    p = argparse.ArgumentParser(prog="python -m squatpress.analysis",
+                                description="Validate sensor captures against video ground truth")
+    p.add_argument("captures", nargs="+", help="capture CSVs or .session directories")
+    p.add_argument("--truth", help="ground-truth CSV (default: the one next to each capture)")
+    p.add_argument("--cycle", type=int, help="only this GPIO cycle of a multi-cycle capture")
+    p.add_argument("--offset-ms", type=float, help="fixed time offset instead of searching")
+    p.add_argument("--threshold", type=float, default=None, help="tension threshold (mm)")
+    p.add_argument("--metrics", default="all", help="comma-separated metric names, 'all' or 'none'")
+    p.add_argument("--timing", action="store_true", help="DTW timing error per phase")
+    p.add_argument("--plot", default="", help=f"comma-separated panels: {', '.join(PANELS)}")
+    p.add_argument("--out", help="save each figure as <out>/<capture>_analysis.png")
+    p.add_argument("--show", action="store_true", help="open the figures in a window")
+    p.add_argument("--no-cache", action="store_true", help="recompute everything instead of using the disk cache")
+    args = p.parse_args()
+
+    panels = _names(args.plot, list(PANELS), "panel") if args.plot else []
+    if panels and not args.show:
+        import matplotlib
+        matplotlib.use("Agg")
+
+    options = {"cycle": args.cycle}
+    if args.no_cache:
+        options["cache"] = Cache(False)
+    if args.threshold is not None:
+        options["threshold"] = args.threshold
+    if args.offset_ms is not None:
+        options["offset"] = args.offset_ms / 1000
+
+    failed = False
+    for capture in args.captures:
+        try:
+            a = SessionAnalysis(capture, args.truth, **options)
+            print(f"{a.capture_path}  vs  {a.truth_path.name}")
+            if args.metrics != "none":
+                wanted = list(a.metrics) if args.metrics == "all" else _names(args.metrics, list(a.metrics), "metric")
+                for name in wanted:
+                    print(f"  {name:<24} {a.metrics[name]:>10.4f}")
+            if args.timing:
+                for phase, lag, rms in zip(("concentric", "eccentric"), a.warp.phase_lag[0], a.warp.phase_rms[0]):
+                    print(f"  {phase + ' timing':<24} {lag*1000:>+10.2f} ms mean, {rms*1000:.2f} ms RMS")
+            if panels:
+                from .plotting import figure
+
+                fig = figure(a, panels)
+                fig.suptitle(a.capture_path.name, y=1.0)
+                if args.out:
+                    out = Path(args.out) / f"{a.capture_path.stem}_analysis.png"
+                    out.parent.mkdir(parents=True, exist_ok=True)
+                    fig.savefig(out, dpi=150, bbox_inches="tight")
+                    print(f"  saved {out}")
+        except (OSError, KeyError, ValueError) as e:
+            print(f"{capture}: {e}", file=sys.stderr)
+            failed = True
+
+    if panels and args.show:
+        import matplotlib.pyplot as plt
+        plt.show()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
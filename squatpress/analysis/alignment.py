@@ -0,0 +1,282 @@
+"""
+Time alignment of sensor traces against ground truth.
+
+find_time_offset() resamples both signals onto one uniform grid, finds the
+lag with an FFT cross-correlation and refines it to a fraction of a grid
+step by fitting a parabola through the correlation peak. The offset uses
+the same convention as the validation scripts' old TIME_SHIFT constants:
+
+    aligned_sensor_time = sensor_time + offset
+
+The correlation is normalised by the signal energy in the overlap at each
+lag, so partial overlap at the ends of the search range does not bias the
+result toward zero lag.
+
+Ground truth is usually a sparse set of video keyframes, and linear
+interpolation between them distorts its resampled shape by a few ms. The
+correlation peak is therefore polished against the criterion the old
+brute-force sweep minimised, the mean squared error at the truth points
+themselves: a local sweep of +/- polish_window around the peak and a
+finer one around its minimum, each one vectorised np.interp call plus a
+parabolic vertex fit. Because the polish sets the final offset, the
+correlation only has to land inside the polish window: it runs on a
+coarse DEFAULT_DT grid, and the polish steps are independent of it.
+
+Against the old 1 ms sweep this is ~10-15x faster, not orders of
+magnitude (tests/squatpress/alignment_benchmark.py). A sparse-keyframe
+cycle only costs the sweep a few ms, and what is left here is a fixed
+few dozen NumPy calls (~0.3 ms) plus work linear in the grid.
+
+align_cycles() does the same for every cycle of a multi-cycle session at
+once: cycles are resampled onto one grid as a (cycles x samples) array,
+correlated with a single batched FFT and polished in batched sweeps, and
+per-cycle error statistics come back alongside the offsets.
+"""
+
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+DEFAULT_SEARCH_RANGE = 0.2      # seconds either side of zero
+DEFAULT_DT = 0.004              # correlation grid step; only has to land inside the polish window
+DEFAULT_POLISH_WINDOW = 0.012   # seconds either side of the correlation peak (about 3 video frames)
+DEFAULT_POLISH_STEP = 0.004     # first polish sweep step; the second sweeps +/- one step at step/8
+POLISH_MAX_POINTS = 512         # dense truth is thinned to this many points for the polish sweeps
+POLISH_CHUNK_ELEMENTS = 1 << 22 # interpolated points per batched polish sweep
+
+
+class Alignment(NamedTuple):
+    offset: float               # seconds to add to the sensor time
+    rms: float                  # RMS sensor - truth error (mm) at the truth points after shifting
+    score: float                # normalised correlation at the peak (1 = identical shape)
+    lags: np.ndarray            # candidate offsets searched (s)
+    scores: np.ndarray          # normalised correlation at each lag
+
+
+class CycleAlignment(NamedTuple):
+    offsets: np.ndarray         # (cycles,) seconds to add to each cycle's time
+    rms: np.ndarray             # (cycles,) RMS cycle - truth error (mm) at the truth points covered
+    bias: np.ndarray            # (cycles,) mean cycle - truth error (mm)
+    max_error: np.ndarray       # (cycles,) largest |cycle - truth| (mm)
+    score: np.ndarray           # (cycles,) normalised correlation at each cycle's peak
+    lags: np.ndarray            # (lags,) candidate offsets searched (s)
+    scores: np.ndarray          # (cycles, lags) normalised correlation
+
+
+def resample(t, x, grid) -> Tuple[np.ndarray, np.ndarray]:
+    """Linear resample onto `grid`; returns (values, mask of grid points inside the signal's span)."""
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    values = np.interp(grid, t, x)
+    return values, (grid >= t[0]) & (grid <= t[-1])
+
+
+def _stacked(t, offsets) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cycle times laid end to end so one np.interp call serves every cycle:
+    cycle i is moved to start at i * stride. Returns (stacked times, per-cycle shift).
+    """
+    stride = float(t.max() - t.min()) + 1.0
+    shift = np.arange(len(offsets) - 1) * stride
+    return t + np.repeat(shift, np.diff(offsets)), shift
+
+
+def resample_cycles(t, x, offsets, grid, shifts=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resample every cycle onto `grid` at once. Cycle i is t[offsets[i]:offsets[i+1]]
+    (times ascending within a cycle), moved later by shifts[i] if given.
+    Returns (cycles x grid values, mask of grid points inside each cycle's span).
+    """
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    offsets = np.asarray(offsets)
+    shifts = np.zeros(len(offsets) - 1) if shifts is None else np.asarray(shifts, dtype=np.float64)
+    stacked, stack_shift = _stacked(t, offsets)
+    values = np.interp(grid[None, :] - shifts[:, None] + stack_shift[:, None], stacked, x)
+    first, last = t[offsets[:-1]] + shifts, t[offsets[1:] - 1] + shifts
+    return values, (grid >= first[:, None]) & (grid <= last[:, None])
+
+
+def _next_fast_len(n: int) -> int:
+    return 1 << int(np.ceil(np.log2(max(n, 1))))
+
+
+def cross_correlation_cycles(t, x, offsets, truth_t, truth_pos, search_range: float = DEFAULT_SEARCH_RANGE,
+                             dt: float = DEFAULT_DT) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normalised cross-correlation of every cycle against the truth for each
+    lag k*dt within +/- search_range; returns (lags, cycles x lags scores).
+    A positive lag means the cycle leads the truth and has to be shifted later.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    truth_t = np.asarray(truth_t, dtype=np.float64)
+    offsets = np.asarray(offsets)
+    first, last = t[offsets[:-1]], t[offsets[1:] - 1]
+    grid = np.arange(min(first.min(), truth_t[0]), max(last.max(), truth_t[-1]) + dt, dt)
+    s, s_mask = resample_cycles(t, x, offsets, grid)
+    g, g_mask = resample(truth_t, truth_pos, grid)
+    s_mean = np.sum(s * s_mask, axis=1) / np.maximum(s_mask.sum(axis=1), 1)
+    s = np.where(s_mask, s - s_mean[:, None], 0.0)
+    g = np.where(g_mask, g - g[g_mask].mean(), 0.0)
+
+    max_lag = min(int(round(search_range / dt)), len(grid) - 1)
+    n = _next_fast_len(len(grid) + max_lag)        # long enough that lags up to max_lag never wrap
+    # c[i, k] = sum_m g[m] s[i, m-k]
+    cross = np.fft.irfft(np.fft.rfft(g, n)[None, :] * np.conj(np.fft.rfft(s, n, axis=1)), n, axis=1)
+
+    # Each signal covers one contiguous run of the grid, so the overlap at lag k
+    # is the run [lo, hi] and both energies come from prefix sums
+    k = np.arange(-max_lag, max_lag + 1)
+    g_idx = np.flatnonzero(g_mask)
+    s_first = np.argmax(s_mask, axis=1)
+    s_last = len(grid) - 1 - np.argmax(s_mask[:, ::-1], axis=1)
+    lo = np.maximum(g_idx[0], s_first[:, None] + k)
+    hi = np.minimum(g_idx[-1], s_last[:, None] + k)
+    empty = hi < lo
+    lo, hi = np.where(empty, 0, lo), np.where(empty, -1, hi)
+    s_cum = np.concatenate([np.zeros((len(s), 1)), np.cumsum(s * s, axis=1)], axis=1)
+    g_cum = np.concatenate([[0.0], np.cumsum(g * g)])
+    s_energy = (np.take_along_axis(s_cum, np.clip(hi - k + 1, 0, len(grid)), axis=1)
+                - np.take_along_axis(s_cum, np.clip(lo - k, 0, len(grid)), axis=1))
+    g_energy = g_cum[hi + 1] - g_cum[lo]
+
+    denom = np.sqrt(np.clip(s_energy, 0, None) * np.clip(g_energy, 0, None))
+    scores = np.divide(cross[:, k], denom, out=np.zeros(denom.shape), where=(denom > 1e-12) & ~empty)
+    return k * dt, scores
+
+
+def cross_correlation(sensor_t, sensor_pos, truth_t, truth_pos, search_range: float = DEFAULT_SEARCH_RANGE,
+                      dt: float = DEFAULT_DT) -> Tuple[np.ndarray, np.ndarray]:
+    """cross_correlation_cycles() for a single trace; returns (lags, scores)."""
+    lags, scores = cross_correlation_cycles(sensor_t, sensor_pos, [0, len(sensor_t)], truth_t, truth_pos,
+                                            search_range, dt)
+    return lags, scores[0]
+
+
+def parabolic_peaks(y: np.ndarray, i: np.ndarray) -> np.ndarray:
+    """Sub-sample position of the maximum at index i[r] of each row y[r]."""
+    rows = np.arange(len(y))
+    j = np.clip(i, 1, y.shape[1] - 2)
+    a, b, c = y[rows, j - 1], y[rows, j], y[rows, j + 1]
+    curvature = a - 2 * b + c
+    ok = (i > 0) & (i < y.shape[1] - 1) & (curvature < 0)
+    return np.where(ok, i + 0.5 * (a - c) / np.where(ok, curvature, -1.0), i).astype(np.float64)
+
+
+def parabolic_peak(y: np.ndarray, i: int) -> float:
+    """Sub-sample position of the maximum at index i of y."""
+    return float(parabolic_peaks(np.asarray(y)[None, :], np.array([i]))[0])
+
+
+def rms_error(sensor_t, sensor_pos, truth_t, truth_pos, offset: float) -> float:
+    """RMS of shifted sensor minus truth at the truth timepoints covered by the sensor."""
+    sensor_t = np.asarray(sensor_t, dtype=np.float64) + offset
+    truth_t = np.asarray(truth_t, dtype=np.float64)
+    inside = (truth_t >= sensor_t[0]) & (truth_t <= sensor_t[-1])
+    if not inside.any():
+        return float("nan")
+    err = np.interp(truth_t[inside], sensor_t, sensor_pos) - np.asarray(truth_pos, dtype=np.float64)[inside]
+    return float(np.sqrt(np.mean(err ** 2)))
+
+
+def polish_offsets(t, x, offsets, truth_t, truth_pos, coarse, window: float = DEFAULT_POLISH_WINDOW,
+                   step: float = DEFAULT_POLISH_STEP) -> np.ndarray:
+    """
+    Per-cycle offsets within +/- window of `coarse` minimising the squared
+    error at the truth points: a sweep at `step`, then one at step/8 around
+    each minimum. Cycles covering fewer than 3 truth points keep `coarse`.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    offsets = np.asarray(offsets)
+    truth_t = np.asarray(truth_t, dtype=np.float64)
+    truth_pos = np.asarray(truth_pos, dtype=np.float64)
+    coarse = np.asarray(coarse, dtype=np.float64)
+    if len(truth_t) > POLISH_MAX_POINTS:
+        keep = np.linspace(0, len(truth_t) - 1, POLISH_MAX_POINTS).astype(int)
+        truth_t, truth_pos = truth_t[keep], truth_pos[keep]
+
+    stacked, stack_shift = _stacked(t, offsets)
+    first, last = t[offsets[:-1]], t[offsets[1:] - 1]
+    margin = window + step
+    inside = (truth_t >= (first + coarse + margin)[:, None]) & (truth_t <= (last + coarse - margin)[:, None])
+    counts = inside.sum(axis=1)
+    rows = np.arange(len(coarse))
+    offset = coarse
+    for half_width, spacing in ((window, step), (step, step / 8)):
+        candidates = offset[:, None] + np.arange(-half_width, half_width + spacing / 2, spacing)
+        query = truth_t[None, None, :] - candidates[:, :, None] + stack_shift[:, None, None]
+        sq = (np.interp(query, stacked, x) - truth_pos) ** 2
+        errors = np.sum(sq * inside[:, None, :], axis=2) / np.maximum(counts, 1)[:, None]
+        best = np.argmin(errors, axis=1)
+        offset = candidates[rows, 0] + parabolic_peaks(-errors, best) * spacing
+    return np.where(counts >= 3, offset, coarse)
+
+
+def polish_offset(sensor_t, sensor_pos, truth_t, truth_pos, offset: float,
+                  window: float = DEFAULT_POLISH_WINDOW, step: float = DEFAULT_POLISH_STEP) -> float:
+    """polish_offsets() for a single trace."""
+    return float(polish_offsets(sensor_t, sensor_pos, [0, len(sensor_t)], truth_t, truth_pos, [offset],
+                                window, step)[0])
+
+
+def find_time_offset(sensor_t, sensor_pos, truth_t, truth_pos, search_range: float = DEFAULT_SEARCH_RANGE,
+                     dt: float = DEFAULT_DT, polish: bool = True) -> Alignment:
+    """Offset (s) that best lines the sensor trace up with ground truth; see the module docstring."""
+    sensor_t = np.asarray(sensor_t, dtype=np.float64)
+    sensor_pos = np.asarray(sensor_pos, dtype=np.float64)
+    truth_t = np.asarray(truth_t, dtype=np.float64)
+    truth_pos = np.asarray(truth_pos, dtype=np.float64)
+    lags, scores = cross_correlation(sensor_t, sensor_pos, truth_t, truth_pos, search_range, dt)
+    best = int(np.argmax(scores))
+    offset = float(lags[0] + parabolic_peak(scores, best) * dt)
+    if polish:
+        offset = polish_offset(sensor_t, sensor_pos, truth_t, truth_pos, offset)
+    return Alignment(offset, rms_error(sensor_t, sensor_pos, truth_t, truth_pos, offset),
+                     float(scores[best]), lags, scores)
+
+
+def cycle_errors(t, x, offsets, truth_t, truth_pos, shifts) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(rms, bias, max |error|) per cycle at the truth points each shifted cycle covers; NaN if none."""
+    truth_t = np.asarray(truth_t, dtype=np.float64)
+    values, covered = resample_cycles(t, x, offsets, truth_t, shifts)
+    err = np.where(covered, values - np.asarray(truth_pos, dtype=np.float64), 0.0)
+    n = covered.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rms = np.sqrt(np.sum(err ** 2, axis=1) / n)
+        bias = np.sum(err, axis=1) / n
+    max_error = np.where(n > 0, np.abs(err).max(axis=1, initial=0.0), np.nan)
+    return rms, bias, max_error
+
+
+def align_cycles(t, x, offsets, truth_t, truth_pos, search_range: float = DEFAULT_SEARCH_RANGE,
+                 dt: float = DEFAULT_DT, polish: bool = True) -> CycleAlignment:
+    """
+    find_time_offset() for every cycle of a session in one pass. The session
+    is flat arrays (t, x) split by `offsets`: cycle i is [offsets[i], offsets[i+1]),
+    each with its own time origin (e.g. the GPIO trigger) and at least 2 samples.
+    All cycles are resampled onto one grid as a cycles x samples array and
+    correlated against the truth with a single batched FFT.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    offsets = np.asarray(offsets)
+    truth_t = np.asarray(truth_t, dtype=np.float64)
+    truth_pos = np.asarray(truth_pos, dtype=np.float64)
+
+    lags, scores = cross_correlation_cycles(t, x, offsets, truth_t, truth_pos, search_range, dt)
+    best = np.argmax(scores, axis=1)
+    shifts = lags[0] + parabolic_peaks(scores, best) * dt
+    if polish:
+        # Polish in chunks of cycles to bound the cycles x candidates x truth points working set
+        per_cycle = (2 * int(DEFAULT_POLISH_WINDOW / DEFAULT_POLISH_STEP) + 1) * min(len(truth_t), POLISH_MAX_POINTS)
+        chunk = max(1, POLISH_CHUNK_ELEMENTS // per_cycle)
+        polished = []
+        for i in range(0, len(shifts), chunk):
+            j = min(i + chunk, len(shifts))
+            a, b = offsets[i], offsets[j]
+            polished.append(polish_offsets(t[a:b], x[a:b], offsets[i:j + 1] - a, truth_t, truth_pos,
+                                           shifts[i:j]))
+        shifts = np.concatenate(polished)
+    rms, bias, max_error = cycle_errors(t, x, offsets, truth_t, truth_pos, shifts)
+    return CycleAlignment(shifts, rms, bias, max_error, scores[np.arange(len(best)), best], lags, scores)
@@ -0,0 +1,247 @@
+"""
+Anomalous cycle detection.
+
+Every cycle of a capture (pipeline.split_cycles(), before the peak filter)
+is scored in one vectorized pass:
+
+  - shape: RMS distance (mm) from the session's template lift
+    (ensemble.ensemble() of its full-height cycles on the phase grid, or a
+    saved template) over the grid points the cycle covers;
+  - peak and duration: robust z-scores, (x - median) / (1.4826 MAD);
+  - gaps: the longest sample interval, against GAP_FACTOR x the median one;
+  - jumps: the largest step in raw counts between consecutive samples
+    (in mm when raw counts were not logged), and raw values that cannot be
+    sensor counts (0, 0xFFFF: parse junk).
+
+A cycle whose score crosses its limit gets that Flag bit. Flagged cycles
+are saved as <capture>.anomalies.csv, one row per cycle with the reasons
+and scores; load_flags() reads the cycle numbers back for exclusion
+(pipeline.session_cycles(exclude=...), batch --exclude-anomalies).
+
+    scores = anomaly.score(load_capture("data/csv/2026.02.27/sensor2_20260227_134448.csv"))
+    scores.cycle[scores.flags != 0], describe(scores.flags[...])
+
+    python -m squatpress.analysis.anomaly data/csv --out anomalies/   # all captures, all cores
+
+run_core/anomaly.py applies the same checks to each lift as it completes,
+with the same Flag bits.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from enum import IntFlag
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Set
+
+import numpy as np
+
+from . import ensemble, segmentation
+from .cache import Cache
+from .cache import default as default_cache
+from .loader import Capture, load_capture
+from .pipeline import Cycles, session_cycles, split_cycles
+
+Z_LIMIT = 5.0               # robust z-score beyond which a peak, duration or shape distance is anomalous
+PEAK_SCALE_MM = 0.1         # z-score scales never go below these (sessions with near-identical cycles)
+DURATION_SCALE_S = 0.02
+SHAPE_SCALE_MM = 0.25
+GAP_FACTOR = 3.0            # a sample interval this many times the median one is a gap
+JUMP_COUNTS = 3000          # raw counts between consecutive samples (real lifts stay under ~1500)
+JUMP_MM = 8.0               # the same in mm, when raw counts were not logged
+RAW_INVALID = (0, 0xFFFF)   # raw values a 16-bit sensor read never legitimately returns
+MAD_SCALE = 1.4826
+
+
+class Flag(IntFlag):
+    SHAPE = 1
+    PEAK = 2
+    DURATION = 4
+    GAP = 8
+    JUMP = 16
+    INVALID = 32            # raw values that are not sensor counts, or fewer than 2 samples
+
+
+class Scores(NamedTuple):
+    cycle: np.ndarray       # cycle numbers (split_cycles() order)
+    peak_mm: np.ndarray
+    duration_s: np.ndarray
+    peak_z: np.ndarray
+    duration_z: np.ndarray
+    shape_mm: np.ndarray    # RMS distance from the template (NaN where it covers no grid point)
+    shape_z: np.ndarray
+    max_gap_s: np.ndarray
+    max_jump: np.ndarray    # raw counts, or mm without raw
+    invalid: np.ndarray     # samples with raw values in RAW_INVALID
+    flags: np.ndarray       # Flag bits per cycle
+
+    @property
+    def flagged(self) -> np.ndarray:
+        return self.cycle[self.flags != 0]
+
+
+def describe(flags: int) -> str:
+    """'peak+duration' style list of the flags set."""
+    return "+".join(f.name.lower() for f in Flag if flags & f)
+
+
+def robust_z(x, floor: float) -> np.ndarray:
+    """(x - median) / max(1.4826 MAD, floor), ignoring NaN."""
+    x = np.asarray(x, dtype=np.float64)
+    if not np.isfinite(x).any():
+        return np.full(len(x), np.nan)
+    center = np.nanmedian(x)
+    scale = max(MAD_SCALE * np.nanmedian(np.abs(x - center)), floor)
+    return (x - center) / scale
+
+
+def _within(values, offsets) -> np.ndarray:
+    """Largest |step| between consecutive samples of each cycle (0 for one-sample cycles)."""
+    steps = np.zeros(len(values))
+    steps[1:] = np.abs(np.diff(values))
+    steps[offsets[:-1]] = 0
+    return segmentation.peaks(steps, offsets)
+
+
+def shape_distance(cycles: Cycles, template: ensemble.Template) -> np.ndarray:
+    """RMS distance (mm) of each cycle from the template's median where both have data."""
+    phase = template.kind == "phase"
+    grid = np.asarray(template.grid, dtype=np.float64)
+    values, mask = ensemble.resample(cycles, grid, phase)
+    mask &= np.isfinite(template.median)
+    sq = np.where(mask, (values - np.nan_to_num(template.median)) ** 2, 0.0)
+    n = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, np.sqrt(sq.sum(axis=1) / n), np.nan)
+
+
+def session_template(capture: Capture, cache: Optional[Cache] = None) -> ensemble.Template:
+    """Phase template of the capture's own full-height cycles."""
+    return ensemble.ensemble(session_cycles(capture, cache=cache), phase=True, replicates=0)
+
+
+def score(capture: Capture, template: Optional[ensemble.Template] = None, z_limit: float = Z_LIMIT,
+          cache: Optional[Cache] = None) -> Scores:
+    """Scores and flags of every cycle; the template defaults to session_template()."""
+    template = template if template is not None else session_template(capture, cache)
+    t, offsets = split_cycles(capture)
+    n = len(offsets) - 1
+    usable = segmentation.filter_cycles(t, capture.mm, offsets)
+
+    peak = segmentation.peaks(capture.mm, offsets)
+    duration = segmentation.durations(t, offsets)
+    (ut, umm), packed = segmentation.gather(offsets, usable, t, capture.mm)
+    shape = np.full(n, np.nan)
+    if usable.any():
+        shape[usable] = shape_distance(Cycles(ut, umm, packed, np.zeros(usable.sum()), None), template)
+
+    # Gaps on the capture clock, so a continuous log's cycles are not measured from their restarted time
+    steps = _within(capture.t, offsets)
+    dt = np.diff(capture.t)
+    typical_dt = np.median(dt[dt > 0]) if (dt > 0).any() else np.inf
+    if capture.raw is not None:
+        raw = np.asarray(capture.raw, dtype=np.int64)
+        jump = _within(raw, offsets).astype(np.float64)
+        bad = np.isin(raw, RAW_INVALID)
+        invalid = np.add.reduceat(bad.astype(np.int64), offsets[:-1]) if n else np.zeros(0, dtype=np.int64)
+        jump_limit = JUMP_COUNTS
+    else:
+        jump = _within(capture.mm, offsets)
+        invalid = np.zeros(n, dtype=np.int64)
+        jump_limit = JUMP_MM
+
+    peak_z = robust_z(np.where(usable, peak, np.nan), PEAK_SCALE_MM)
+    duration_z = robust_z(np.where(usable, duration, np.nan), DURATION_SCALE_S)
+    shape_z = robust_z(shape, SHAPE_SCALE_MM)
+    flags = np.zeros(n, dtype=np.int64)
+    with np.errstate(invalid="ignore"):
+        flags |= np.where(shape_z > z_limit, Flag.SHAPE, 0)
+        flags |= np.where(np.abs(peak_z) > z_limit, Flag.PEAK, 0)
+        flags |= np.where(np.abs(duration_z) > z_limit, Flag.DURATION, 0)
+    flags |= np.where(steps > GAP_FACTOR * typical_dt, Flag.GAP, 0)
+    flags |= np.where(jump > jump_limit, Flag.JUMP, 0)
+    flags |= np.where((invalid > 0) | ~usable, Flag.INVALID, 0)
+    return Scores(np.arange(n), peak, duration, peak_z, duration_z, shape, shape_z, steps, jump, invalid, flags)
+
+
+FIELDS = ["cycle", "flags", "reasons", "peak_mm", "duration_s", "peak_z", "duration_z", "shape_mm", "shape_z",
+          "max_gap_s", "max_jump", "invalid"]
+
+
+def flags_path(capture_path, out_dir) -> Path:
+    return Path(out_dir) / f"{Path(capture_path).stem}.anomalies.csv"
+
+
+def save_flags(scores: Scores, path) -> Path:
+    """One row per flagged cycle (the header alone when none is)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for i in np.flatnonzero(scores.flags):
+            writer.writerow([int(scores.cycle[i]), int(scores.flags[i]), describe(scores.flags[i])]
+                            + [f"{float(getattr(scores, name)[i]):.4g}" for name in FIELDS[3:]])
+    return path
+
+
+def load_flags(path) -> Set[int]:
+    """Cycle numbers flagged in a save_flags() file; empty when it does not exist."""
+    try:
+        with open(path, newline="") as f:
+            return {int(row["cycle"]) for row in csv.DictReader(f)}
+    except FileNotFoundError:
+        return set()
+
+
+def _process(task):
+    capture_path, out_dir, template_dir, z_limit, cache = task
+    start = time.perf_counter()
+    try:
+        capture = cache.memoize("capture", [capture_path], lambda: load_capture(capture_path), cycle=None)
+        template = None
+        if template_dir is not None:
+            template_path = Path(template_dir) / f"{capture_path.stem}.template.npz"
+            template = ensemble.load_template(template_path)[0] if template_path.exists() else None
+        scores = score(capture, template, z_limit, cache)
+        out = save_flags(scores, flags_path(capture_path, out_dir))
+        counts = ", ".join(f"{f.name.lower()} {int(np.count_nonzero(scores.flags & f))}" for f in Flag
+                           if (scores.flags & f).any())
+        return (f"{capture_path}: {len(scores.flagged)}/{len(scores.cycle)} cycles flagged"
+                f"{f' ({counts})' if counts else ''} -> {out} ({time.perf_counter() - start:.2f} s)"), True
+    except (OSError, KeyError, ValueError) as e:
+        return f"{capture_path}: {e}", False
+
+
+def main():
+    from .overlay import captures
+
+    p = argparse.ArgumentParser(prog="python -m squatpress.analysis.anomaly",
+                                description="Flag anomalous cycles of each capture")
+    p.add_argument("paths", nargs="+", help="capture CSVs, .session directories or folders to search")
+    p.add_argument("--out", default="anomalies", help="directory for <capture>.anomalies.csv (default: anomalies)")
+    p.add_argument("--templates", help="directory of <capture>.template.npz to score against "
+                                       "(default: each capture's own phase template)")
+    p.add_argument("--z", type=float, default=Z_LIMIT, help=f"robust z-score limit (default: {Z_LIMIT})")
+    p.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    p.add_argument("--no-cache", action="store_true", help="recompute everything instead of using the disk cache")
+    args = p.parse_args()
+
+    cache = Cache(False) if args.no_cache else default_cache()
+    tasks: List[tuple] = [(path, args.out, args.templates, args.z, cache) for path in captures(args.paths)]
+    jobs = min(args.jobs or os.cpu_count() or 1, max(len(tasks), 1))
+    if jobs == 1:
+        results = [_process(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_process, tasks))
+    for message, ok in results:
+        print(message, file=sys.stdout if ok else sys.stderr)
+    sys.exit(0 if all(ok for _, ok in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Regression run of the metric suite over every capture with ground truth.
+
+    python -m squatpress.analysis.batch data/csv                     # all sessions, all cores
+    python -m squatpress.analysis.batch data/csv --jobs 4 --out summary.csv
+
+Every capture CSV (time_s,position_mm,...) or .session directory under the
+root is paired with the ground-truth files (frame,mm) in its folder. When a
+folder has several, the one the capture correlates with best is used
+(pipeline.match_truth(), which skips truth fragments).
+
+Multi-cycle captures are split into cycles, those that never reach
+MIN_PEAK_FRACTION of the truth's peak are dropped, and every remaining
+cycle is aligned in one batched pass (pipeline.session_cycles()); the
+summary reports the median of each metric over the cycles.
+
+With --exclude-anomalies DIR, the cycles anomaly.py flagged and saved in
+DIR (<capture>.anomalies.csv) are left out as well; "excluded" counts
+those the peak filter had not already dropped.
+
+Sessions are independent, so they are spread over a process pool, one
+session per task. Parsed captures, alignments and per-cycle metrics go
+through the disk cache (cache.py), so a re-run only recomputes
+sessions whose files changed.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import metrics
+from .anomaly import flags_path, load_flags
+from .cache import Cache
+from .cache import default as default_cache
+from .loader import is_capture_file, load_capture, truth_files
+from .pipeline import MIN_PEAK_FRACTION, full_height, match_truth
+
+COLUMNS = ["session", "truth", "cycles", "excluded", "offset_ms", "correlation", "rms_mm", "max_error_mm", "bias_mm",
+           "peak_error_mm", "peak_time_error_ms", "tut_error_ms", "auc_error_mm_s", "seconds", "error"]
+
+
+def discover(root) -> List[Tuple[Path, List[Path]]]:
+    """(capture, candidate truths) for every capture under root whose folder has ground truth."""
+    pairs = []
+    for folder in sorted({p.parent for p in Path(root).rglob("*") if p.suffix in (".csv", ".session")}):
+        truths = truth_files(folder)
+        if not truths:
+            continue
+        captures = [p for p in sorted(folder.iterdir())
+                    if (p.suffix == ".session" and p.is_dir()) or (p.suffix == ".csv" and is_capture_file(p))]
+        # A capture converted to a .session is evaluated once, from the session
+        sessions = {p.with_suffix(".csv") for p in captures if p.suffix == ".session"}
+        pairs += [(p, truths) for p in captures if p not in sessions]
+    return pairs
+
+
+def evaluate(capture_path, truth_paths, threshold: float = metrics.TENSION_MM,
+             cache: Optional[Cache] = None, anomalies: Optional[Path] = None) -> Dict[str, object]:
+    """One summary row; failures are reported in the row instead of raised. `anomalies`: flags directory."""
+    start = time.perf_counter()
+    cache = cache if cache is not None else default_cache()
+    row: Dict[str, object] = {"session": str(capture_path)}
+    try:
+        capture = cache.memoize("capture", [capture_path], lambda: load_capture(capture_path), cycle=None)
+        exclude = sorted(load_flags(flags_path(capture_path, anomalies))) if anomalies is not None else []
+        truth, cycles = match_truth(capture, truth_paths, cache=cache, exclude=exclude)
+        if truth is None:
+            raise ValueError("no complete lift in the capture")
+
+        t, mm, kept, shifts, alignment = cycles
+        score = float(np.median(alignment.score))
+        per_cycle = cache.memoize(
+            "cycle-metrics", [capture_path, truth.path],
+            lambda: [metrics.compare(t[a:b] + shift, mm[a:b], truth.t, truth.mm, threshold)
+                     for a, b, shift in zip(kept[:-1], kept[1:], shifts)],
+            capture.calibration_id, min_peak=MIN_PEAK_FRACTION, threshold=threshold, exclude=exclude)
+        # Only flagged cycles the peak filter kept were actually left out
+        full = full_height(capture, truth, MIN_PEAK_FRACTION)[2]
+        excluded = int(np.count_nonzero(full[[i for i in exclude if i < len(full)]]))
+        row.update(truth=truth.path.name, cycles=len(per_cycle), excluded=excluded,
+                   offset_ms=float(np.median(alignment.offsets)) * 1e3, correlation=score)
+        for name in ("rms_mm", "max_error_mm", "bias_mm", "peak_error_mm", "peak_time_error_ms", "tut_error_ms",
+                     "auc_error_mm_s"):
+            row[name] = float(np.median([m[name] for m in per_cycle]))
+    except (OSError, KeyError, ValueError) as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def _evaluate(task):
+    return evaluate(*task)
+
+
+def run(root, jobs: Optional[int] = None, threshold: float = metrics.TENSION_MM,
+        cache: Optional[Cache] = None, anomalies: Optional[Path] = None) -> List[Dict[str, object]]:
+    cache = cache if cache is not None else default_cache()
+    tasks = [(capture, truths, threshold, cache, anomalies) for capture, truths in discover(root)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) <= 1:
+        return [_evaluate(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        return list(pool.map(_evaluate, tasks))
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_table(rows, root):
+    print(f"{'session':<48} {'cyc':>4} {'offset ms':>9} {'rms mm':>7} {'max mm':>7} {'peak mm':>8} "
+          f"{'TUT ms':>7} {'corr':>6}")
+    for row in rows:
+        name = os.path.relpath(row["session"], root)
+        if "error" in row:
+            print(f"{name:<48} {row['error'].splitlines()[0]}")
+            continue
+        print(f"{name:<48} {row['cycles']:>4} {row['offset_ms']:>9.1f} {row['rms_mm']:>7.3f} "
+              f"{row['max_error_mm']:>7.3f} {row['peak_error_mm']:>+8.3f} {row['tut_error_ms']:>+7.1f} "
+              f"{row['correlation']:>6.3f}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Evaluate every capture/ground-truth pair under a directory")
+    p.add_argument("root", nargs="?", default="data/csv")
+    p.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    p.add_argument("--threshold", type=float, default=metrics.TENSION_MM, help="tension threshold (mm)")
+    p.add_argument("--out", help="write the summary table as CSV")
+    p.add_argument("--no-cache", action="store_true", help="recompute everything instead of using the disk cache")
+    p.add_argument("--exclude-anomalies", metavar="DIR", type=Path,
+                   help="leave out the cycles flagged in DIR by python -m squatpress.analysis.anomaly")
+    args = p.parse_args()
+
+    start = time.perf_counter()
+    rows = run(args.root, args.jobs, args.threshold, Cache(False) if args.no_cache else None, args.exclude_anomalies)
+    elapsed = time.perf_counter() - start
+    if not rows:
+        print(f"No capture with ground truth under {args.root}")
+        sys.exit(1)
+    print_table(rows, args.root)
+    busy = sum(row["seconds"] for row in rows)
+    print(f"\n{len(rows)} sessions in {elapsed:.2f} s ({busy:.2f} s of work, {args.jobs or os.cpu_count()} jobs)")
+    if args.out:
+        write_csv(rows, args.out)
+        print(f"Summary written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
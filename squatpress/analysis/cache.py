@@ -0,0 +1,270 @@
+"""
+Content-addressed disk cache for parsed captures and derived results.
+
+Each entry is one pickle named by the SHA-256 of what produced it: the kind
+of result, the bytes of every input file (all columns and the header of a
+.session), the calibration ID, the parameters and the squatpress source
+(the analysis package and the session/calibration code the loader uses).
+Editing a capture, recalibrating it or changing the code gives new keys,
+so stale entries are never read; they age out instead. Each entry's mtime
+is its last use, and once the directory grows past max_bytes the least
+recently used entries are deleted. The size is tracked as entries are
+written and the directory is only scanned when it is over budget (or
+every EVICT_CHECK_EVERY writes, to notice other processes' entries).
+A cache that cannot be written (read-only, disk full) logs a warning and
+the results are simply not kept.
+
+    cache = Cache()
+    capture = cache.memoize("capture", [path], lambda: load_capture(path, cycle), cycle=cycle)
+
+    python -m squatpress.analysis.cache info
+    python -m squatpress.analysis.cache clear
+
+The directory is $SQUATPRESS_CACHE_DIR, else $XDG_CACHE_HOME/squatpress
+(~/.cache/squatpress); SQUATPRESS_CACHE_DIR=off disables it.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 256 << 20
+SUFFIX = ".pkl"
+EVICT_CHECK_EVERY = 256     # writes between directory scans when under budget
+
+T = TypeVar("T")
+
+_digests: Dict[Tuple[str, int, int], str] = {}     # (path, size, mtime_ns) -> sha256, per process
+_code_digest: Optional[str] = None
+
+
+def default_dir() -> Optional[Path]:
+    configured = os.environ.get("SQUATPRESS_CACHE_DIR")
+    if configured:
+        return None if configured.lower() in ("0", "off", "none") else Path(configured).expanduser()
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "squatpress"
+
+
+def _file_digest(path: Path) -> str:
+    stat = path.stat()
+    memo = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if memo not in _digests:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _digests[memo] = h.hexdigest()
+    return _digests[memo]
+
+
+def digest(path) -> str:
+    """SHA-256 of a file's bytes, or of every file in a .session directory (names included)."""
+    path = Path(path)
+    if not path.is_dir():
+        return _file_digest(path)
+    h = hashlib.sha256()
+    for child in sorted(p for p in path.iterdir() if p.is_file() and not p.name.endswith(".tmp")):
+        h.update(child.name.encode() + b"\0" + _file_digest(child).encode())
+    return h.hexdigest()
+
+
+def _encode(value):
+    if isinstance(value, np.ndarray):
+        return [str(value.dtype), value.shape, hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()]
+    return str(value)
+
+
+def code_digest() -> str:
+    """
+    SHA-256 of the squatpress source (this package and the session and
+    calibration modules the loader uses), so changing the code invalidates
+    what it computed.
+    """
+    global _code_digest
+    if _code_digest is None:
+        h = hashlib.sha256()
+        package = Path(__file__).resolve().parent
+        for source in sorted(package.glob("*.py")) + sorted(package.parent.glob("*.py")):
+            h.update(source.name.encode() + b"\0" + source.read_bytes())
+        _code_digest = h.hexdigest()
+    return _code_digest
+
+
+class Cache:
+    def __init__(self, directory=None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """`directory` defaults to default_dir(); Cache(False) caches nothing."""
+        if directory is None:
+            directory = default_dir()
+        self.directory = Path(directory) if directory else None
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._size: Optional[int] = None    # bytes on disk as of the last scan plus our writes since
+        self._writes = 0
+        self._write_failed = False
+
+    def __repr__(self):
+        return f"Cache({str(self.directory)!r}, max_bytes={self.max_bytes})"
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def key(self, kind: str, inputs: Iterable = (), calibration_id: Optional[str] = None, **params) -> str:
+        """Hex key for `kind` computed from the input files with these parameters (arrays by content)."""
+        description = {"kind": kind, "code": code_digest(), "inputs": [digest(p) for p in inputs],
+                       "calibration_id": calibration_id, "params": params}
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=_encode).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + SUFFIX)
+
+    def get(self, key: str, default=None):
+        if not self.enabled:
+            return default
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Truncated, unreadable or from an incompatible version: recompute
+            self.misses += 1
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                written = f.tell()
+            os.replace(tmp, path)
+        except OSError as e:
+            # Caching is an optimisation; a read-only or full disk must not fail the analysis
+            if not self._write_failed:
+                logging.getLogger(__name__).warning(f"Not caching results in {self.directory}: {e}")
+                self._write_failed = True
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += written
+        self._writes += 1
+        if self._size > self.max_bytes or self._writes % EVICT_CHECK_EVERY == 0:
+            self.evict()
+
+    def memoize(self, kind: str, inputs: Iterable, compute: Callable[[], T],
+                calibration_id: Optional[str] = None, **params) -> T:
+        """
+        compute(), or what it returned last time for the same kind, input
+        files, calibration and parameters. The parameters only form the key,
+        so they must include everything compute() depends on besides the
+        input files.
+        """
+        if not self.enabled:
+            return compute()
+        key = self.key(kind, inputs, calibration_id, **params)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def entries(self) -> List[Tuple[Path, int, int]]:
+        """(path, bytes, last use in ns) of every entry, least recently used first."""
+        if not self.enabled or not self.directory.exists():
+            return []
+        entries = []
+        for path in self.directory.glob(f"*/*{SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:       # evicted by another process
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda e: e[2])
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Delete least recently used entries until the cache fits; returns the bytes freed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        excess = total - limit
+        freed = 0
+        for path, size, _ in entries:
+            if freed >= excess:
+                break
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                continue
+            freed += size
+        self._size = total - freed
+        return freed
+
+    def clear(self) -> int:
+        return self.evict(0)
+
+
+_default: Optional[Cache] = None
+
+
+def default() -> Cache:
+    """The process-wide cache in default_dir()."""
+    global _default
+    if _default is None:
+        _default = Cache()
+    return _default
+
+
+def main():
+    p = argparse.ArgumentParser(prog="python -m squatpress.analysis.cache", description="Inspect the analysis cache")
+    p.add_argument("command", choices=["info", "clear"])
+    p.add_argument("--dir", help="cache directory (default: $SQUATPRESS_CACHE_DIR or ~/.cache/squatpress)")
+    args = p.parse_args()
+
+    cache = Cache(args.dir) if args.dir else default()
+    if not cache.enabled:
+        print("Cache disabled (SQUATPRESS_CACHE_DIR=off)")
+        return
+    if args.command == "info":
+        entries = cache.entries()
+        print(f"{cache.directory}: {len(entries)} entries, {sum(e[1] for e in entries) / 1e6:.2f} MB "
+              f"of {cache.max_bytes / 1e6:.0f} MB")
+    else:
+        print(f"Freed {cache.clear() / 1e6:.2f} MB from {cache.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Banded dynamic time warping for comparing lift cycles.
+
+A rigid time shift (alignment.py) cannot explain the actuator and the sensor
+moving at slightly different speeds through a lift. DTW matches every
+sensor sample to a ground-truth sample along a monotonic warping path, and
+the path's deviation from the diagonal is the timing error at that point
+of the lift.
+
+The path is restricted to a Sakoe-Chiba band of +/- `window` samples around
+the diagonal, so each of the N rows costs O(w). Within a row the recurrence
+
+    D[i, j] = c[i, j] + min(D[i-1, j-1], D[i-1, j], D[i, j-1])
+
+has a serial dependency on D[i, j-1], which is resolved in closed form:
+with a = min(D[i-1, j-1], D[i-1, j]) and P the prefix sum of c along the row,
+
+    D[i, j] = P[j] + min over k <= j of (a[k] - P[k-1])
+
+i.e. one cumsum and one minimum.accumulate per row, vectorised across the
+band and across every cycle of a session at once. Only the previous row is
+kept, so the distance alone needs O(w) memory per cycle; the warping path
+adds one byte per band cell for the traceback directions.
+
+warp_cycles() first applies the rigid per-cycle offsets from align_cycles(),
+then warps each cycle against the truth on a common time grid and reports
+the remaining timing error per phase:
+
+    concentric: truth samples up to its peak
+    eccentric:  truth samples after the peak
+
+counting only samples where the truth moves faster than MOVING_SPEED of its
+peak speed. On the floor, at the top and on slow plateaus a small position
+bias lets the path slide along nearly-equal values, so timing there is not
+meaningful.
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .alignment import align_cycles, resample, resample_cycles
+
+DEFAULT_WINDOW = 0.1        # seconds either side of the diagonal
+DEFAULT_DT = 0.005          # warping grid step (s)
+MOVING_SPEED = 0.2          # fraction of the truth's peak speed that counts as moving
+PHASES = ("concentric", "eccentric")
+
+_DIAG, _UP, _LEFT = 0, 1, 2
+
+
+class CycleWarp(NamedTuple):
+    grid: np.ndarray            # (samples,) truth time grid the cycles were warped on (s)
+    offsets: np.ndarray         # (cycles,) rigid offsets applied before warping (s)
+    distance: np.ndarray        # (cycles,) accumulated |cycle - truth| along the path / samples (mm)
+    lag: np.ndarray             # (cycles, samples) matched sensor time - truth time at each grid point (s)
+    phase_lag: np.ndarray       # (cycles, len(PHASES)) mean lag per phase (s)
+    phase_rms: np.ndarray       # (cycles, len(PHASES)) RMS lag per phase (s)
+
+
+def dtw(x, y, window: int, path: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Banded DTW of each row of x against the matching row of y (or against a
+    single y). Both are on the same grid, so rows have equal length n.
+
+    Returns (distance, warp): the accumulated absolute difference along the
+    best path divided by n, and for every y index the mean x index matched
+    to it (cycles x n), or None when path is False.
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    y = np.broadcast_to(np.asarray(y, dtype=np.float64), x.shape)
+    cycles, n = x.shape
+    w = int(min(max(window, 0), n - 1))
+    width = 2 * w + 1
+    band = np.arange(width)
+
+    # y_band[:, i, k] = y[:, i + k - w]: the band of y facing row i of x
+    y_band = sliding_window_view(np.pad(y, ((0, 0), (w, w))), width, axis=1)
+    prev = np.full((cycles, width + 1), np.inf)     # previous row, plus an inf column so prev[:, k + 1] exists
+    start = np.full((cycles, width), np.inf)
+    start[:, w] = 0.0
+    left_edge = np.full((cycles, 1), np.inf)
+    dirs = np.empty((n, cycles, width), dtype=np.int8) if path else None
+
+    for i in range(n):
+        valid = (i + band - w >= 0) & (i + band - w < n)
+        cost = np.where(valid, np.abs(x[:, i, None] - y_band[:, i]), 0.0)
+        diag, up = prev[:, :width], prev[:, 1:]
+        entry = start if i == 0 else np.minimum(diag, up)
+        prefix = np.cumsum(cost, axis=1)
+        row = prefix + np.minimum.accumulate(entry - (prefix - cost), axis=1)
+        row[:, ~valid] = np.inf
+        if path:
+            left = np.concatenate([left_edge, row[:, :-1]], axis=1)
+            dirs[i] = np.argmin(np.stack([diag, up, left]), axis=0)
+        prev[:, :width] = row
+
+    distance = prev[:, w] / n
+    if not path:
+        return distance, None
+
+    # Trace every cycle's path back from (n-1, n-1) to (0, 0) together
+    warp_sum = np.zeros((cycles, n))
+    warp_count = np.zeros((cycles, n))
+    i = np.full(cycles, n - 1)
+    k = np.full(cycles, w)
+    active = np.arange(cycles)
+    while len(active):
+        ii, kk = i[active], k[active]
+        jj = ii + kk - w
+        warp_sum[active, jj] += ii
+        warp_count[active, jj] += 1
+        step = dirs[ii, active, kk]
+        i[active] = np.where(step == _LEFT, ii, ii - 1)
+        k[active] = kk + (step == _UP) - (step == _LEFT)
+        active = active[(ii > 0) | (jj > 0)]
+    return distance, warp_sum / warp_count
+
+
+def phase_masks(truth: np.ndarray) -> np.ndarray:
+    """(len(PHASES), samples) masks of the moving concentric and eccentric parts of a truth curve."""
+    peak = int(np.argmax(truth))
+    speed = np.abs(np.gradient(truth))
+    moving = speed >= MOVING_SPEED * speed.max()
+    index = np.arange(len(truth))
+    return np.stack([moving & (index <= peak), moving & (index > peak)])
+
+
+def warp_cycles(t, x, offsets, truth_t, truth_pos, window: float = DEFAULT_WINDOW, dt: float = DEFAULT_DT,
+                shifts=None) -> CycleWarp:
+    """
+    Warp every cycle of a session (flat arrays split by `offsets`, as in
+    align_cycles()) against the ground truth. `shifts` are rigid per-cycle
+    offsets to apply first; by default they come from align_cycles(). The
+    reported lag is what remains after them, positive where the sensor lags.
+    """
+    truth_t = np.asarray(truth_t, dtype=np.float64)
+    truth_pos = np.asarray(truth_pos, dtype=np.float64)
+    if shifts is None:
+        shifts = align_cycles(t, x, offsets, truth_t, truth_pos).offsets
+    shifts = np.asarray(shifts, dtype=np.float64)
+
+    grid = np.arange(truth_t[0], truth_t[-1] + dt / 2, dt)
+    cycles, _ = resample_cycles(t, x, offsets, grid, shifts)
+    truth, _ = resample(truth_t, truth_pos, grid)
+    distance, warp = dtw(cycles, truth, int(round(window / dt)))
+    lag = (warp - np.arange(len(grid))) * dt
+
+    masks = phase_masks(truth)
+    counts = np.maximum(masks.sum(axis=1), 1)
+    phase_lag = (lag @ masks.T) / counts
+    phase_rms = np.sqrt((lag ** 2 @ masks.T) / counts)
+    return CycleWarp(grid, shifts, distance, lag, phase_lag, phase_rms)
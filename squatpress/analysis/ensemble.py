@@ -0,0 +1,308 @@
+"""
+Ensemble statistics across the cycles of a session, and the template lift.
+
+Every full-height cycle (pipeline.session_cycles(), aligned to the truth
+when there is one) is resampled onto a common grid:
+
+  - time: seconds on the truth's clock (or since the trigger), every DT;
+  - phase: the fraction of each cycle's own duration, PHASE_POINTS points.
+
+At each grid point the accumulator keeps running sums (mean, SD), a
+histogram of positions QUANTILE_RESOLUTION_MM wide per bin (median and
+percentile bands) and Poisson bootstrap sums (a confidence interval for
+the mean: every cycle gets a Poisson(1) weight per replicate, which needs
+no second pass). Its memory depends on the grid, not on the number of
+cycles, so stream() can feed a capture of any length through it in
+chunks of complete cycles.
+
+The result is a Template: a few float32 rows per grid point, saved as a
+self-contained .npz of ~15 kB.
+
+    template = ensemble.ensemble(pipeline.session_cycles(capture, truth))
+    template = ensemble.stream("data/csv/2026.02.27/sensor2_20260227_134448.csv", chunk_rows=20000)
+    ensemble.save_template(template, "templates/sensor2_20260227_134448.template.npz")
+
+    python -m squatpress.analysis.ensemble data/csv --out templates/ [--phase] [--plot]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import segmentation
+from .alignment import align_cycles, resample_cycles
+from .cache import Cache
+from .loader import GroundTruth, iter_capture, truth_files
+from .pipeline import MIN_PEAK_FRACTION, Cycles, match_truth
+
+DT = 0.005                      # s between time-grid points
+PHASE_POINTS = 201
+LEVELS = (5, 25, 50, 75, 95)    # percentiles kept in a template
+CI = 95                         # % confidence interval of the mean
+REPLICATES = 200                # bootstrap replicates
+QUANTILE_RESOLUTION_MM = 0.01
+MM_RANGE = (-5.0, 55.0)         # positions outside are counted in the end bins
+SPAN_S = 2.0                    # time grid without truth: 0 .. SPAN_S after the trigger
+TRUTH_MARGIN_S = 0.1            # time grid with truth: its span plus this on either side
+DEFAULT_CHUNK_ROWS = 1 << 18
+VERSION = 1
+
+
+class Template(NamedTuple):
+    kind: str                   # "time" or "phase"
+    grid: np.ndarray
+    cycles: int
+    count: np.ndarray           # cycles covering each grid point
+    mean: np.ndarray
+    sd: np.ndarray
+    levels: Tuple[int, ...]
+    percentiles: np.ndarray     # len(levels) x grid
+    ci: np.ndarray              # 2 x grid: CI% bootstrap interval of the mean
+
+    @property
+    def median(self) -> np.ndarray:
+        return self.percentiles[self.levels.index(50)]
+
+
+class Accumulator:
+    """Per-grid-point statistics over cycles added a chunk at a time."""
+
+    def __init__(self, grid, levels: Sequence[int] = LEVELS, replicates: int = REPLICATES,
+                 resolution: float = QUANTILE_RESOLUTION_MM, mm_range: Tuple[float, float] = MM_RANGE,
+                 seed: int = 0):
+        self.grid = np.asarray(grid, dtype=np.float64)
+        self.levels = tuple(levels)
+        self.resolution = resolution
+        self.lo = mm_range[0]
+        self.bins = int(np.ceil((mm_range[1] - mm_range[0]) / resolution))
+        self.rng = np.random.default_rng(seed)
+        g = len(self.grid)
+        self.cycles = 0
+        self.count = np.zeros(g)
+        self.sum = np.zeros(g)
+        self.sum_sq = np.zeros(g)
+        self.histogram = np.zeros(g * self.bins, dtype=np.int32)
+        self.boot_sum = np.zeros((replicates, g))
+        self.boot_count = np.zeros((replicates, g))
+
+    def add(self, values, mask):
+        """Add cycles: values and mask are cycles x grid (resample_cycles())."""
+        values = np.where(mask, values, 0.0)
+        w = mask.astype(np.float64)
+        self.cycles += len(values)
+        self.count += w.sum(axis=0)
+        self.sum += values.sum(axis=0)
+        self.sum_sq += (values ** 2).sum(axis=0)
+
+        column = np.broadcast_to(np.arange(len(self.grid)), values.shape)[mask]
+        b = np.clip(((values[mask] - self.lo) / self.resolution).astype(np.int64), 0, self.bins - 1)
+        code, n = np.unique(column * self.bins + b, return_counts=True)
+        self.histogram[code] += n.astype(self.histogram.dtype)
+
+        weights = self.rng.poisson(1.0, (len(self.boot_sum), len(values))).astype(np.float64)
+        self.boot_sum += weights @ values
+        self.boot_count += weights @ w
+
+    def _percentiles(self) -> np.ndarray:
+        histogram = self.histogram.reshape(len(self.grid), self.bins)
+        cdf = np.cumsum(histogram, axis=1, dtype=np.int32)
+        out = np.full((len(self.levels), len(self.grid)), np.nan)
+        for i, level in enumerate(self.levels):
+            # Interpolate within the first bin whose cumulative count reaches the target
+            target = self.count * level / 100
+            b = np.minimum((cdf < target[:, None]).sum(axis=1), self.bins - 1)[:, None]
+            inside = np.take_along_axis(histogram, b, axis=1)[:, 0]
+            below = np.take_along_axis(cdf, b, axis=1)[:, 0] - inside
+            frac = np.clip((target - below) / np.maximum(inside, 1), 0, 1)
+            out[i] = np.where(self.count > 0, self.lo + (b[:, 0] + frac) * self.resolution, np.nan)
+        return out
+
+    def result(self, kind: str) -> Template:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            n = np.where(self.count > 0, self.count, np.nan)
+            mean = self.sum / n
+            sd = np.sqrt(np.maximum(self.sum_sq / n - mean ** 2, 0) * n / (n - 1))
+            boot = self.boot_sum / np.where(self.boot_count > 0, self.boot_count, np.nan)
+            tail = (100 - CI) / 2
+            ci = np.full((2, len(self.grid)), np.nan)
+            covered = self.count > 0
+            if len(boot) and covered.any():
+                ci[:, covered] = np.nanpercentile(boot[:, covered], [tail, 100 - tail], axis=0)
+        f4 = np.float32
+        return Template(kind, self.grid.astype(f4), self.cycles, self.count.astype(np.int32), mean.astype(f4),
+                        sd.astype(f4), self.levels, self._percentiles().astype(f4), ci.astype(f4))
+
+
+def time_grid(truth: Optional[GroundTruth] = None, dt: float = DT) -> np.ndarray:
+    if truth is None:
+        return np.arange(0.0, SPAN_S + dt / 2, dt)
+    return np.arange(truth.t[0] - TRUTH_MARGIN_S, truth.t[-1] + TRUTH_MARGIN_S + dt / 2, dt)
+
+
+def phase_grid(points: int = PHASE_POINTS) -> np.ndarray:
+    return np.linspace(0.0, 1.0, points)
+
+
+def resample(cycles: Cycles, grid, phase: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """cycles x grid positions and coverage mask, on the aligned time or the phase grid."""
+    if not phase:
+        return resample_cycles(cycles.t, cycles.mm, cycles.offsets, grid, cycles.shifts)
+    duration = np.repeat(segmentation.durations(cycles.t, cycles.offsets), segmentation.lengths(cycles.offsets))
+    return resample_cycles(segmentation.relative(cycles.t, cycles.offsets) / duration, cycles.mm, cycles.offsets, grid)
+
+
+def ensemble(cycles: Cycles, phase: bool = False, grid=None, truth: Optional[GroundTruth] = None,
+             **options) -> Template:
+    """Template of cycles held in memory (options go to Accumulator)."""
+    grid = grid if grid is not None else (phase_grid() if phase else time_grid(truth))
+    acc = Accumulator(grid, **options)
+    if len(cycles.offsets) > 1:
+        acc.add(*resample(cycles, acc.grid, phase))
+    return acc.result("phase" if phase else "time")
+
+
+def iter_cycles(path, truth: Optional[GroundTruth] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                min_peak_fraction: float = MIN_PEAK_FRACTION) -> Iterator[Cycles]:
+    """
+    pipeline.session_cycles() a chunk of complete cycles at a time. Rows of
+    the cycle still running at the end of a chunk are carried over to the
+    next. A chunk without time resets or cycle changes is split at lifts,
+    as a continuous log is. Without truth the peak threshold is relative to
+    the median peak of the cycles read so far (a chunk's own median is
+    unreliable when it holds only a few cycles, like the last one).
+    """
+    carry = None
+    seen = np.empty(0)
+    chunks = iter_capture(path, chunk_rows)
+    chunk = next(chunks, None)
+    while chunk is not None:
+        following = next(chunks, None)
+        t, mm, cycle = chunk.t, chunk.mm, chunk.cycle
+        if carry is not None:
+            t, mm = np.concatenate([carry[0], t]), np.concatenate([carry[1], mm])
+            cycle = np.concatenate([carry[2], cycle]) if cycle is not None else None
+        offsets = segmentation.split(t, cycle)
+        continuous = len(offsets) == 2 and len(segmentation.by_lift(mm)) > 2
+        if continuous:
+            offsets = segmentation.by_lift(mm)
+        if following is not None:
+            # The last cycle may continue in the next chunk
+            cut = offsets[-2]
+            carry = (t[cut:], mm[cut:], cycle[cut:] if cycle is not None else None)
+            offsets = offsets[:-1]
+        chunk = following
+        if len(offsets) < 2:
+            continue
+        if continuous:
+            t = np.concatenate([segmentation.relative(t[:offsets[-1]], offsets), t[offsets[-1]:]])
+        if truth is None:
+            seen = np.concatenate([seen, segmentation.peaks(mm, offsets)])
+        reference = truth.mm.max() if truth is not None else np.median(seen)
+        keep = segmentation.filter_cycles(t, mm, offsets, min_peak_fraction * reference)
+        if not keep.any():
+            continue
+        (ct, cmm), packed = segmentation.gather(offsets, keep, t, mm)
+        if truth is None:
+            yield Cycles(ct, cmm, packed, np.zeros(len(packed) - 1), None)
+        else:
+            alignment = align_cycles(ct, cmm, packed, truth.t, truth.mm)
+            yield Cycles(ct, cmm, packed, alignment.offsets, alignment)
+
+
+def stream(path, truth: Optional[GroundTruth] = None, phase: bool = False, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+           **options) -> Template:
+    """Template of a capture read chunk_rows rows at a time; memory stays bounded by the chunk and the grid."""
+    acc = Accumulator(phase_grid() if phase else time_grid(truth), **options)
+    for cycles in iter_cycles(path, truth, chunk_rows):
+        acc.add(*resample(cycles, acc.grid, phase))
+    return acc.result("phase" if phase else "time")
+
+
+def pick_truth(path, truth_paths=None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               cache: Optional[Cache] = None) -> Optional[GroundTruth]:
+    """pipeline.match_truth() on the first chunk of the capture (default: the truth files in its folder)."""
+    path = Path(path)
+    truth_paths = truth_files(path.parent) if truth_paths is None else truth_paths
+    first = next(iter_capture(path, chunk_rows), None)
+    if first is None or not truth_paths:
+        return None
+    return match_truth(first, truth_paths, cache=cache)[0]
+
+
+def save_template(template: Template, path, **meta) -> Path:
+    """float32 .npz with the template and a JSON header (meta: capture, truth, ...)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = {"version": VERSION, "kind": template.kind, "cycles": template.cycles,
+              "levels": list(template.levels), "ci": CI, **meta}
+    np.savez_compressed(path, header=np.array(json.dumps(header, default=str)), grid=template.grid,
+                        count=template.count, mean=template.mean, sd=template.sd,
+                        percentiles=template.percentiles, ci=template.ci)
+    return path
+
+
+def load_template(path) -> Tuple[Template, dict]:
+    with np.load(path) as data:
+        header = json.loads(str(data["header"]))
+        template = Template(header["kind"], data["grid"], header["cycles"], data["count"], data["mean"], data["sd"],
+                            tuple(header["levels"]), data["percentiles"], data["ci"])
+    return template, header
+
+
+def main():
+    p = argparse.ArgumentParser(prog="python -m squatpress.analysis.ensemble",
+                                description="Ensemble statistics and template lift for each capture")
+    p.add_argument("paths", nargs="+", help="capture CSVs, .session directories or folders to search")
+    p.add_argument("--out", default="templates", help="directory for <capture>.template.npz (default: templates)")
+    p.add_argument("--phase", action="store_true", help="phase grid (fraction of each cycle) instead of time")
+    p.add_argument("--truth", help="ground truth CSV (default: the best match in each capture's folder)")
+    p.add_argument("--no-truth", action="store_true", help="do not align to any ground truth")
+    p.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows read at a time")
+    p.add_argument("--replicates", type=int, default=REPLICATES, help="bootstrap replicates")
+    p.add_argument("--plot", action="store_true", help="also save <capture>_template.png")
+    args = p.parse_args()
+
+    from .overlay import captures
+
+    failed = False
+    for capture in captures(args.paths):
+        try:
+            truth = None if args.no_truth else pick_truth(capture, [args.truth] if args.truth else None,
+                                                          args.chunk_rows)
+            template = stream(capture, truth, args.phase, args.chunk_rows, replicates=args.replicates)
+            if not template.cycles:
+                raise ValueError("no complete lift in the capture")
+            out = save_template(template, Path(args.out) / f"{capture.stem}.template.npz",
+                                capture=capture, truth=truth.path if truth is not None else None)
+            spread = ""
+            if template.cycles > 1:
+                width = np.nanmedian(template.ci[1] - template.ci[0])
+                spread = f", median SD {np.nanmedian(template.sd):.3f} mm, median {CI}% CI width {width:.3f} mm"
+            print(f"{capture}: {template.cycles} cycles{spread} -> {out} ({out.stat().st_size / 1e3:.0f} kB)")
+            if args.plot:
+                from matplotlib.figure import Figure
+
+                from . import plotting
+
+                fig = Figure(figsize=(14, 7))
+                ax = fig.subplots()
+                plotting.template(ax, template)
+                if truth is not None and template.kind == "time":
+                    plotting.truth_overlay(ax, truth.t, truth.mm)
+                ax.set_title(f"{capture.name}: template of {template.cycles} cycles")
+                ax.legend(loc="upper left", fontsize=9)
+                png = Path(args.out) / f"{capture.stem}_template.png"
+                fig.savefig(png, dpi=150, bbox_inches="tight")
+                print(f"  saved {png}")
+        except (OSError, KeyError, ValueError) as e:
+            print(f"{capture}: {e}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Loading sensor captures and video ground truth for analysis.
+
+A capture is either a CSV in any of the logger layouts
+(time_s,position_mm,raw_value / cycle,time_s,position_mm,...) or a columnar
+.session directory (squatpress/session.py). Ground truth is the frame,mm
+CSV extracted from 240 fps video, with frame 1 (LED on) at t = 0.
+"""
+
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+CAMERA_FPS = 240.0
+
+
+class Capture(NamedTuple):
+    path: Path
+    t: np.ndarray                   # seconds since the GPIO trigger (or capture start)
+    mm: np.ndarray
+    raw: Optional[np.ndarray]       # raw counts, when logged
+    cycle: Optional[np.ndarray]     # GPIO sync cycle number, when logged
+    calibration_id: Optional[str]
+
+
+class GroundTruth(NamedTuple):
+    path: Path
+    t: np.ndarray                   # seconds since frame 1
+    mm: np.ndarray
+
+
+def load_capture(path, cycle: Optional[int] = None) -> Capture:
+    """Load a capture CSV or .session; `cycle` keeps only that GPIO cycle when the capture has one."""
+    path = Path(path)
+    if path.is_dir():
+        from squatpress.session import load_session
+
+        session = load_session(path, mmap=False)
+        columns = {"time_s": session.t, "position_mm": np.asarray(session.mm, dtype=np.float64),
+                   "raw_value": session["raw"] if "raw" in session else None,
+                   "cycle": session["cycle"] if "cycle" in session else None}
+        calibration_id = session.calibration_id
+    else:
+        import pandas as pd
+
+        df = pd.read_csv(path)
+        columns = {name: df[name].to_numpy() if name in df.columns else None
+                   for name in ("time_s", "position_mm", "raw_value", "cycle")}
+        calibration_id = None
+
+    t = np.asarray(columns["time_s"], dtype=np.float64)
+    mm = np.asarray(columns["position_mm"], dtype=np.float64)
+    raw, cycles = columns["raw_value"], columns["cycle"]
+    if cycle is not None and cycles is not None:
+        keep = cycles == cycle
+        t, mm = t[keep], mm[keep]
+        raw = raw[keep] if raw is not None else None
+        cycles = cycles[keep]
+    return Capture(path, t, mm, raw, cycles, calibration_id)
+
+
+def iter_capture(path, chunk_rows: int = 1 << 18) -> Iterator[Capture]:
+    """
+    A capture as consecutive Capture chunks of up to chunk_rows rows, for
+    captures too large to load at once. A .session is read through its
+    memory map; a CSV with pandas' chunked reader.
+    """
+    path = Path(path)
+    if path.is_dir():
+        from squatpress import calibration
+        from squatpress.session import load_session
+
+        session = load_session(path, mmap=True)
+        for start in range(0, len(session), chunk_rows):
+            rows = slice(start, start + chunk_rows)
+            raw = np.asarray(session["raw"][rows]) if "raw" in session else None
+            if "mm" in session:
+                mm = np.asarray(session["mm"][rows], dtype=np.float64)
+            else:
+                mm = calibration.to_mm(raw, session.calibration_id).astype(np.float64)
+            cycle = np.asarray(session["cycle"][rows]) if "cycle" in session else None
+            yield Capture(path, session["t_ns"][rows] / 1e9, mm, raw, cycle, session.calibration_id)
+        return
+
+    import pandas as pd
+
+    with pd.read_csv(path, chunksize=chunk_rows) as reader:
+        for df in reader:
+            columns = {name: df[name].to_numpy() if name in df.columns else None
+                       for name in ("raw_value", "cycle")}
+            yield Capture(path, df["time_s"].to_numpy(dtype=np.float64), df["position_mm"].to_numpy(dtype=np.float64),
+                          columns["raw_value"], columns["cycle"], None)
+
+
+def load_truth(path, fps: float = CAMERA_FPS) -> GroundTruth:
+    import pandas as pd
+
+    # usecols: some spreadsheet exports pad every row with empty columns
+    df = pd.read_csv(path, encoding="utf-8-sig", usecols=["frame", "mm"])
+    frame = df["frame"].to_numpy(dtype=np.float64)
+    return GroundTruth(Path(path), (frame - 1) / fps, df["mm"].to_numpy(dtype=np.float64))
+
+
+def _header(path) -> List[str]:
+    with open(path, encoding="utf-8-sig") as f:
+        return [name.strip() for name in f.readline().split(",")]
+
+
+def is_truth_file(path) -> bool:
+    """Ground truth is recognised by its frame,mm header; names are not reliable
+    ("sensor2_03.26.30 ground truth (1).csv" is a sensor capture)."""
+    return _header(path)[:2] == ["frame", "mm"]
+
+
+def is_capture_file(path) -> bool:
+    header = _header(path)
+    return "time_s" in header and "position_mm" in header
+
+
+def truth_files(folder) -> List[Path]:
+    """Ground-truth CSVs in a capture folder, shortest name first ("gt (1).csv" before "gt (1) redo 1.csv")."""
+    return sorted((p for p in Path(folder).glob("*.csv") if is_truth_file(p)), key=lambda p: (len(p.name), p.name))
+
+
+def find_truth(capture_path) -> Optional[Path]:
+    """The ground-truth CSV recorded alongside a capture, or None."""
+    candidates = truth_files(Path(capture_path).parent)
+    return candidates[0] if candidates else None
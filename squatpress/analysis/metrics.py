@@ -0,0 +1,116 @@
+"""
+Lift metrics shared by the validation scripts.
+
+Every function takes plain time/position arrays, so the same code scores a
+sensor trace, the ground truth or one cycle of a multi-cycle session.
+Errors are always sensor - truth.
+"""
+
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+TENSION_MM = 22.0       # positions at or above this count as time under tension
+
+
+class Tension(NamedTuple):
+    tut: float          # seconds between the first and last sample at or above the threshold
+    area: float         # mm*s under the curve over those samples
+    start: float
+    end: float
+
+
+class Peak(NamedTuple):
+    mm: float
+    t: float
+
+
+class ErrorStats(NamedTuple):
+    rms: float
+    mean_abs: float
+    max_abs: float
+    bias: float
+
+
+def auc(t, x) -> float:
+    """Trapezoidal area under x(t) in mm*s."""
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    if len(t) < 2:
+        return 0.0
+    return float(np.sum((x[1:] + x[:-1]) * np.diff(t)) / 2)
+
+
+def tension(t, x, threshold: float = TENSION_MM) -> Tension:
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    mask = x >= threshold
+    if not mask.any():
+        return Tension(0.0, 0.0, float("nan"), float("nan"))
+    start, end = float(t[mask].min()), float(t[mask].max())
+    return Tension(end - start, auc(t[mask], x[mask]), start, end)
+
+
+def peak(t, x) -> Peak:
+    i = int(np.argmax(x))
+    return Peak(float(x[i]), float(t[i]))
+
+
+def velocity(t, x, smooth_window: int = 0, polyorder: int = 3) -> np.ndarray:
+    """dx/dt in mm/s; smooth_window > 0 applies a Savitzky-Golay filter (needs scipy)."""
+    v = np.gradient(np.asarray(x, dtype=np.float64), np.asarray(t, dtype=np.float64))
+    if smooth_window:
+        from scipy.signal import savgol_filter
+
+        v = savgol_filter(v, smooth_window, polyorder)
+    return v
+
+
+def error_at(sensor_t, sensor_mm, truth_t, truth_mm, offset: float = 0.0,
+             at: str = "truth") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (times, sensor - truth) at the truth timepoints (at="truth") or at the
+    sensor's samples (at="sensor"), with the sensor shifted by `offset`
+    seconds. Only points inside the other signal's span are kept.
+    """
+    sensor_t = np.asarray(sensor_t, dtype=np.float64) + offset
+    sensor_mm = np.asarray(sensor_mm, dtype=np.float64)
+    truth_t = np.asarray(truth_t, dtype=np.float64)
+    truth_mm = np.asarray(truth_mm, dtype=np.float64)
+    if at == "truth":
+        inside = (truth_t >= sensor_t[0]) & (truth_t <= sensor_t[-1])
+        return truth_t[inside], np.interp(truth_t[inside], sensor_t, sensor_mm) - truth_mm[inside]
+    inside = (sensor_t >= truth_t[0]) & (sensor_t <= truth_t[-1])
+    return sensor_t[inside], sensor_mm[inside] - np.interp(sensor_t[inside], truth_t, truth_mm)
+
+
+def error_stats(err) -> ErrorStats:
+    err = np.asarray(err, dtype=np.float64)
+    if not len(err):
+        return ErrorStats(*(float("nan"),) * 4)
+    return ErrorStats(float(np.sqrt(np.mean(err ** 2))), float(np.mean(np.abs(err))),
+                      float(np.max(np.abs(err))), float(np.mean(err)))
+
+
+def compare(sensor_t, sensor_mm, truth_t, truth_mm, threshold: float = TENSION_MM) -> Dict[str, float]:
+    """
+    The metric suite for one aligned sensor trace against its ground truth
+    (sensor_t already shifted onto the truth's clock).
+    """
+    _, err = error_at(sensor_t, sensor_mm, truth_t, truth_mm)
+    stats = error_stats(err)
+    sensor_peak, truth_peak = peak(sensor_t, sensor_mm), peak(truth_t, truth_mm)
+    sensor_tension, truth_tension = tension(sensor_t, sensor_mm, threshold), tension(truth_t, truth_mm, threshold)
+    return {
+        "rms_mm": stats.rms,
+        "mean_abs_mm": stats.mean_abs,
+        "max_error_mm": stats.max_abs,
+        "bias_mm": stats.bias,
+        "auc_error_mm_s": auc(sensor_t, sensor_mm) - auc(truth_t, truth_mm),
+        "peak_error_mm": sensor_peak.mm - truth_peak.mm,
+        "peak_time_error_ms": (sensor_peak.t - truth_peak.t) * 1e3,
+        "tut_sensor_s": sensor_tension.tut,
+        "tut_truth_s": truth_tension.tut,
+        "tut_error_ms": (sensor_tension.tut - truth_tension.tut) * 1e3,
+        "tension_area_error_mm_s": sensor_tension.area - truth_tension.area,
+    }
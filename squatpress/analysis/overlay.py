@@ -0,0 +1,147 @@
+"""
+Overlay plots of every cycle of a capture, rendered headless.
+
+    python -m squatpress.analysis.overlay data/csv --out plots/        # one PNG per capture, all cores
+    python -m squatpress.analysis.overlay data/csv/2026.02.27/sensor2_20260227_134448.csv --density --out plots/
+
+Cycles come from pipeline.match_truth(): partial lifts are left out and,
+when the capture's folder has ground truth, every cycle is aligned to the
+best-matching truth, which is drawn on top. All cycles are one
+LineCollection (a density map past plotting.DENSITY_CYCLES), with the
+cycle mean +/- 1 SD overlaid unless --no-band. Figures are drawn on
+matplotlib's Agg canvas without pyplot, so no display is needed, one
+capture per worker process.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from . import plotting
+from .alignment import resample_cycles
+from .cache import Cache
+from .cache import default as default_cache
+from .loader import is_capture_file, load_capture, truth_files
+from .pipeline import Cycles, match_truth
+
+BAND_DT = 0.005             # s between mean/SD points
+BAND_COVERAGE = 0.5         # the band is drawn where at least this fraction of cycles has data
+
+
+def mean_band(cycles: Cycles, dt: float = BAND_DT) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(grid, mean, SD) of the aligned cycles wherever enough of them overlap."""
+    first = cycles.t[cycles.offsets[:-1]] + cycles.shifts
+    last = cycles.t[cycles.offsets[1:] - 1] + cycles.shifts
+    grid = np.arange(first.min(), last.max() + dt, dt)
+    values, mask = resample_cycles(cycles.t, cycles.mm, cycles.offsets, grid, cycles.shifts)
+    count = mask.sum(axis=0)
+    mean = np.sum(values * mask, axis=0) / np.maximum(count, 1)
+    sd = np.sqrt(np.sum((values - mean) ** 2 * mask, axis=0) / np.maximum(count, 1))
+    covered = count >= BAND_COVERAGE * len(first)
+    return grid[covered], mean[covered], sd[covered]
+
+
+def render(capture_path, out_dir, truth_path=None, band: bool = True, density: Optional[bool] = None,
+           dpi: int = 150, cache: Optional[Cache] = None) -> Tuple[Path, int]:
+    """Write <out_dir>/<capture>_cycles.png; returns (path, cycles drawn)."""
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+
+    cache = cache if cache is not None else default_cache()
+    capture_path = Path(capture_path)
+    capture = cache.memoize("capture", [capture_path], lambda: load_capture(capture_path), cycle=None)
+    truth_paths = [truth_path] if truth_path else truth_files(capture_path.parent)
+    truth, cycles = match_truth(capture, truth_paths, cache=cache)
+    n = len(cycles.offsets) - 1
+    if n == 0:
+        raise ValueError("no complete lift in the capture")
+
+    fig = Figure(figsize=(14, 7))
+    ax = fig.subplots()
+    artist = plotting.cycles(ax, cycles.t, cycles.mm, cycles.offsets, cycles.shifts, density=density,
+                             markers=n <= 20)
+    fig.colorbar(artist, ax=ax, label="Cycle" if isinstance(artist, LineCollection) else "Cycles per bin")
+    if band and n > 1:
+        grid, mean, sd = mean_band(cycles)
+        plotting.band(ax, grid, mean, mean - sd, mean + sd)
+    if truth is not None:
+        plotting.truth_overlay(ax, truth.t, truth.mm)
+    ax.set_xlabel("Time since ground truth start (s)" if truth is not None else "Time since cycle start (s)")
+    ax.set_ylabel("Position (mm)")
+    aligned = " (Per-Cycle Aligned) with Ground Truth" if truth is not None else ""
+    ax.set_title(f"{capture_path.name}: {n} Cycles Overlayed{aligned}")
+    ax.grid(True, alpha=0.3)
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend(loc="upper left", fontsize=9)
+
+    out = Path(out_dir) / f"{capture_path.stem}_cycles.png"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(out, dpi=dpi, bbox_inches="tight")
+    return out, n
+
+
+def captures(paths) -> List[Path]:
+    """Capture CSVs and .session directories given directly or found under the given directories."""
+    found = []
+    for path in map(Path, paths):
+        if path.suffix == ".session" or not path.is_dir():
+            found.append(path)
+            continue
+        candidates = sorted(p for p in path.rglob("*")
+                            if (p.suffix == ".session" and p.is_dir()) or (p.suffix == ".csv" and is_capture_file(p)))
+        # A capture converted to a .session is drawn once, from the session
+        sessions = {p.with_suffix(".csv") for p in candidates if p.suffix == ".session"}
+        found += [p for p in candidates if p not in sessions]
+    return found
+
+
+def _render(task):
+    capture_path, options = task
+    start = time.perf_counter()
+    try:
+        out, n = render(capture_path, **options)
+        return f"{capture_path}: {n} cycles -> {out} ({time.perf_counter() - start:.2f} s)", True
+    except (OSError, KeyError, ValueError) as e:
+        return f"{capture_path}: {e}", False
+
+
+def main():
+    p = argparse.ArgumentParser(prog="python -m squatpress.analysis.overlay",
+                                description="Overlay every cycle of each capture and save PNGs")
+    p.add_argument("paths", nargs="+", help="capture CSVs, .session directories or folders to search")
+    p.add_argument("--out", default="plots", help="output directory (default: plots)")
+    p.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    density = p.add_mutually_exclusive_group()
+    density.add_argument("--density", dest="density", action="store_true", default=None,
+                         help="always draw a density map")
+    density.add_argument("--lines", dest="density", action="store_false",
+                         help=f"always draw lines (default: density map past {plotting.DENSITY_CYCLES} cycles)")
+    p.add_argument("--no-band", action="store_true", help="leave out the mean +/- 1 SD overlay")
+    p.add_argument("--dpi", type=int, default=150)
+    p.add_argument("--no-cache", action="store_true", help="recompute everything instead of using the disk cache")
+    args = p.parse_args()
+
+    options = {"out_dir": args.out, "band": not args.no_band, "density": args.density, "dpi": args.dpi,
+               "cache": Cache(False) if args.no_cache else default_cache()}
+    tasks = [(path, options) for path in captures(args.paths)]
+    jobs = min(args.jobs or os.cpu_count() or 1, max(len(tasks), 1))
+    start = time.perf_counter()
+    if jobs == 1:
+        results = [_render(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_render, tasks))
+    for message, ok in results:
+        print(message, file=sys.stdout if ok else sys.stderr)
+    print(f"{sum(ok for _, ok in results)}/{len(results)} captures rendered in {time.perf_counter() - start:.2f} s")
+    sys.exit(0 if all(ok for _, ok in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+One capture analysed against its ground truth.
+
+SessionAnalysis computes each stage (load, align, errors, metrics, DTW,
+velocity) the first time something asks for it and keeps the result, so
+any combination of metrics and plots loads and aligns a session once. The
+parsed arrays, alignment, metrics and DTW also go through the disk cache
+(cache.py), so running the same analysis again skips straight to them:
+
+    a = SessionAnalysis("data/csv/2026.04.09/sensor2_142307.csv")     # truth found alongside
+    a.offset, a.metrics["tut_error_ms"]
+    plotting.comparison(ax, a)
+
+session_cycles() is the multi-cycle counterpart: the full-height cycles of
+a capture packed together, each aligned to the truth when there is one.
+"""
+
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from . import cache as analysis_cache
+from . import metrics, segmentation
+from .alignment import DEFAULT_SEARCH_RANGE, Alignment, CycleAlignment, align_cycles, find_time_offset
+from .loader import Capture, GroundTruth, find_truth, load_capture, load_truth
+
+MIN_PEAK_FRACTION = 0.8     # cycles peaking below this fraction of the reference peak are partial lifts
+MIN_TRUTH_FRACTION = 0.5    # truth covering less of a cycle correlates trivially well
+
+
+class Cycles(NamedTuple):
+    t: np.ndarray                           # full-height cycles packed end to end, each on its own trigger clock
+    mm: np.ndarray
+    offsets: np.ndarray                     # CSR: cycle i is t[offsets[i]:offsets[i+1]]
+    shifts: np.ndarray                      # seconds added to each cycle to line it up with the truth (0 without)
+    alignment: Optional[CycleAlignment]
+
+
+def split_cycles(capture: Capture) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (time, CSR offsets) of every cycle: split at time resets or GPIO cycle
+    changes, or at lifts for a continuous log, with each cycle's time then
+    restarted at 0. Cycle numbers elsewhere (e.g. anomaly flags) index these.
+    """
+    t = capture.t
+    offsets = segmentation.split(t, capture.cycle)
+    if len(offsets) == 2:
+        by_lift = segmentation.by_lift(capture.mm)
+        if len(by_lift) > 2:
+            offsets, t = by_lift, segmentation.relative(t, by_lift)
+    return t, offsets
+
+
+def full_height(capture: Capture, truth: Optional[GroundTruth] = None,
+                min_peak_fraction: float = MIN_PEAK_FRACTION) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    split_cycles() and a mask of the cycles that reach min_peak_fraction of
+    the truth's peak (the median cycle peak without truth).
+    """
+    t, offsets = split_cycles(capture)
+    reference = truth.mm.max() if truth is not None else np.median(segmentation.peaks(capture.mm, offsets))
+    return t, offsets, segmentation.filter_cycles(t, capture.mm, offsets, min_peak_fraction * reference)
+
+
+def session_cycles(capture: Capture, truth: Optional[GroundTruth] = None,
+                   min_peak_fraction: float = MIN_PEAK_FRACTION,
+                   cache: Optional[analysis_cache.Cache] = None, exclude: Iterable[int] = ()) -> Cycles:
+    """
+    The full_height() cycles that are not in `exclude` (cycle numbers, e.g.
+    anomaly.load_flags()), aligned to the truth in one batched pass.
+    """
+    cache = cache if cache is not None else analysis_cache.default()
+    mm = capture.mm
+    t, offsets, keep = full_height(capture, truth, min_peak_fraction)
+    keep[[i for i in exclude if i < len(keep)]] = False
+    (t, mm), packed = segmentation.gather(offsets, keep, t, mm)
+    if truth is None or not len(t):
+        return Cycles(t, mm, packed, np.zeros(len(packed) - 1), None)
+    alignment = cache.memoize("cycle-alignment", [truth.path], lambda: align_cycles(t, mm, packed, truth.t, truth.mm),
+                              capture.calibration_id, t=t, mm=mm, offsets=packed)
+    return Cycles(t, mm, packed, alignment.offsets, alignment)
+
+
+def match_truth(capture: Capture, truth_paths: Iterable, min_peak_fraction: float = MIN_PEAK_FRACTION,
+                cache: Optional[analysis_cache.Cache] = None,
+                exclude: Iterable[int] = ()) -> Tuple[Optional[GroundTruth], Cycles]:
+    """
+    The ground truth the capture's cycles correlate with best (median over
+    cycles) and the cycles aligned to it. Truth shorter than
+    MIN_TRUTH_FRACTION of the median cycle is a fragment, only used when
+    nothing else has a complete lift. Returns (None, cycles without truth)
+    when no truth does. `exclude` is passed on to session_cycles().
+    """
+    cache = cache if cache is not None else analysis_cache.default()
+    best = None
+    for truth_path in truth_paths:
+        truth = cache.memoize("truth", [truth_path], lambda: load_truth(truth_path))
+        cycles = session_cycles(capture, truth, min_peak_fraction, cache, exclude)
+        if cycles.alignment is None:
+            continue
+        whole = truth.t[-1] - truth.t[0] >= MIN_TRUTH_FRACTION * np.median(segmentation.durations(cycles.t,
+                                                                                                   cycles.offsets))
+        rank = (whole, float(np.median(cycles.alignment.score)))
+        if best is None or rank > best[0]:
+            best = (rank, truth, cycles)
+    if best is None:
+        return None, session_cycles(capture, None, min_peak_fraction, cache, exclude)
+    return best[1], best[2]
+
+
+class SessionAnalysis:
+    def __init__(self, capture_path, truth_path=None, cycle: Optional[int] = None,
+                 threshold: float = metrics.TENSION_MM, search_range: float = DEFAULT_SEARCH_RANGE,
+                 offset: Optional[float] = None, cache: Optional[analysis_cache.Cache] = None):
+        """
+        `truth_path` defaults to the ground truth in the capture's folder;
+        `cycle` keeps one GPIO cycle of a multi-cycle capture; a fixed
+        `offset` (s) skips the alignment search. `cache` defaults to the
+        shared disk cache; pass Cache(False) to always recompute.
+        """
+        self.capture_path = Path(capture_path)
+        truth_path = truth_path or find_truth(self.capture_path)
+        if truth_path is None:
+            raise FileNotFoundError(f"No ground truth (frame,mm CSV) next to {self.capture_path}")
+        self.truth_path = Path(truth_path)
+        self.cycle = cycle
+        self.threshold = threshold
+        self.search_range = search_range
+        self._fixed_offset = offset
+        self.cache = cache if cache is not None else analysis_cache.default()
+        self._velocity: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def __repr__(self):
+        return f"SessionAnalysis({str(self.capture_path)!r}, {str(self.truth_path)!r})"
+
+    def _cached(self, kind: str, compute, **params):
+        """compute() through the disk cache, keyed by both input files, the calibration and the settings."""
+        return self.cache.memoize(kind, [self.capture_path, self.truth_path], compute,
+                                  self.capture.calibration_id, cycle=self.cycle, **params)
+
+    @cached_property
+    def capture(self) -> Capture:
+        # Content-addressed: the same bytes under another name are the same entry
+        capture = self.cache.memoize("capture", [self.capture_path],
+                                     lambda: load_capture(self.capture_path, self.cycle), cycle=self.cycle)
+        return capture._replace(path=self.capture_path)
+
+    @cached_property
+    def truth(self) -> GroundTruth:
+        truth = self.cache.memoize("truth", [self.truth_path], lambda: load_truth(self.truth_path))
+        return truth._replace(path=self.truth_path)
+
+    @cached_property
+    def alignment(self) -> Alignment:
+        return self._cached("alignment", lambda: find_time_offset(self.capture.t, self.capture.mm, self.truth.t,
+                                                                  self.truth.mm, self.search_range),
+                            search_range=self.search_range)
+
+    @property
+    def offset(self) -> float:
+        """Seconds added to the sensor time to line it up with the truth."""
+        return self._fixed_offset if self._fixed_offset is not None else self.alignment.offset
+
+    @cached_property
+    def sensor_t(self) -> np.ndarray:
+        """Sensor time on the truth's clock."""
+        return self.capture.t + self.offset
+
+    @cached_property
+    def errors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(truth times, sensor - truth) at the truth timepoints covered by the sensor."""
+        return metrics.error_at(self.sensor_t, self.capture.mm, self.truth.t, self.truth.mm)
+
+    @cached_property
+    def sensor_errors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(sensor times, sensor - truth) at the sensor samples covered by the truth."""
+        return metrics.error_at(self.sensor_t, self.capture.mm, self.truth.t, self.truth.mm, at="sensor")
+
+    @cached_property
+    def sensor_tension(self) -> metrics.Tension:
+        return metrics.tension(self.sensor_t, self.capture.mm, self.threshold)
+
+    @cached_property
+    def truth_tension(self) -> metrics.Tension:
+        return metrics.tension(self.truth.t, self.truth.mm, self.threshold)
+
+    @cached_property
+    def metrics(self) -> Dict[str, float]:
+        def compute():
+            result = {"offset_ms": self.offset * 1e3}
+            if self._fixed_offset is None:
+                result["correlation"] = self.alignment.score
+            result.update(metrics.compare(self.sensor_t, self.capture.mm, self.truth.t, self.truth.mm,
+                                          self.threshold))
+            return result
+
+        return self._cached("metrics", compute, search_range=self.search_range, offset=self._fixed_offset,
+                            threshold=self.threshold)
+
+    @cached_property
+    def warp(self):
+        """DTW of the aligned trace against the truth (dtw.CycleWarp with one cycle)."""
+        from .dtw import warp_cycles
+
+        return self._cached("warp", lambda: warp_cycles(self.capture.t, self.capture.mm, [0, len(self.capture.t)],
+                                                        self.truth.t, self.truth.mm, shifts=[self.offset]),
+                            search_range=self.search_range, offset=self._fixed_offset)
+
+    def velocity(self, smooth_window: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(sensor times, sensor velocity, truth velocity) on the sensor's samples, in mm/s."""
+        if smooth_window not in self._velocity:
+            truth_mm = np.interp(self.sensor_t, self.truth.t, self.truth.mm)
+            self._velocity[smooth_window] = (self.sensor_t,
+                                             metrics.velocity(self.sensor_t, self.capture.mm, smooth_window),
+                                             metrics.velocity(self.sensor_t, truth_mm, smooth_window))
+        return self._velocity[smooth_window]
@@ -0,0 +1,227 @@
+"""
+Plot panels for SessionAnalysis results.
+
+Each panel draws into a matplotlib Axes passed in, so scripts can arrange
+them however they like; figure() stacks a list of them by name. matplotlib
+is only imported by figure() and the multi-cycle panels.
+
+    fig = plotting.figure(a, ["comparison", "error", "offset"])
+
+The multi-cycle panels take a session's columns and CSR cycle offsets
+(segmentation.py) and add a fixed number of artists however many cycles
+there are: one LineCollection, or a density map past DENSITY_CYCLES.
+
+    plotting.cycles(ax, t, mm, offsets, shifts)
+    plotting.band(ax, grid, mean, mean - sd, mean + sd)
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .alignment import resample_cycles
+from .dtw import PHASES, phase_masks
+
+DENSITY_CYCLES = 300        # cycles() draws a density map instead of lines past this many cycles
+DENSITY_DT = 0.005          # s per density map column
+DENSITY_BINS = 200          # density map rows
+
+
+def comparison(ax, a, title: str = "Trigger-Synchronized Comparison (GPIO T=0)"):
+    """Aligned sensor trace over the ground-truth points."""
+    ax.plot(a.sensor_t, a.capture.mm, label=f"Sensor (shifted {a.offset*1000:.1f}ms)", color="blue", alpha=0.7, lw=1.5)
+    ax.scatter(a.truth.t, a.truth.mm, color="red", label="Ground Truth", s=20, zorder=5)
+    ax.axhline(a.threshold, color="green", linestyle="--", alpha=0.5, lw=1, label=f"{a.threshold}mm threshold")
+    ax.set_title(title)
+    ax.set_ylabel("Position (mm)")
+    ax.set_xlabel("Time (s)")
+    ax.legend(fontsize=9)
+    ax.grid(True, alpha=0.25)
+
+
+def error(ax, a):
+    """Sensor - truth at each truth point."""
+    t, err = a.errors
+    stats = a.metrics
+    ax.stem(t, err, linefmt="purple", markerfmt="o", basefmt="k-")
+    ax.fill_between(t, err, 0, alpha=0.15, color="purple")
+    ax.axhline(0, color="black", lw=0.8)
+    ax.set_ylabel("Error: Sensor − Truth (mm)")
+    ax.set_xlabel("Time since GPIO Trigger (s)")
+    ax.set_title(f"Position Error  |  RMS={stats['rms_mm']:.3f}mm  Peak={stats['max_error_mm']:.3f}mm")
+    ax.grid(True, alpha=0.25)
+
+
+def phase_error(ax, a, ylim: float = 1.5):
+    """Sensor - truth at every sensor sample, split into concentric and eccentric at the sensor peak."""
+    t, err = a.sensor_errors
+    peak = int(np.argmax(np.interp(t, a.sensor_t, a.capture.mm)))
+    ax.plot(t[:peak], err[:peak], color="darkblue", label="Concentric Phase (Upward)", lw=2)
+    ax.plot(t[peak:], err[peak:], color="orange", label="Eccentric Phase (Downward)", lw=2)
+    ax.axhline(0, color="black", lw=1.2, alpha=0.8)
+    ax.fill_between(t, err, color="gray", alpha=0.1)
+    ax.set_ylim(-ylim, ylim)
+    ax.set_title("Absolute Displacement Error (Post-Calibration)")
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Error (mm)")
+    ax.grid(True, linestyle="--", alpha=0.3)
+    ax.legend(loc="upper right")
+
+
+def offset_search(ax, a):
+    """Normalised cross-correlation over the searched offsets."""
+    ax.plot(a.alignment.lags * 1000, a.alignment.scores, color="teal", lw=1.5)
+    ax.axvline(a.offset * 1000, color="red", linestyle="--", label=f"Best offset: {a.offset*1000:.1f}ms")
+    ax.set_xlabel("Time offset (ms)")
+    ax.set_ylabel("Normalised correlation")
+    ax.set_title("Cross-correlation offset search")
+    ax.legend()
+    ax.grid(True, alpha=0.25)
+
+
+def tension(ax, a, margin: float = 2.0):
+    """Zoom on the part of the lift above the tension threshold."""
+    thresh = a.threshold
+    mm = a.capture.mm
+    ax.plot(a.sensor_t, mm, color="blue")
+    ax.plot(a.truth.t, a.truth.mm, "r--")
+    ax.fill_between(a.sensor_t, thresh, mm, where=(mm >= thresh), color="blue", alpha=0.2, label="Sensor Tension Area")
+    ax.fill_between(a.truth.t, thresh, a.truth.mm, where=(a.truth.mm >= thresh), color="red", alpha=0.2,
+                    label="Truth Tension Area")
+    ax.set_ylim(thresh - margin, max(mm.max(), a.truth.mm.max()) + 0.5)
+    ax.set_title(f"Tension Phase Detail (Error in TUT: {abs(a.metrics['tut_error_ms']):.1f}ms)")
+    ax.set_ylabel("Displacement (mm)")
+    ax.set_xlabel("Time (s)")
+    ax.legend()
+
+
+def velocity(ax, a, smooth_window: int = 0):
+    t, v_sensor, v_truth = a.velocity(smooth_window)
+    ax.plot(t, v_sensor, label="Sensor Velocity (mm/s)", color="blue", lw=2)
+    ax.plot(t, v_truth, "r--", label="Ground Truth" + (" (smoothed)" if smooth_window else ""), alpha=0.8)
+    ax.axhline(0, color="black", lw=1)
+    ax.set_title("Velocity Profile: Concentric vs. Eccentric Validation")
+    ax.set_xlabel("Time since GPIO Trigger (s)")
+    ax.set_ylabel("Velocity (mm/s)")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+
+def histogram(ax, a, bins: int = 25):
+    """Distribution of sensor - truth at the truth points, in microns."""
+    errors_um = a.errors[1] * 1000
+    ax.hist(errors_um, bins=bins, color="skyblue", edgecolor="black", alpha=0.7)
+    ax.axvline(0, color="red", linestyle="dashed", label="Perfect Accuracy")
+    ax.set_title("Sensor Reliability Histogram")
+    ax.set_xlabel("Measurement Error (Microns)")
+    ax.set_ylabel("Frequency (Count)")
+    ax.legend()
+
+
+def timing(ax, a):
+    """DTW timing error along the lift, with the phases it is averaged over shaded."""
+    warp = a.warp
+    truth = np.interp(warp.grid, a.truth.t, a.truth.mm)
+    ax.plot(warp.grid, warp.lag[0] * 1000, color="black", lw=1.2)
+    for i, (mask, phase, color) in enumerate(zip(phase_masks(truth), PHASES, ("darkblue", "orange"))):
+        ax.fill_between(warp.grid, 0, warp.lag[0] * 1000, where=mask, color=color, alpha=0.3,
+                        label=f"{phase.capitalize()}: {warp.phase_lag[0, i]*1000:+.1f} ms mean")
+    ax.axhline(0, color="black", lw=0.8)
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Sensor lag (ms)")
+    ax.set_title("DTW timing error after the rigid offset")
+    ax.legend()
+    ax.grid(True, alpha=0.25)
+
+
+def cycles(ax, t, x, offsets, shifts=None, density: Optional[bool] = None, cmap: str = "viridis",
+           lw: float = 1.0, alpha: float = 0.6, markers: bool = False):
+    """
+    Every cycle (t[offsets[i]:offsets[i+1]] moved later by shifts[i]) as one
+    LineCollection coloured by cycle number, or as a log-scaled density map
+    of the cycles resampled every DENSITY_DT when density is True (default:
+    more than DENSITY_CYCLES cycles). Returns the artist, for a colorbar.
+    """
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import LogNorm
+
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    offsets = np.asarray(offsets)
+    n = len(offsets) - 1
+    shifts = np.zeros(n) if shifts is None else np.asarray(shifts, dtype=np.float64)
+    if density is None:
+        density = n > DENSITY_CYCLES
+
+    if density:
+        first, last = t[offsets[:-1]] + shifts, t[offsets[1:] - 1] + shifts
+        grid = np.arange(first.min(), last.max() + DENSITY_DT, DENSITY_DT)
+        values, mask = resample_cycles(t, x, offsets, grid, shifts)
+        counts, t_edges, x_edges = np.histogram2d(np.broadcast_to(grid, values.shape)[mask], values[mask],
+                                                  bins=(len(grid), DENSITY_BINS))
+        artist = ax.pcolormesh(t_edges, x_edges, np.ma.masked_equal(counts.T, 0), cmap=cmap,
+                               norm=LogNorm(), shading="flat", rasterized=True)
+        ax.set_xlim(t_edges[0], t_edges[-1])
+        ax.set_ylim(x_edges[0], x_edges[-1])
+        return artist
+
+    shifted = t + np.repeat(shifts, np.diff(offsets))
+    points = np.column_stack([shifted, x])
+    artist = LineCollection(np.split(points, offsets[1:-1]), cmap=cmap, linewidths=lw, alpha=alpha)
+    artist.set_array(np.arange(n))
+    ax.add_collection(artist)
+    if markers:
+        ax.scatter(shifted, x, c=np.repeat(np.arange(n), np.diff(offsets)), cmap=cmap, s=8, alpha=alpha / 1.2,
+                   linewidths=0)
+    ax.autoscale_view()
+    return artist
+
+
+def band(ax, grid, center, lo, hi, label: str = "Mean ± 1 SD", color: str = "black"):
+    """A centre line with a shaded band, e.g. the cycle mean and +/- one standard deviation."""
+    ax.fill_between(grid, lo, hi, color=color, alpha=0.2, lw=0, zorder=8)
+    ax.plot(grid, center, color=color, lw=2, label=label, zorder=9)
+
+
+def template(ax, t, color: str = "black"):
+    """An ensemble.Template: median, the outermost and inner percentile bands and the CI of the mean."""
+    lo, hi = t.percentiles[0], t.percentiles[-1]
+    ax.fill_between(t.grid, lo, hi, color=color, alpha=0.12, lw=0, zorder=7,
+                    label=f"P{t.levels[0]}-P{t.levels[-1]}")
+    if len(t.levels) > 3:
+        ax.fill_between(t.grid, t.percentiles[1], t.percentiles[-2], color=color, alpha=0.2, lw=0, zorder=7,
+                        label=f"P{t.levels[1]}-P{t.levels[-2]}")
+    ax.fill_between(t.grid, t.ci[0], t.ci[1], color="tab:orange", alpha=0.6, lw=0, zorder=8, label="CI of the mean")
+    ax.plot(t.grid, t.median, color=color, lw=2, label=f"Median of {t.cycles} cycles", zorder=9)
+    ax.set_xlabel("Fraction of cycle" if t.kind == "phase" else "Time (s)")
+    ax.set_ylabel("Position (mm)")
+    ax.grid(True, alpha=0.3)
+
+
+def truth_overlay(ax, truth_t, truth_mm, label: str = "Ground Truth (Ruler)"):
+    ax.plot(truth_t, truth_mm, linewidth=4, color="red", alpha=0.9, label=label, zorder=10)
+    ax.scatter(truth_t, truth_mm, s=40, color="red", alpha=0.8, marker="X", edgecolors="darkred", linewidth=1,
+               zorder=11)
+
+
+PANELS = {
+    "comparison": comparison,
+    "error": error,
+    "phase-error": phase_error,
+    "offset": offset_search,
+    "tension": tension,
+    "velocity": velocity,
+    "histogram": histogram,
+    "timing": timing,
+}
+
+
+def figure(a, panels: Sequence[str], height: float = 4.0):
+    """One figure with the named panels stacked top to bottom."""
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(len(panels), 1, figsize=(13, height * len(panels)), squeeze=False)
+    for ax, name in zip(axes[:, 0], panels):
+        PANELS[name](ax, a)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,129 @@
+"""
+Splitting multi-cycle captures into cycles.
+
+A segmentation is a CSR offset array into the capture's own columns:
+cycle i is rows offsets[i]:offsets[i+1]. Nothing is copied until a caller
+asks for the selected cycles packed together (gather()), and every step is
+one NumPy pass over the capture, however many cycles it holds.
+
+Cycles start at
+  - time resets (the logger restarting time_s at each GPIO trigger),
+  - changes of the GPIO cycle column, or
+  - lifts, found offline the way the station's lift detector does live
+    (run_core/threads/linear_sensor_thread.py): a lift starts above
+    LIFT_MM and lasts until the position drops below LIFT_MM -
+    RELEASE_MARGIN_MM; cycles are split halfway between one lift's release
+    and the next one's start.
+
+    offsets = segmentation.split(capture.t, capture.cycle)
+    keep = segmentation.peaks(capture.mm, offsets) >= 19.5
+    (t, mm), packed = segmentation.gather(offsets, keep, capture.t, capture.mm)
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+RESET_S = -0.5              # a time step below this starts a new cycle
+LIFT_MM = 10.0              # run_core LiftSettings.mm_threshold
+RELEASE_MARGIN_MM = 2.0     # run_core LiftSettings.release_margin_mm
+
+
+def _offsets(starts, n: int) -> np.ndarray:
+    """CSR offsets from the first row of every cycle after the first."""
+    if n == 0:
+        return np.zeros(1, dtype=np.int64)
+    return np.concatenate([[0], starts, [n]]).astype(np.int64)
+
+
+def by_time_reset(t, reset_s: float = RESET_S) -> np.ndarray:
+    t = np.asarray(t)
+    return _offsets(np.flatnonzero(np.diff(t) < reset_s) + 1, len(t))
+
+
+def by_cycle_column(cycle) -> np.ndarray:
+    cycle = np.asarray(cycle)
+    return _offsets(np.flatnonzero(np.diff(cycle) != 0) + 1, len(cycle))
+
+
+def lifts(mm, threshold: float = LIFT_MM, release_margin: float = RELEASE_MARGIN_MM) -> Tuple[np.ndarray, np.ndarray]:
+    """(start, end) rows of every lift: first row above threshold, first row after it below the release level."""
+    mm = np.asarray(mm)
+    index = np.arange(len(mm))
+    # Hysteresis without a loop: a row is inside a lift when the last row above the
+    # threshold is more recent than the last row below the release level
+    last_above = np.maximum.accumulate(np.where(mm > threshold, index, -1))
+    last_below = np.maximum.accumulate(np.where(mm < threshold - release_margin, index, -1))
+    inside = last_above > last_below
+    edges = np.diff(inside.astype(np.int8), prepend=0, append=0)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def by_lift(mm, threshold: float = LIFT_MM, release_margin: float = RELEASE_MARGIN_MM) -> np.ndarray:
+    starts, ends = lifts(mm, threshold, release_margin)
+    return _offsets((ends[:-1] + starts[1:]) // 2, len(mm))
+
+
+def split(t, cycle=None, reset_s: float = RESET_S) -> np.ndarray:
+    """Cycles of a capture by time reset and, when it was logged, the GPIO cycle column."""
+    t = np.asarray(t)
+    breaks = np.diff(t) < reset_s
+    if cycle is not None:
+        breaks |= np.diff(np.asarray(cycle)) != 0
+    return _offsets(np.flatnonzero(breaks) + 1, len(t))
+
+
+def lengths(offsets) -> np.ndarray:
+    return np.diff(np.asarray(offsets))
+
+
+def peaks(x, offsets) -> np.ndarray:
+    """Maximum of x in every cycle (cycles must not be empty)."""
+    if len(offsets) < 2:
+        return np.empty(0, dtype=np.asarray(x).dtype)
+    # reduceat's last segment runs to the end of x, so stop x at the last cycle
+    return np.maximum.reduceat(np.asarray(x)[:offsets[-1]], offsets[:-1])
+
+
+def durations(t, offsets) -> np.ndarray:
+    t = np.asarray(t)
+    return t[offsets[1:] - 1] - t[offsets[:-1]]
+
+
+def cycle_index(offsets) -> np.ndarray:
+    """Cycle number of every row."""
+    return np.repeat(np.arange(len(offsets) - 1), lengths(offsets))
+
+
+def relative(x, offsets) -> np.ndarray:
+    """x minus its value at the start of each cycle (time since the cycle started)."""
+    x = np.asarray(x)
+    return x - np.repeat(x[offsets[:-1]], lengths(offsets))
+
+
+def select(offsets, keep) -> Tuple[np.ndarray, np.ndarray]:
+    """(starts, ends) of the kept cycles; `keep` is a boolean mask or cycle indices."""
+    offsets = np.asarray(offsets)
+    return offsets[:-1][keep], offsets[1:][keep]
+
+
+def rows(offsets, keep=None) -> Tuple[np.ndarray, np.ndarray]:
+    """(row indices of the kept cycles in order, CSR offsets of the packed cycles)."""
+    starts, ends = select(offsets, slice(None) if keep is None else keep)
+    n = ends - starts
+    packed = np.concatenate([[0], np.cumsum(n)]).astype(np.int64)
+    return np.arange(packed[-1]) + np.repeat(starts - packed[:-1], n), packed
+
+
+def gather(offsets, keep, *columns) -> Tuple[Tuple[np.ndarray, ...], np.ndarray]:
+    """The kept cycles of each column packed end to end, and their CSR offsets."""
+    index, packed = rows(offsets, keep)
+    return tuple(np.asarray(c)[index] for c in columns), packed
+
+
+def filter_cycles(t, x, offsets, min_peak: Optional[float] = None, min_samples: int = 2) -> np.ndarray:
+    """Mask of cycles with at least min_samples rows, a positive duration and (if given) x reaching min_peak."""
+    keep = (lengths(offsets) >= min_samples) & (durations(t, offsets) > 0)
+    if min_peak is not None:
+        keep &= peaks(x, offsets) >= min_peak
+    return keep
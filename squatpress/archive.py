@@ -0,0 +1,357 @@
+"""
+Compact long-term archive of raw sensor counts.
+
+Only timestamps (1 us resolution) and raw counts are stored; positions
+are regenerated from the archive's calibration ID when it is read.
+
+File layout:
+
+    b"SQPA" | version u16 | meta_len u32 | meta JSON (calibration_id, station, t0_unix, ...)
+    block*
+    index   n_blocks x (offset u64, t_first i64, t_last i64, count u32)
+    footer  index_offset u64 | n_blocks u32 | b"SQPI"
+
+Block:
+
+    b"BLK1" | count u32 | t_first i64 | raw_first u16 | payload_len u32 | crc32 u32 | payload
+
+The payload is (count - 1) time values followed by (count - 1) raw
+values, each a zigzag LEB128 varint: time as delta-of-delta, which is
+near zero at a steady sample rate, and raw as plain deltas, which are a
+few counts between neighbouring samples. Every block decodes on its
+own, so seeking by time touches only the blocks in range. The index is
+rewritten on close; if it is missing or damaged (power loss), readers
+rebuild it by walking the block headers and stop at the first block
+whose CRC fails.
+"""
+
+import argparse
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from . import calibration as calibration_registry
+
+MAGIC = b"SQPA"
+VERSION = 1
+BLOCK_MAGIC = b"BLK1"
+INDEX_MAGIC = b"SQPI"
+DEFAULT_BLOCK_SIZE = 4096
+
+_PREAMBLE = struct.Struct("<4sHI")
+_BLOCK = struct.Struct("<4sIqHII")
+_FOOTER = struct.Struct("<QI4s")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("t_first", "<i8"), ("t_last", "<i8"), ("count", "<u4")])
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+# ── Vectorised zigzag / varint ────────────────────────────────────────────────
+def zigzag_encode(values: np.ndarray) -> np.ndarray:
+    v = values.astype(np.int64)
+    return ((v << 1) ^ (v >> 63)).view(np.uint64)
+
+
+def zigzag_decode(values: np.ndarray) -> np.ndarray:
+    u = values.astype(np.uint64)
+    return ((u >> np.uint64(1)).view(np.int64)) ^ -((u & np.uint64(1)).view(np.int64))
+
+
+def varint_encode(values: np.ndarray) -> bytes:
+    """LEB128 for an array of uint64, without a Python loop over values."""
+    v = np.asarray(values, dtype=np.uint64)
+    if len(v) == 0:
+        return b""
+    nbytes = np.ones(len(v), dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += v >= np.uint64(1 << (7 * k))
+    offsets = np.cumsum(nbytes) - nbytes
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max())):
+        sel = nbytes > k
+        byte = (v[sel] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (nbytes[sel] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[offsets[sel] + k] = (byte | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def varint_decode(data, count: int) -> Tuple[np.ndarray, int]:
+    """Decode `count` LEB128 values; returns (uint64 array, bytes consumed)."""
+    if count == 0:
+        return np.empty(0, dtype=np.uint64), 0
+    b = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(b < 0x80)
+    if len(ends) < count:
+        raise ArchiveError("truncated varint stream")
+    used = int(ends[count - 1]) + 1
+    b = b[:used]
+    ends = ends[:count]
+    starts = np.empty(count, dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    value_of_byte = np.repeat(np.arange(count), ends - starts + 1)
+    shift = (np.arange(used) - starts[value_of_byte]) * 7
+    parts = (b & 0x7F).astype(np.uint64) << shift.astype(np.uint64)
+    return np.bitwise_or.reduceat(parts, starts), used
+
+
+# ── Blocks ────────────────────────────────────────────────────────────────────
+def encode_block(t_us: np.ndarray, raw: np.ndarray) -> bytes:
+    t_us = np.asarray(t_us, dtype=np.int64)
+    raw = np.asarray(raw, dtype=np.int64)
+    count = len(t_us)
+    dt = np.diff(t_us)
+    ddt = np.diff(dt, prepend=0)
+    payload = varint_encode(zigzag_encode(np.concatenate([ddt, np.diff(raw)])))
+    crc = zlib.crc32(payload, zlib.crc32(struct.pack("<IqH", count, int(t_us[0]), int(raw[0]))))
+    return _BLOCK.pack(BLOCK_MAGIC, count, int(t_us[0]), int(raw[0]), len(payload), crc) + payload
+
+
+def decode_block(buf, offset: int = 0) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Returns (t_us int64, raw uint16, offset just past the block)."""
+    if len(buf) - offset < _BLOCK.size:
+        raise ArchiveError(f"truncated block header at {offset}")
+    magic, count, t_first, raw_first, payload_len, crc = _BLOCK.unpack_from(buf, offset)
+    if magic != BLOCK_MAGIC:
+        raise ArchiveError(f"bad block magic at {offset}")
+    start = offset + _BLOCK.size
+    payload = bytes(buf[start:start + payload_len])
+    if len(payload) != payload_len or \
+            zlib.crc32(payload, zlib.crc32(struct.pack("<IqH", count, t_first, raw_first))) != crc:
+        raise ArchiveError(f"block at {offset} failed its CRC")
+
+    values, _ = varint_decode(payload, 2 * (count - 1))
+    deltas = zigzag_decode(values)
+    t_us = np.empty(count, dtype=np.int64)
+    t_us[0] = t_first
+    np.cumsum(np.cumsum(deltas[:count - 1]), out=t_us[1:])
+    t_us[1:] += t_first
+    raw = np.empty(count, dtype=np.int64)
+    raw[0] = raw_first
+    np.cumsum(deltas[count - 1:], out=raw[1:])
+    raw[1:] += raw_first
+    return t_us, raw.astype(np.uint16), start + payload_len
+
+
+def _read_preamble(f) -> Tuple[dict, int]:
+    head = f.read(_PREAMBLE.size)
+    if len(head) < _PREAMBLE.size:
+        raise ArchiveError("not an archive (too short)")
+    magic, version, meta_len = _PREAMBLE.unpack(head)
+    if magic != MAGIC:
+        raise ArchiveError("not an archive (bad magic)")
+    if version > VERSION:
+        raise ArchiveError(f"archive version {version} is newer than supported ({VERSION})")
+    return json.loads(f.read(meta_len)), _PREAMBLE.size + meta_len
+
+
+def _scan_blocks(buf, start: int) -> Tuple[np.ndarray, int]:
+    """Rebuild the index by walking block headers; returns (index, end of the last good block)."""
+    entries = []
+    offset = start
+    while offset + _BLOCK.size <= len(buf):
+        try:
+            t_us, _, end = decode_block(buf, offset)
+        except ArchiveError:
+            break
+        entries.append((offset, t_us[0], t_us[-1], len(t_us)))
+        offset = end
+    return np.array(entries, dtype=INDEX_DTYPE), offset
+
+
+def _read_index(buf, data_start: int) -> Optional[np.ndarray]:
+    if len(buf) < data_start + _FOOTER.size:
+        return None
+    index_offset, n_blocks, magic = _FOOTER.unpack_from(buf, len(buf) - _FOOTER.size)
+    if magic != INDEX_MAGIC or index_offset + n_blocks * INDEX_DTYPE.itemsize != len(buf) - _FOOTER.size:
+        return None
+    return np.frombuffer(buf, dtype=INDEX_DTYPE, count=n_blocks, offset=index_offset)
+
+
+# ── Writing ───────────────────────────────────────────────────────────────────
+class ArchiveWriter:
+    """
+    Appends (time, raw) samples, encoding one block per `block_size` samples.
+
+        with ArchiveWriter("raw.sqa", calibration_id="cal-20260409-132128") as w:
+            w.append(sample.t_acq, sample.raw)
+
+    Times are seconds; they are stored in microseconds since t0_unix.
+    Reopening an existing archive drops its index and any torn tail, then
+    continues after the last intact block.
+    """
+    def __init__(self, path, calibration_id: Optional[str] = None, station: Optional[str] = None,
+                 t0_unix: float = 0.0, block_size: int = DEFAULT_BLOCK_SIZE, meta: Optional[dict] = None):
+        self.path = Path(path)
+        self.block_size = block_size
+        self._t = []
+        self._raw = []
+
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, "rb") as f:
+                self.meta, data_start = _read_preamble(f)
+                f.seek(0)
+                buf = f.read()
+            self._index = list(_scan_blocks(buf, data_start)[0].tolist())
+            end = int(self._index[-1][0]) + _BLOCK.size + \
+                _BLOCK.unpack_from(buf, int(self._index[-1][0]))[4] if self._index else data_start
+            self._f = open(self.path, "r+b")
+            self._f.truncate(end)
+            self._f.seek(end)
+        else:
+            self.meta = {"calibration_id": calibration_id, "station": station, "t0_unix": t0_unix,
+                         "time_unit": "us", **(meta or {})}
+            encoded = json.dumps(self.meta).encode()
+            self._f = open(self.path, "wb")
+            self._f.write(_PREAMBLE.pack(MAGIC, VERSION, len(encoded)) + encoded)
+            self._index = []
+        self._t0_unix = self.meta["t0_unix"]
+
+    def append(self, t: float, raw: int):
+        self._t.append(round((t - self._t0_unix) * 1e6))
+        self._raw.append(raw)
+        if len(self._t) >= self.block_size:
+            self.flush()
+
+    def append_many(self, t_us, raw):
+        """Samples already in microseconds since t0_unix."""
+        self.flush()
+        t_us = np.asarray(t_us, dtype=np.int64)
+        raw = np.asarray(raw)
+        for i in range(0, len(t_us), self.block_size):
+            self._write_block(t_us[i:i + self.block_size], raw[i:i + self.block_size])
+
+    def _write_block(self, t_us, raw):
+        offset = self._f.tell()
+        self._f.write(encode_block(t_us, raw))
+        self._index.append((offset, int(t_us[0]), int(t_us[-1]), len(t_us)))
+
+    def flush(self):
+        if self._t:
+            self._write_block(np.array(self._t, dtype=np.int64), np.array(self._raw))
+            self._t.clear()
+            self._raw.clear()
+        self._f.flush()
+
+    def close(self):
+        self.flush()
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        index_offset = self._f.tell()
+        self._f.write(index.tobytes() + _FOOTER.pack(index_offset, len(index), INDEX_MAGIC))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+class Samples(NamedTuple):
+    t: np.ndarray       # float64 seconds since t0_unix
+    raw: np.ndarray     # uint16
+    mm: Optional[np.ndarray]
+
+
+class ArchiveReader:
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.meta, self._data_start = _read_preamble(f)
+        self._buf = np.memmap(self.path, dtype=np.uint8, mode="r")
+        index = _read_index(self._buf, self._data_start)
+        self.recovered = index is None
+        self.index = index if index is not None else _scan_blocks(self._buf, self._data_start)[0]
+
+    @property
+    def calibration_id(self) -> Optional[str]:
+        return self.meta.get("calibration_id")
+
+    def __len__(self):
+        return int(self.index["count"].sum())
+
+    def read_block(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        t_us, raw, _ = decode_block(self._buf, int(self.index["offset"][i]))
+        return t_us, raw
+
+    def blocks(self, t0: Optional[float] = None, t1: Optional[float] = None) -> Iterator[int]:
+        """Indices of blocks that may hold samples in [t0, t1] (seconds since t0_unix)."""
+        lo, hi = 0, len(self.index)
+        if t0 is not None:
+            lo = int(np.searchsorted(self.index["t_last"], round(t0 * 1e6), side="left"))
+        if t1 is not None:
+            hi = int(np.searchsorted(self.index["t_first"], round(t1 * 1e6), side="right"))
+        return iter(range(lo, hi))
+
+    def read(self, t0: Optional[float] = None, t1: Optional[float] = None, with_mm: bool = True) -> Samples:
+        parts = [self.read_block(i) for i in self.blocks(t0, t1)]
+        if parts:
+            t_us = np.concatenate([p[0] for p in parts])
+            raw = np.concatenate([p[1] for p in parts])
+        else:
+            t_us, raw = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint16)
+        if t0 is not None or t1 is not None:
+            keep = np.ones(len(t_us), dtype=bool)
+            if t0 is not None:
+                keep &= t_us >= round(t0 * 1e6)
+            if t1 is not None:
+                keep &= t_us <= round(t1 * 1e6)
+            t_us, raw = t_us[keep], raw[keep]
+        mm = None
+        if with_mm and self.calibration_id:
+            mm = calibration_registry.to_mm(raw, self.calibration_id).astype(np.float32)
+        return Samples(t_us / 1e6, raw, mm)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+def pack_session(session_path, out_path, block_size: int = DEFAULT_BLOCK_SIZE) -> Path:
+    from .session import load_session
+
+    session = load_session(session_path)
+    if "raw" not in session:
+        raise ArchiveError(f"{session_path} has no raw counts to archive")
+    with ArchiveWriter(out_path, session.calibration_id, session.station,
+                       session.header.get("t0_unix", 0.0), block_size,
+                       meta={"source": str(session_path)}) as writer:
+        writer.append_many(np.round(session["t_ns"] / 1000).astype(np.int64), session["raw"])
+    return Path(out_path)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Delta/varint archive of raw sensor counts")
+    sub = p.add_subparsers(dest="command", required=True)
+    pack = sub.add_parser("pack", help="archive a session's raw counts")
+    pack.add_argument("session")
+    pack.add_argument("out")
+    pack.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    info = sub.add_parser("info", help="print archive metadata and block summary")
+    info.add_argument("archive")
+    args = p.parse_args()
+
+    if args.command == "pack":
+        out = pack_session(args.session, args.out, args.block_size)
+        reader = ArchiveReader(out)
+        print(f"{args.session} -> {out}: {len(reader)} samples, {os.path.getsize(out) / max(len(reader), 1):.2f} bytes/sample")
+    else:
+        reader = ArchiveReader(args.archive)
+        n = len(reader)
+        print(f"{args.archive}")
+        for key, value in reader.meta.items():
+            print(f"  {key:<14} {value}")
+        print(f"  samples        {n}")
+        print(f"  blocks         {len(reader.index)}{' (index rebuilt by scan)' if reader.recovered else ''}")
+        print(f"  bytes/sample   {os.path.getsize(args.archive) / max(n, 1):.2f}")
+        if n:
+            print(f"  span           {reader.index['t_first'][0] / 1e6:.3f}s .. {reader.index['t_last'][-1] / 1e6:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Registry of linear sensor calibration tables.
+
+Every table produced by tests/linear_sensor/calibration/create_calibration_table.py
+gets an ID derived from its generation time ("cal-20260409-132128") and is
+stored as squatpress/calibrations/<id>.json. Sessions and archives record
+only that ID, so positions in mm can be regenerated from raw counts at any
+time, and re-derived if a table is corrected.
+"""
+
+import json
+import re
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+REGISTRY_DIR = Path(__file__).resolve().parent / "calibrations"
+
+_GENERATED_RE = re.compile(r"#\s*Generated on:\s*(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+_SAMPLES_RE = re.compile(r"#\s*Samples per point:\s*(\d+)")
+_ROW_RE = re.compile(r"\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\)")
+
+
+class Calibration(NamedTuple):
+    id: str
+    table: Tuple[Tuple[float, float], ...]     # (mm, raw) with mm ascending, raw descending
+    generated: Optional[str] = None
+    samples_per_point: Optional[int] = None
+    source: Optional[str] = None
+
+
+def make_id(generated: datetime) -> str:
+    return generated.strftime("cal-%Y%m%d-%H%M%S")
+
+
+def save(calibration: Calibration, registry_dir: Path = REGISTRY_DIR) -> Path:
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    path = registry_dir / f"{calibration.id}.json"
+    data = calibration._asdict()
+    data["table"] = [list(row) for row in calibration.table]
+    path.write_text(json.dumps(data, indent=2) + "\n")
+    load.cache_clear()
+    return path
+
+
+@lru_cache(maxsize=None)
+def load(calibration_id: str, registry_dir: Path = REGISTRY_DIR) -> Calibration:
+    path = registry_dir / f"{calibration_id}.json"
+    if not path.exists():
+        raise KeyError(f"Unknown calibration ID {calibration_id!r} (no {path})")
+    data = json.loads(path.read_text())
+    data["table"] = tuple((float(mm), float(raw)) for mm, raw in data["table"])
+    return Calibration(**data)
+
+
+def available(registry_dir: Path = REGISTRY_DIR) -> List[str]:
+    return sorted(p.stem for p in registry_dir.glob("cal-*.json"))
+
+
+def from_python_table(path, source: Optional[str] = None) -> Calibration:
+    """Read a generated calibration_table.py (or any file with the same header and rows)."""
+    text = Path(path).read_text()
+    generated = _GENERATED_RE.search(text)
+    if generated is None:
+        raise ValueError(f"{path} has no '# Generated on:' line to derive a calibration ID from")
+    samples = _SAMPLES_RE.search(text)
+    table = tuple(sorted((float(mm), float(raw)) for mm, raw in _ROW_RE.findall(text)))
+    if len(table) < 2:
+        raise ValueError(f"{path} does not contain a calibration table")
+    stamp = datetime.strptime(generated.group(1), "%Y-%m-%d %H:%M:%S")
+    return Calibration(make_id(stamp), table, generated.group(1),
+                       int(samples.group(1)) if samples else None, source or str(path))
+
+
+def find_id(table: Sequence[Tuple[float, float]], registry_dir: Path = REGISTRY_DIR) -> Optional[str]:
+    """ID of the registered calibration with exactly this table, if any."""
+    wanted = tuple(sorted((float(mm), float(raw)) for mm, raw in table))
+    for calibration_id in available(registry_dir):
+        if load(calibration_id, registry_dir).table == wanted:
+            return calibration_id
+    return None
+
+
+def to_mm(raw, calibration):
+    """
+    Vectorised raw -> mm, matching LinearSensorReader.interpolate(): linear
+    between table points, clamped to the table's ends.
+    """
+    import numpy as np
+
+    if isinstance(calibration, str):
+        calibration = load(calibration)
+    mm, counts = np.array(calibration.table, dtype=np.float64).T
+    # np.interp wants ascending x; raw counts fall as position rises
+    return np.interp(np.asarray(raw, dtype=np.float64), counts[::-1], mm[::-1])
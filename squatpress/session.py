@@ -0,0 +1,378 @@
+"""
+Columnar binary session format for linear sensor captures.
+
+A session is a directory:
+
+    sensor2_120015.session/
+        header.json     format, version, schema, calibration_id, station, rate_hz, ...
+        t_ns.i8         int64   nanoseconds since the session's t0
+        raw.u2          uint16  raw sensor counts
+        mm.f4           float32 calibrated position
+        cycle.i4        int32   GPIO sync cycle number (optional)
+        ...             any further columns listed in the schema
+
+Each column is a flat little-endian array, so a capture can append to all
+of them as it goes and analysis can np.memmap them without parsing. After
+a crash the columns may differ in length by a few rows; readers use the
+shortest, and reopening for append trims the others to match.
+
+    python -m squatpress.session convert data/csv/2026.04.16/*.csv
+    python -m squatpress.session info data/csv/2026.04.16/sensor2_120015.session
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from . import calibration as calibration_registry
+
+FORMAT = "squatpress-session"
+VERSION = 1
+HEADER = "header.json"
+SUFFIX = ".session"
+
+# name -> (dtype, unit); sessions store any subset, in schema order
+COLUMNS = {
+    "t_ns":        ("<i8", "ns"),
+    "raw":         ("<u2", "count"),
+    "mm":          ("<f4", "mm"),
+    "cycle":       ("<i4", None),
+    "read_count":  ("<u2", None),
+    "raw_rate_hz": ("<f4", "Hz"),
+}
+_EXT = {"<i8": "i8", "<u2": "u2", "<f4": "f4", "<i4": "i4", "<f8": "f8", "<u4": "u4"}
+
+
+class SessionError(ValueError):
+    pass
+
+
+def _column_file(path: Path, name: str, dtype: str) -> Path:
+    return path / f"{name}.{_EXT[dtype]}"
+
+
+def _write_header(path: Path, header: dict):
+    tmp = path / f"{HEADER}.tmp"
+    tmp.write_text(json.dumps(header, indent=2) + "\n")
+    os.replace(tmp, path / HEADER)
+
+
+def read_header(path) -> dict:
+    path = Path(path)
+    try:
+        header = json.loads((path / HEADER).read_text())
+    except FileNotFoundError:
+        raise SessionError(f"{path} is not a session (no {HEADER})")
+    if header.get("format") != FORMAT:
+        raise SessionError(f"{path}: unexpected format {header.get('format')!r}")
+    if header.get("version", 0) > VERSION:
+        raise SessionError(f"{path}: session version {header['version']} is newer than supported ({VERSION})")
+    return header
+
+
+def _row_count(path: Path, schema: List[dict]) -> int:
+    counts = []
+    for column in schema:
+        f = _column_file(path, column["name"], column["dtype"])
+        size = f.stat().st_size if f.exists() else 0
+        counts.append(size // np.dtype(column["dtype"]).itemsize)
+    return min(counts) if counts else 0
+
+
+# ── Writing ───────────────────────────────────────────────────────────────────
+class SessionWriter:
+    """
+    Appends rows to a session, buffering `flush_every` rows per write.
+
+        with SessionWriter(path, ["t_ns", "raw", "mm", "cycle"], calibration_id="cal-20260409-132128") as w:
+            w.append(t=0.0125, raw=10604, mm=0.06, cycle=1)
+    """
+    def __init__(self, path, columns: Iterable[str] = ("t_ns", "raw", "mm"),
+                 calibration_id: Optional[str] = None, station: Optional[str] = None,
+                 rate_hz: Optional[float] = None, t0_unix: Optional[float] = None,
+                 meta: Optional[dict] = None, flush_every: int = 1024):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        columns = list(columns)
+        unknown = [c for c in columns if c not in COLUMNS]
+        if unknown or "t_ns" not in columns:
+            raise SessionError(f"columns must include t_ns and come from {sorted(COLUMNS)}, got {unknown or columns}")
+        schema = [{"name": c, "dtype": COLUMNS[c][0], "unit": COLUMNS[c][1]} for c in columns]
+
+        if (self.path / HEADER).exists():
+            self.header = read_header(self.path)
+            if [c["name"] for c in self.header["schema"]] != columns:
+                raise SessionError(f"{self.path} already exists with columns "
+                                   f"{[c['name'] for c in self.header['schema']]}")
+            self._truncate_to(_row_count(self.path, self.header["schema"]))
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.header = {
+                "format": FORMAT,
+                "version": VERSION,
+                "schema": schema,
+                "calibration_id": calibration_id,
+                "station": station,
+                "rate_hz": rate_hz,
+                "t0_unix": t0_unix if t0_unix is not None else time.time(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "meta": meta or {},
+            }
+            _write_header(self.path, self.header)
+
+        self._schema = self.header["schema"]
+        self._files = {c["name"]: open(_column_file(self.path, c["name"], c["dtype"]), "ab") for c in self._schema}
+        self._buffers: Dict[str, list] = {c["name"]: [] for c in self._schema}
+        self.rows = _row_count(self.path, self._schema)
+
+    def _truncate_to(self, n: int):
+        for column in self.header["schema"]:
+            f = _column_file(self.path, column["name"], column["dtype"])
+            if f.exists():
+                with open(f, "r+b") as fh:
+                    fh.truncate(n * np.dtype(column["dtype"]).itemsize)
+
+    def append(self, t: float, **values):
+        """One row; `t` in seconds since t0, every other column by name."""
+        buffers = self._buffers
+        buffers["t_ns"].append(round(t * 1e9))
+        for column in self._schema:
+            name = column["name"]
+            if name != "t_ns":
+                buffers[name].append(values.get(name, 0))
+        self.rows += 1
+        if len(buffers["t_ns"]) >= self.flush_every:
+            self.flush()
+
+    def append_many(self, t_ns, **columns):
+        """A block of rows as arrays; columns left out are written as zeros."""
+        self.flush()
+        t_ns = np.asarray(t_ns, dtype="<i8")
+        for column in self._schema:
+            name = column["name"]
+            data = t_ns if name == "t_ns" else columns.get(name)
+            if data is None:
+                data = np.zeros(len(t_ns))
+            np.asarray(data).astype(column["dtype"], copy=False).tofile(self._files[name])
+        self.rows += len(t_ns)
+        for f in self._files.values():
+            f.flush()
+
+    def flush(self):
+        if not self._buffers["t_ns"]:
+            return
+        for column in self._schema:
+            name = column["name"]
+            np.asarray(self._buffers[name]).astype(column["dtype"]).tofile(self._files[name])
+            self._buffers[name].clear()
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+class Session:
+    def __init__(self, path, mmap: bool = True):
+        self.path = Path(path)
+        self.header = read_header(self.path)
+        self.schema = self.header["schema"]
+        self.rows = _row_count(self.path, self.schema)
+        self._columns = {}
+        for column in self.schema:
+            f = _column_file(self.path, column["name"], column["dtype"])
+            if self.rows == 0:
+                data = np.empty(0, dtype=column["dtype"])
+            elif mmap:
+                data = np.memmap(f, dtype=column["dtype"], mode="r", shape=(self.rows,))
+            else:
+                data = np.fromfile(f, dtype=column["dtype"], count=self.rows)
+            self._columns[column["name"]] = data
+        self._t = None
+        self._mm = None
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name) -> np.ndarray:
+        if name == "t":
+            return self.t
+        if name == "mm":
+            return self.mm
+        return self._columns[name]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def calibration_id(self) -> Optional[str]:
+        return self.header.get("calibration_id")
+
+    @property
+    def station(self) -> Optional[str]:
+        return self.header.get("station")
+
+    @property
+    def rate_hz(self) -> Optional[float]:
+        return self.header.get("rate_hz")
+
+    @property
+    def t(self) -> np.ndarray:
+        """Time in float64 seconds since t0."""
+        if self._t is None:
+            self._t = self._columns["t_ns"] / 1e9
+        return self._t
+
+    @property
+    def mm(self) -> np.ndarray:
+        """Stored positions, or positions regenerated from raw counts and the calibration ID."""
+        if "mm" in self._columns:
+            return self._columns["mm"]
+        if self._mm is None:
+            if "raw" not in self._columns or not self.calibration_id:
+                raise SessionError(f"{self.path} has neither an mm column nor raw counts with a calibration ID")
+            self._mm = calibration_registry.to_mm(self._columns["raw"], self.calibration_id).astype(np.float32)
+        return self._mm
+
+    def to_dataframe(self):
+        """pandas DataFrame using the CSV column names (time_s, position_mm, raw_value, ...)."""
+        import pandas as pd
+
+        data = {"time_s": self.t}
+        if "cycle" in self._columns:
+            data = {"cycle": self._columns["cycle"], **data}
+        data["position_mm"] = self.mm
+        names = {"raw": "raw_value"}
+        for name in self._columns:
+            if name not in ("t_ns", "mm", "cycle"):
+                data[names.get(name, name)] = self._columns[name]
+        return pd.DataFrame(data)
+
+
+def load_session(path, mmap: bool = True) -> Session:
+    return Session(path, mmap=mmap)
+
+
+# ── CSV conversion ────────────────────────────────────────────────────────────
+_CSV_COLUMNS = {
+    "time_s": "t_ns",
+    "position_mm": "mm",
+    "raw_value": "raw",
+    "cycle": "cycle",
+    "read_count": "read_count",
+    "raw_rate_hz": "raw_rate_hz",
+}
+
+
+def convert_csv(csv_path, out_path=None, calibration_id: Optional[str] = None,
+                station: Optional[str] = None, overwrite: bool = False) -> Path:
+    """
+    Convert a capture CSV in any of the existing layouts
+    (time_s,position_mm,raw_value / cycle,time_s,position_mm,read_count,raw_rate_hz /
+    cycle,time_s,position_mm,raw_value) into a session directory.
+    """
+    csv_path = Path(csv_path)
+    out_path = Path(out_path) if out_path else csv_path.with_suffix(SUFFIX)
+    if (out_path / HEADER).exists():
+        if not overwrite:
+            raise SessionError(f"{out_path} already exists")
+        for f in out_path.iterdir():
+            f.unlink()
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        fields = [h.strip() for h in next(reader)]
+        if "time_s" not in fields or "position_mm" not in fields:
+            raise SessionError(f"{csv_path} is not a sensor capture (columns: {fields})")
+        rows = [r for r in reader if r and any(cell.strip() for cell in r)]
+
+    keep = [(i, _CSV_COLUMNS[name]) for i, name in enumerate(fields) if name in _CSV_COLUMNS]
+    order = [c for c in COLUMNS if c in {name for _, name in keep}]
+    data = {name: np.array([float(r[i]) for r in rows]) for i, name in keep}
+    t_ns = np.round(data.pop("t_ns") * 1e9).astype(np.int64)
+
+    rate_hz = None
+    if len(t_ns) > 1:
+        dt = np.diff(t_ns)
+        dt = dt[dt > 0]
+        if len(dt):
+            rate_hz = round(1e9 / float(np.median(dt)), 3)
+
+    stem = csv_path.stem
+    meta = {"source": str(csv_path), "source_columns": fields}
+    if stem.startswith("sensor") and stem[6:7].isdigit():
+        meta["sensor"] = stem[6:].split("_")[0]
+
+    with SessionWriter(out_path, order, calibration_id=calibration_id, station=station,
+                       rate_hz=rate_hz, t0_unix=os.path.getmtime(csv_path), meta=meta) as writer:
+        writer.append_many(t_ns, **data)
+    return out_path
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+def _print_info(path):
+    session = load_session(path)
+    h = session.header
+    print(f"{path}")
+    print(f"  rows           {len(session)}")
+    columns = ", ".join(f"{c['name']}:{c['dtype']}" for c in session.schema)
+    print(f"  columns        {columns}")
+    print(f"  calibration_id {h.get('calibration_id')}")
+    print(f"  station        {h.get('station')}")
+    print(f"  rate_hz        {h.get('rate_hz')}")
+    if len(session):
+        print(f"  span           {session.t[0]:.3f}s .. {session.t[-1]:.3f}s")
+    for key, value in h.get("meta", {}).items():
+        print(f"  {key:<14} {value}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Columnar sensor session files")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    conv = sub.add_parser("convert", help="convert capture CSVs into sessions next to them")
+    conv.add_argument("csv", nargs="+")
+    conv.add_argument("--out-dir", help="write sessions here instead of next to each CSV")
+    conv.add_argument("--calibration-id", choices=calibration_registry.available())
+    conv.add_argument("--station")
+    conv.add_argument("--overwrite", action="store_true")
+
+    info = sub.add_parser("info", help="print a session's header")
+    info.add_argument("session", nargs="+")
+
+    args = p.parse_args()
+    if args.command == "convert":
+        for csv_file in args.csv:
+            out = Path(args.out_dir) / (Path(csv_file).stem + SUFFIX) if args.out_dir else None
+            try:
+                out = convert_csv(csv_file, out, args.calibration_id, args.station, args.overwrite)
+            except SessionError as e:
+                print(f"skip {csv_file}: {e}")
+                continue
+            print(f"{csv_file} -> {out} ({len(load_session(out))} rows)")
+    else:
+        for path in args.session:
+            _print_info(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import serial
+import sys
 import time
 from datetime import datetime
+from pathlib import Path
 import csv
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from squatpress import calibration
+
 class CalibrationGenerator:
     def __init__(self, port, baudrate):
         self.port = port
@@ -156,6 +161,17 @@ class CalibrationGenerator:
             print(f"Error generating Python table: {e}")
             return False
 
+    def register_table(self, filename="calibration_table.py"):
+        """Add a generated table to the squatpress calibration registry, returning its ID"""
+        try:
+            entry = calibration.from_python_table(filename)
+            path = calibration.save(entry)
+            print(f"Registered calibration {entry.id}: {path}")
+            return entry.id
+        except Exception as e:
+            print(f"Error registering calibration: {e}")
+            return None
+
     def display_calibration(self):
         """Display the collected calibration data"""
         if not self.calibration_data:
@@ -195,11 +211,14 @@ if __name__ == "__main__":
             # Save outputs
             cal_gen.save_calibration("calibration_data.csv")
             cal_gen.generate_python_table("calibration_table.py")
+            cal_id = cal_gen.register_table("calibration_table.py")
             
             print("\nCalibration complete!")
             print("Files created:")
             print("  - calibration_data.csv (for backup/analysis)")
             print("  - calibration_table.py (Python tuple format)")
+            if cal_id:
+                print(f"  - squatpress/calibrations/{cal_id}.json (record this ID with captures)")
             
         except KeyboardInterrupt:
             print("\n\nCalibration interrupted by user")
@@ -1,23 +1,29 @@
 """
 GPIO SYNC ONLY — no rolling average, single-threaded original read rate
 =======================================================================
-GPIO pin sets t=0 as before. No background thread, no averaging.
-Reads one sample per output tick, same as the original script.
+GPIO pin sets t=0 as before, timed by SyncInput's pigpio hardware ticks.
+No background thread, no averaging. Reads one sample per output tick,
+same as the original script.
 
 Output CSV columns: cycle, time_s, position_mm, raw_value
 """
 
 import serial
+import sys
 import time
-import csv
-import threading
-import RPi.GPIO as GPIO
+import pigpio
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from components.SyncInput.sync_input import SyncInput
+from run_core.log_rotation import RotatingCSVWriter, RotationPolicy
 
 SERIAL_PORT     = "/dev/ttyACM0"
 BAUD_RATE       = 115200
 SAMPLE_INTERVAL = 0.010
 SYNC_GPIO_PIN   = 21
+CSV_ROTATION    = RotationPolicy(max_bytes=64 * 1024 * 1024, interval=0, keep=0)  # roll + gzip, never prune
 
 CALIBRATION_TABLE = [
     (0.000, 10615), (1.000, 10444), (2.000, 10284), (3.000, 10136),
@@ -39,36 +45,37 @@ def interpolate(raw):
             return mm1 + (raw - r1) / (r2 - r1) * (mm2 - mm1)
     return None
 
-_lock             = threading.Lock()
+# GPIO sync state, only touched by the main loop
 _in_cycle         = False
 _cycle_start_time = None
 _cycle_count      = 0
 
-def sync_callback(channel):
+def apply_sync_edges(edges):
+    """Update cycle state from SyncInput edges (hardware-tick times and levels)."""
     global _in_cycle, _cycle_start_time, _cycle_count
-    t = time.time()
-    state = GPIO.input(SYNC_GPIO_PIN)
-    with _lock:
-        if state == GPIO.HIGH:
-            _in_cycle = True; _cycle_start_time = t; _cycle_count += 1
+    for edge in edges:
+        if edge.level == 1:
+            _in_cycle = True; _cycle_start_time = edge.t; _cycle_count += 1
             print(f"\n>>> CYCLE {_cycle_count} STARTED")
         else:
             _in_cycle = False
-            print(f">>> CYCLE {_cycle_count} ENDED ({time.time()-_cycle_start_time:.3f}s)")
+            duration = edge.t - _cycle_start_time if _cycle_start_time else 0
+            print(f">>> CYCLE {_cycle_count} ENDED ({duration:.3f}s)")
 
 def main():
     sensor_num = input("Sensor number: ").strip()
     ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
     for _ in range(5): ser.write(b'F'); ser.readline(); time.sleep(0.005)
 
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(SYNC_GPIO_PIN, GPIO.IN)
-    GPIO.add_event_detect(SYNC_GPIO_PIN, GPIO.BOTH, callback=sync_callback, bouncetime=10)
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise SystemExit("pigpiod is not running (sudo pigpiod)")
+    # 10ms glitch filter plays the role of the old bouncetime=10
+    sync = SyncInput(pi, SYNC_GPIO_PIN, pull=pigpio.PUD_OFF, glitch_us=10_000)
 
     ts = datetime.now().strftime("%H%M%S")
-    f  = open(f"gpio_sensor{sensor_num}_{ts}.csv", "w", newline="")
-    w  = csv.writer(f)
-    w.writerow(["cycle", "time_s", "position_mm", "raw_value"])
+    w  = RotatingCSVWriter(f"gpio_sensor{sensor_num}_{ts}.csv", ["cycle", "time_s", "position_mm", "raw_value"],
+                           CSV_ROTATION)
 
     print("GPIO-sync-only capture running (no averaging). Ctrl+C to stop.\n")
     next_tick = time.time()
@@ -76,6 +83,7 @@ def main():
 
     try:
         while True:
+            apply_sync_edges(sync.drain())
             t0 = time.time()
             ser.write(b'F')
             resp = ser.readline().decode('ascii', errors='replace').strip()
@@ -85,12 +93,10 @@ def main():
                     mm  = interpolate(raw)
                 except: pass
 
-            with _lock:
-                in_cycle = _in_cycle; start = _cycle_start_time; cyc = _cycle_count
+            in_cycle = _in_cycle; start = _cycle_start_time; cyc = _cycle_count
 
             if in_cycle and mm is not None and start is not None:
                 w.writerow([cyc, round(t0 - start, 4), round(mm, 4), raw])
-                f.flush()
 
             next_tick += SAMPLE_INTERVAL
             sleep_for  = next_tick - time.time()
@@ -100,7 +106,7 @@ def main():
     except KeyboardInterrupt:
         print("\nDone.")
     finally:
-        f.close(); GPIO.cleanup(); ser.close()
+        w.close(); sync.cancel(); pi.stop(); ser.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,23 +1,30 @@
 import serial
+import sys
 import time
 import threading
-import csv
 from datetime import datetime
 from collections import deque
 from pathlib import Path
 import importlib.util
 
-import RPi.GPIO as GPIO
+import pigpio
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from components.LinearSensor.sample_store import SampleStore
+from components.SyncInput.sync_input import SyncInput
+from run_core.log_rotation import RotatingCSVWriter, RotationPolicy
 
 # ── Config ────────────────────────────────────────────────────────────────────
 SENSOR_PORT     = "/dev/ttyACM0"
 SENSOR_BAUD     = 115200
 SYNC_GPIO_PIN   = 17               # BCM pin wired to ESP32 RPI_SYNC_PIN
 OUTPUT_CSV      = Path("jitter_results.csv")
+RETENTION_S     = 30.0             # sensor history kept for stroke lookups
+SETTLE_S        = 0.050            # wait this long after a sync pulse before analysing it
+CSV_ROTATION    = RotationPolicy(max_bytes=64 * 1024 * 1024, interval=0, keep=0)  # roll + gzip, never prune
 
-# Pulse width thresholds (microseconds) matching ESP32 syncStrokeStart()
-UP_PULSE_MAX_US   = 400   # < 400us = UP stroke
-DOWN_PULSE_MIN_US = 400   # >= 400us = DOWN stroke
+# Pulse width threshold (microseconds) matching ESP32 syncStrokeStart()
+PULSE_THRESHOLD_US = 400  # < 400us = UP stroke, >= 400us = DOWN stroke
 
 # ── Calibration ───────────────────────────────────────────────────────────────
 cal_path = Path(__file__).resolve().parents[1] / "calibration" / "calibration_table.py"
@@ -27,10 +34,8 @@ spec.loader.exec_module(cal_mod)
 CALIBRATION_TABLE = cal_mod.calibration_table
 
 # ── Shared state ──────────────────────────────────────────────────────────────
-raw_buffer   = deque()          # (timestamp_s, mm)
-buffer_lock  = threading.Lock()
-sync_events  = []               # list of dicts written by GPIO ISR
-events_lock  = threading.Lock()
+samples      = SampleStore(RETENTION_S)   # (timestamp_s, mm), time-indexed and bounded
+pending      = deque()          # sync events waiting for their stroke window to fill
 stop_event   = threading.Event()
 
 
@@ -50,51 +55,20 @@ def interpolate(raw_value):
     return None
 
 
-# ── GPIO sync ISR ─────────────────────────────────────────────────────────────
-_pulse_start = None
-
-def _gpio_callback(channel):
-    """
-    Called on both edges of the sync pin.
-    Rising edge  → record pulse start time.
-    Falling edge → measure pulse width, classify direction, log event.
-    """
-    global _pulse_start
-    now = time.time()
-
-    if GPIO.input(channel) == GPIO.HIGH:
-        _pulse_start = now
-    else:
-        if _pulse_start is None:
-            return
-        pulse_us = (now - _pulse_start) * 1e6
-        direction = "UP" if pulse_us < UP_PULSE_MAX_US else "DOWN"
-        with events_lock:
-            sync_events.append({
-                "timestamp": _pulse_start,   # when motion started
-                "direction": direction,
-                "pulse_us":  pulse_us,
-            })
-        _pulse_start = None
-
-
-def setup_gpio():
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(SYNC_GPIO_PIN, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-    GPIO.add_event_detect(
-        SYNC_GPIO_PIN,
-        GPIO.BOTH,
-        callback=_gpio_callback,
-        bouncetime=1        # 1ms debounce — strokes are much longer
-    )
+# ── GPIO sync ───────────────────────────────────────────────────────────────────
+def setup_sync(pi):
+    # Widths come from pigpio hardware ticks, so callback latency no longer
+    # blurs the UP/DOWN split; the 1ms debounce is replaced by a glitch filter
+    sync = SyncInput(pi, SYNC_GPIO_PIN, threshold_us=PULSE_THRESHOLD_US)
     print(f"GPIO {SYNC_GPIO_PIN} armed for sync pulses")
+    return sync
 
 
 # ── Sensor reader thread ──────────────────────────────────────────────────────
 def sensor_reader_loop(ser):
     """
     Reads the sensor at maximum serial rate, pushes (timestamp, mm) into
-    raw_buffer. Prints actual read rate every 5 seconds.
+    the sample store. Prints actual read rate every 5 seconds.
     """
     count    = 0
     t_report = time.time()
@@ -108,8 +82,7 @@ def sensor_reader_loop(ser):
                 raw = int(resp.split()[0], 16)
                 mm  = interpolate(raw)
                 if mm is not None:
-                    with buffer_lock:
-                        raw_buffer.append((t0, mm))
+                    samples.append(t0, mm)
                     count += 1
         except Exception:
             pass
@@ -122,10 +95,11 @@ def sensor_reader_loop(ser):
 
 
 # ── Analysis: match sync events to sensor readings ────────────────────────────
-def analyze_stroke(event, all_samples, stroke_duration_s=0.005, expected_mm=0.35):
+def analyze_stroke(event, store, stroke_duration_s=0.005, expected_mm=0.35):
     """
     For a given sync event, find all sensor samples within the stroke window
     and compute: start mm, end mm, delta mm, sample count, vs expected.
+    The window is bisected out of the store, O(log n + k) per event.
 
     stroke_duration_s : how long the ESP32 ran the motor (5ms default)
     expected_mm       : ground truth from your calibration (0.35mm at vel=2000)
@@ -133,13 +107,13 @@ def analyze_stroke(event, all_samples, stroke_duration_s=0.005, expected_mm=0.35
     t_start = event["timestamp"]
     t_end   = t_start + stroke_duration_s + 0.010  # +10ms margin for sensor lag
 
-    window = [(t, mm) for t, mm in all_samples if t_start <= t <= t_end]
+    _, window = store.window(t_start, t_end)
 
     if len(window) < 2:
         return None
 
-    mm_start  = window[0][1]
-    mm_end    = window[-1][1]
+    mm_start  = window[0]
+    mm_end    = window[-1]
     delta_mm  = mm_end - mm_start
     n_samples = len(window)
     error_mm  = abs(abs(delta_mm) - expected_mm)
@@ -148,6 +122,7 @@ def analyze_stroke(event, all_samples, stroke_duration_s=0.005, expected_mm=0.35
         "timestamp":   datetime.fromtimestamp(t_start).strftime("%H:%M:%S.%f")[:-3],
         "direction":   event["direction"],
         "pulse_us":    f"{event['pulse_us']:.0f}",
+        "confidence":  f"{event['confidence']:.2f}",
         "mm_start":    f"{mm_start:.4f}",
         "mm_end":      f"{mm_end:.4f}",
         "delta_mm":    f"{delta_mm:.4f}",
@@ -174,41 +149,42 @@ def main():
     reader.start()
 
     # Arm GPIO
-    setup_gpio()
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise SystemExit("pigpiod is not running (sudo pigpiod)")
+    sync = setup_sync(pi)
 
     # CSV header
     csv_fields = [
-        "timestamp", "direction", "pulse_us",
+        "timestamp", "direction", "pulse_us", "confidence",
         "mm_start", "mm_end", "delta_mm",
         "expected_mm", "error_mm", "n_samples"
     ]
-    csv_file = OUTPUT_CSV.open("w", newline="")
-    writer   = csv.DictWriter(csv_file, fieldnames=csv_fields)
-    writer.writeheader()
+    writer   = RotatingCSVWriter(OUTPUT_CSV, csv_fields, CSV_ROTATION)
 
     print("\nRunning — Ctrl+C to stop\n")
     print(f"{'Time':<15} {'Dir':<6} {'Delta':>8} {'Expected':>10} {'Error':>8} {'Samples':>8}")
     print("-" * 60)
 
-    processed_events = 0
+    total_events = 0
 
     try:
         while True:
             time.sleep(0.1)  # check for new events 10x/sec
 
-            with events_lock:
-                new_events = sync_events[processed_events:]
-
-            with buffer_lock:
-                all_samples = list(raw_buffer)
-
-            for event in new_events:
-                # Only analyze events old enough that the stroke window has passed
-                if time.time() - event["timestamp"] < 0.050:
-                    continue  # stroke may still be in progress
+            for pulse in sync.drain_pulses():
+                pending.append({
+                    "timestamp":  pulse.t,          # when motion started
+                    "direction":  pulse.direction,
+                    "pulse_us":   pulse.width_us,
+                    "confidence": pulse.confidence,
+                })
+                total_events += 1
 
-                result = analyze_stroke(event, all_samples)
-                processed_events += 1
+            # Events arrive in time order; stop at the first whose stroke may still be in progress
+            while pending and time.time() - pending[0]["timestamp"] >= SETTLE_S:
+                event  = pending.popleft()
+                result = analyze_stroke(event, samples)
 
                 if result is None:
                     print(f"  [!] {event['direction']} stroke at "
@@ -217,7 +193,6 @@ def main():
                     continue
 
                 writer.writerow(result)
-                csv_file.flush()
 
                 print(
                     f"{result['timestamp']:<15} "
@@ -232,14 +207,15 @@ def main():
         print("\n\nStopping...")
         stop_event.set()
     finally:
-        GPIO.cleanup()
+        sync.cancel()
+        pi.stop()
         ser.close()
-        csv_file.close()
+        writer.close()
 
         # Session summary
-        with events_lock:
-            total = len(sync_events)
-        print(f"\nTotal sync events captured : {total}")
+        print(f"\nTotal sync events captured : {total_events}")
+        if sync.unpaired_edges:
+            print(f"Unpaired sync edges        : {sync.unpaired_edges}")
         print(f"Results saved to           : {OUTPUT_CSV.resolve()}")
 
 
@@ -18,15 +18,19 @@ Key improvement over naive sleep-based approach:
 """
 
 import serial
+import sys
 import time
-import csv
 import threading
-import RPi.GPIO as GPIO
+import pigpio
 from datetime import datetime
 from collections import deque
 from pathlib import Path
 import importlib.util
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from components.SyncInput.sync_input import SyncInput
+from run_core.log_rotation import RotatingCSVWriter, RotationPolicy
+
 # ── Config ────────────────────────────────────────────────────────────────────
 SERIAL_PORT     = "/dev/ttyACM1"
 BAUD_RATE       = 115200
@@ -35,6 +39,8 @@ SMOOTH_WINDOW   = 5             # Rolling average over N raw samples
                                 # At ~300Hz raw, window=5 = ~16ms smoothing
                                 # At ~500Hz raw, window=5 = ~10ms smoothing
 SYNC_GPIO_PIN   = 21
+# Long runs roll the CSV into gzip'd segments instead of growing one file; nothing is pruned
+CSV_ROTATION    = RotationPolicy(max_bytes=64 * 1024 * 1024, interval=0, keep=0)
 
 # Load shared calibration table from tests/linear_sensor/calibration/calibration_table.py
 cal_path = Path(__file__).resolve().parents[1] / "calibration" / "calibration_table.py"
@@ -61,27 +67,29 @@ def interpolate(raw_value):
 _buffer_lock = threading.Lock()
 _raw_buffer  = deque()          # (timestamp_s, mm_value) tuples
 
-# GPIO sync state
-_gpio_lock        = threading.Lock()
+# GPIO sync state, only touched by the main loop
 _in_cycle         = False
 _cycle_start_time = None
 _cycle_count      = 0
 
 
-# ── GPIO callback ─────────────────────────────────────────────────────────────
-def sync_callback(channel):
+# ── GPIO sync ─────────────────────────────────────────────────────────────────
+def apply_sync_edges(edges):
+    """
+    Update cycle state from a batch of SyncInput edges. Edge times come from
+    pigpio hardware ticks and the edge's own level, so neither callback
+    latency nor re-reading the pin afterwards can skew cycle starts.
+    """
     global _in_cycle, _cycle_start_time, _cycle_count
-    t = time.time()
-    state = GPIO.input(SYNC_GPIO_PIN)
-    with _gpio_lock:
-        if state == GPIO.HIGH:
+    for edge in edges:
+        if edge.level == 1:
             _in_cycle         = True
-            _cycle_start_time = t
+            _cycle_start_time = edge.t
             _cycle_count     += 1
             print(f"\n>>> CYCLE {_cycle_count} STARTED")
         else:
             _in_cycle = False
-            duration = t - _cycle_start_time if _cycle_start_time else 0
+            duration = edge.t - _cycle_start_time if _cycle_start_time else 0
             print(f">>> CYCLE {_cycle_count} ENDED  ({duration:.3f}s)")
 
 
@@ -148,9 +156,11 @@ def main():
         time.sleep(0.005)
 
     # GPIO
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(SYNC_GPIO_PIN, GPIO.IN)
-    GPIO.add_event_detect(SYNC_GPIO_PIN, GPIO.BOTH, callback=sync_callback, bouncetime=10)
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise SystemExit("pigpiod is not running (sudo pigpiod)")
+    # 10ms glitch filter plays the role of the old bouncetime=10
+    sync = SyncInput(pi, SYNC_GPIO_PIN, pull=pigpio.PUD_OFF, glitch_us=10_000)
 
     # Start background reader
     stop_event = threading.Event()
@@ -160,9 +170,8 @@ def main():
     # CSV
     ts_str   = datetime.now().strftime("%H%M%S")
     filename = f"sensor{sensor_num}_{ts_str}.csv"
-    csv_file = open(filename, "w", newline="")
-    writer   = csv.writer(csv_file)
-    writer.writerow(["cycle", "time_s", "position_mm", "read_count", "raw_rate_hz"])
+    writer   = RotatingCSVWriter(filename, ["cycle", "time_s", "position_mm", "read_count", "raw_rate_hz"],
+                                 CSV_ROTATION)
 
     print(f"Logging to {filename} at {OUTPUT_RATE_HZ}Hz output. Ctrl+C to stop.\n")
 
@@ -172,6 +181,7 @@ def main():
 
     try:
         while True:
+            apply_sync_edges(sync.drain())
             now = time.time()
 
             # Drain buffer: collect all raw reads since last log point
@@ -193,10 +203,9 @@ def main():
                 # Estimate raw rate from recent buffer activity
                 raw_rate = read_count / output_interval if output_interval > 0 else 0
 
-                with _gpio_lock:
-                    in_cycle   = _in_cycle
-                    cycle_start = _cycle_start_time
-                    cycle_num  = _cycle_count
+                in_cycle    = _in_cycle
+                cycle_start = _cycle_start_time
+                cycle_num   = _cycle_count
 
                 if MAX_CYCLES > 0 and cycle_num > MAX_CYCLES:
                     print(f"\nReached max cycles ({MAX_CYCLES}). Stopping.")
@@ -205,7 +214,6 @@ def main():
                 if in_cycle and cycle_start is not None:
                     elapsed = round(now - cycle_start, 4)
                     writer.writerow([cycle_num, elapsed, round(smoothed, 4), read_count, round(raw_rate, 1)])
-                    csv_file.flush()
 
             # Fixed-rate output: advance target time
             next_log += output_interval
@@ -220,8 +228,9 @@ def main():
     finally:
         print(f"Saved to: {filename}")
         stop_event.set()
-        csv_file.close()
-        GPIO.cleanup()
+        writer.close()
+        sync.cancel()
+        pi.stop()
         ser.close()
 
 
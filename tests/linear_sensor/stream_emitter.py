@@ -0,0 +1,228 @@
+"""
+Reference emitter for the sensor bridge streaming protocol.
+
+Opens a pseudo-terminal that behaves like the bridge in streaming mode:
+after 'S' it pushes 11-byte frames (sync, seq, device_us, raw, crc8) at a
+fixed rate until 'X'. Polled 'F' requests still get a text answer and 'T'
+returns the device micros() counter, which runs from a configurable
+offset and drift against the host clock. Frames can be dropped or
+corrupted on purpose to exercise the reader's resync and dropped-frame
+accounting.
+
+Serve a fake bridge and point a reader at the printed path:
+
+    python tests/linear_sensor/stream_emitter.py --rate 1000 --drop-every 97
+
+Or run the host StreamingReader against it and check the accounting and
+the clock alignment:
+
+    python tests/linear_sensor/stream_emitter.py --check --seconds 3 --drop-every 97 --corrupt-every 251 --drift-ppm 150
+"""
+
+import argparse
+import math
+import os
+import pty
+import select
+import struct
+import sys
+import threading
+import time
+import tty
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+SYNC = b"\xA5\x5A"
+CHECK_BURST = 16
+MAX_T_ACQ_ERROR_S = 0.25     # t_acq is off by ~4295 s when micros() wrapping is mishandled
+BODY = struct.Struct("<HIH")
+FRAME_SIZE = len(SYNC) + BODY.size + 1
+
+
+def crc8(data: bytes) -> int:
+    # Bitwise on purpose: an independent implementation of what the firmware computes
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def synthetic_raw(t: float) -> int:
+    """Squat-like motion: 2 s strokes between ~0 mm and ~40 mm worth of counts."""
+    return int(8000 + 2600 * math.cos(2 * math.pi * t / 2.0))
+
+
+class StreamEmitter(threading.Thread):
+    def __init__(self, rate_hz=1000, drop_every=0, corrupt_every=0, start_seq=0,
+                 drift_ppm=0.0, clock_offset_us=0, burst=1):
+        super().__init__(daemon=True, name="stream-emitter")
+        self.rate_hz = rate_hz
+        self.drop_every = drop_every
+        self.corrupt_every = corrupt_every
+        self.start_seq = start_seq
+        self.drift_ppm = drift_ppm
+        self.clock_offset_us = clock_offset_us
+        self.burst = burst                  # frames per write, like a USB bulk transfer
+
+        self.master, slave = pty.openpty()
+        tty.setraw(slave)
+        self.path = os.ttyname(slave)
+        self._slave = slave                 # keep open so the master never sees EIO
+
+        self.streaming = False
+        self.stream_started = None
+        self._pending = bytearray()
+        self.sent = 0
+        self.dropped = 0
+        self.corrupted = 0
+        self._stop = threading.Event()
+        self._t0 = time.time()
+
+    def stop(self):
+        self._stop.set()
+
+    def device_us(self, host_t: float) -> int:
+        """The bridge's micros() at host time.time() `host_t`."""
+        return int(self.clock_offset_us + (host_t - self._t0) * 1e6 * (1 + self.drift_ppm * 1e-6)) & 0xFFFFFFFF
+
+    def _frame(self, seq, device_us, raw):
+        body = BODY.pack(seq & 0xFFFF, device_us & 0xFFFFFFFF, raw & 0xFFFF)
+        return SYNC + body + bytes([crc8(body)])
+
+    def _handle_commands(self, data: bytes):
+        for c in data:
+            if c == ord("S"):
+                self.streaming = True
+                self._seq = self.start_seq
+                self._next = self.stream_started = time.time()
+            elif c == ord("X"):
+                self.streaming = False
+            elif c == ord("F") and not self.streaming:
+                raw = synthetic_raw(time.time() - self._t0)
+                os.write(self.master, f"{raw:X} 0\r\n".encode())
+            elif c == ord("T") and not self.streaming:
+                os.write(self.master, f"T {self.device_us(time.time()):X}\r\n".encode())
+
+    def run(self):
+        period = 1.0 / self.rate_hz
+        self._seq = self.start_seq
+        self._next = time.time()
+        while not self._stop.is_set():
+            timeout = max(0.0, self._next - time.time()) if self.streaming else 0.05
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            if readable:
+                self._handle_commands(os.read(self.master, 64))
+            if not self.streaming:
+                continue
+
+            # Catch up in bursts rather than sleeping per frame, like a UART FIFO would
+            chunk = self._pending
+            now = time.time()
+            while self._next <= now:
+                frame = bytearray(self._frame(self._seq, self.device_us(self._next),
+                                              synthetic_raw(self._next - self._t0)))
+                self._seq += 1
+                self._next += period
+                if self.drop_every and self._seq % self.drop_every == 0:
+                    self.dropped += 1
+                    continue
+                if self.corrupt_every and self._seq % self.corrupt_every == 0:
+                    frame[8] ^= 0x5A        # payload damage, caught by the CRC
+                    self.corrupted += 1
+                chunk += frame
+                self.sent += 1
+            if chunk and len(chunk) >= self.burst * FRAME_SIZE:
+                os.write(self.master, bytes(chunk))
+                chunk.clear()
+
+
+def check(args):
+    sys.path.insert(0, str(REPO_ROOT))
+    from components.LinearSensor.serial_reader import LinearSensorReader
+    from components.LinearSensor.streaming import StreamingReader
+
+    # micros() wraps half way through the run, inside one of the bursts the reader decodes as a batch
+    emitter = StreamEmitter(args.rate, args.drop_every, args.corrupt_every, start_seq=65536 - 500,
+                            drift_ppm=args.drift_ppm, clock_offset_us=(1 << 32) - int(args.seconds / 2 * 1e6),
+                            burst=CHECK_BURST)
+    emitter.start()
+
+    reader = LinearSensorReader(emitter.path, timeout=0.05)
+    reader.connect()
+    stream = StreamingReader(reader)
+    stream.start()
+
+    samples = 0
+    seqs = []
+    errors = []
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        batch = stream.read_samples()
+        samples += len(batch)
+        seqs.extend(s.seq for s in batch)
+        # Frames are generated on a fixed schedule, so each one's true host time is known
+        errors.extend(s.t_acq - (emitter.stream_started + (s.seq - emitter.start_seq) / args.rate)
+                      for s in batch if s.t_acq is not None)
+    stream.stop()
+    time.sleep(0.05)
+    emitter.stop()
+
+    stats = stream.stats
+    # Corrupted frames are lost to the reader too, so they show up as drops
+    expected_lost = emitter.dropped + emitter.corrupted
+    span = seqs[-1] - seqs[0] + 1 if seqs else 0
+    print(f"emitter: sent={emitter.sent} dropped={emitter.dropped} corrupted={emitter.corrupted}")
+    print(f"reader:  {stats}")
+    print(f"samples={samples} ({samples / args.seconds:.0f}/s), seq span={span}, wrapped={seqs and seqs[-1] > 65535}")
+    clock = reader.clock
+    device_wrapped = emitter.device_us(time.time()) < emitter.clock_offset_us
+    print(f"clock:   one-way latency={1e3 * (clock.one_way_latency or 0):.3f} ms, "
+          f"drift={clock.drift_ppm:.0f} ppm (true {args.drift_ppm:.0f})")
+    if errors:
+        late = sorted(abs(e) for e in errors[len(errors) // 2:])
+        print(f"t_acq error over the second half: median={1e3 * late[len(late) // 2]:.3f} ms, "
+              f"max={1e3 * late[-1]:.3f} ms")
+        print(f"t_acq error overall: max={1e3 * max(abs(e) for e in errors):.3f} ms "
+              f"(device clock wrapped: {device_wrapped})")
+
+    ok = (
+        stats["crc_errors"] == emitter.corrupted
+        and abs(stats["dropped"] - expected_lost) <= 1       # the final in-flight frame may be cut off
+        and span == samples + stats["dropped"]
+        and all(b > a for a, b in zip(seqs, seqs[1:]))
+        and len(errors) == samples
+        and device_wrapped
+        and max(abs(e) for e in errors) < MAX_T_ACQ_ERROR_S
+    )
+    print("OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+def main():
+    p = argparse.ArgumentParser(description="Fake sensor bridge speaking the binary streaming protocol")
+    p.add_argument("--rate", type=float, default=1000, help="frames per second")
+    p.add_argument("--drop-every", type=int, default=0, help="drop every Nth frame (0 = never)")
+    p.add_argument("--corrupt-every", type=int, default=0, help="corrupt every Nth frame (0 = never)")
+    p.add_argument("--drift-ppm", type=float, default=0.0, help="device clock rate error against the host")
+    p.add_argument("--check", action="store_true", help="run StreamingReader against the emitter and verify counts")
+    p.add_argument("--seconds", type=float, default=3.0, help="duration of --check")
+    args = p.parse_args()
+
+    if args.check:
+        sys.exit(check(args))
+
+    emitter = StreamEmitter(args.rate, args.drop_every, args.corrupt_every, drift_ppm=args.drift_ppm)
+    emitter.start()
+    print(f"Fake bridge on {emitter.path} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        emitter.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+run_core lift database benchmark
+================================
+Records --lifts synthetic lifts (every --flag-every'th flagged as anomalous)
+through LiftDatabase, then times and checks the LiftQueries read side with
+and without a station / time window.
+
+Fails (exit code 1) if:
+  - a query raises (e.g. an ambiguous column on the flagged-lift join)
+  - a query returns the wrong number of lifts for its window
+  - writing the lifts takes longer than --max-write-s
+
+USAGE:
+    python tests/run_core/lift_db_benchmark.py
+    python tests/run_core/lift_db_benchmark.py --lifts 20000 --flag-every 7
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT / "run_core"))
+
+from events import EventType, LiftSummary       # noqa: E402
+from lift_db import LiftDatabase, LiftQueries   # noqa: E402
+
+DEFAULT_LIFTS = 5000
+DEFAULT_FLAG_EVERY = 10
+DEFAULT_MAX_WRITE_S = 10.0
+
+T0 = 1_700_000_000.0    # first lift; lifts are one minute apart
+STATION = "bench-station"
+
+
+def record(path, lifts: int, flag_every: int) -> float:
+    db = LiftDatabase(path, STATION, batch_size=256, flush_interval=0.5)
+    start = time.perf_counter()
+    for i in range(lifts):
+        t = T0 + 60.0 * i
+        flags = 1 if i % flag_every == 0 else 0
+        db.observe(EventType.LIFT_DETECTED, 20.0, t)
+        db.observe(EventType.LIFT_COMPLETED, LiftSummary(t, t + 2.0, 25.0, 30.0, 1.5, 200, flags), t + 2.0)
+        db.observe(EventType.PELLET_DISPENSED, None, t + 2.1)
+        db.observe(EventType.PELLET_TAKEN, None, t + 5.0)
+    db.close()
+    return time.perf_counter() - start
+
+
+def main():
+    p = argparse.ArgumentParser(description="Check and time the run_core lift database queries")
+    p.add_argument("--lifts", default=DEFAULT_LIFTS, type=int)
+    p.add_argument("--flag-every", default=DEFAULT_FLAG_EVERY, type=int)
+    p.add_argument("--max-write-s", default=DEFAULT_MAX_WRITE_S, type=float)
+    args = p.parse_args()
+
+    # Window over the middle half of the lifts
+    first, last = args.lifts // 4, 3 * args.lifts // 4
+    t0, t1 = T0 + 60.0 * first, T0 + 60.0 * last
+    in_window = last - first
+    flagged_in_window = sum(1 for i in range(first, last) if i % args.flag_every == 0)
+    flagged_total = sum(1 for i in range(args.lifts) if i % args.flag_every == 0)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "lifts.sqlite3"
+        write_s = record(path, args.lifts, args.flag_every)
+        print(f"recorded {args.lifts} lifts in {write_s:.2f} s")
+        if write_s > args.max_write_s:
+            print(f"[FAIL] Writing took {write_s:.2f} s, over {args.max_write_s:.1f} s")
+            failed = True
+
+        q = LiftQueries(path)
+        checks = [
+            ("lifts", lambda: len(q.lifts()), args.lifts),
+            ("lifts window", lambda: len(q.lifts(STATION, t0, t1)), in_window),
+            ("lifts window unflagged", lambda: len(q.lifts(STATION, t0, t1, exclude_flagged=True)),
+             in_window - flagged_in_window),
+            ("counts window", lambda: sum(row[2] for row in q.counts("day", STATION, t0, t1)), in_window),
+            ("trend window", lambda: sum(row[2] for row in q.trend("tut_s", "week", STATION, t0, t1)), in_window),
+            ("flagged", lambda: len(q.flagged()), flagged_total),
+            ("flagged window", lambda: len(q.flagged(STATION, t0, t1)), flagged_in_window),
+            ("flagged since", lambda: len(q.flagged(t0=t0)),
+             sum(1 for i in range(first, args.lifts) if i % args.flag_every == 0)),
+        ]
+        print(f"\n{'query':<26} {'ms':>8} {'rows':>7} {'expected':>9}")
+        for name, query, expected in checks:
+            start = time.perf_counter()
+            try:
+                got = query()
+            except Exception as e:
+                print(f"{name:<26} {'':>8} {type(e).__name__}: {e}")
+                failed = True
+                continue
+            ms = (time.perf_counter() - start) * 1e3
+            print(f"{name:<26} {ms:>8.2f} {got:>7} {expected:>9}")
+            if got != expected:
+                failed = True
+        q.close()
+
+    if failed:
+        print("\n[FAIL] Lift database queries")
+    else:
+        print("\n[OK] Lift database queries return the expected lifts")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+run_core startup import-time benchmark
+======================================
+Imports run_core/main.py in a fresh interpreter under `python -X importtime`
+and reports how long the headless startup path takes before hardware init.
+
+Fails (exit code 1) if:
+  - the median cumulative import time of `main` exceeds --budget-ms
+  - any heavy/optional module (matplotlib, pandas, drivers) is imported eagerly
+
+USAGE:
+    python tests/run_core/startup_benchmark.py
+    python tests/run_core/startup_benchmark.py --runs 10 --budget-ms 150 --top 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+RUN_CORE  = REPO_ROOT / "run_core"
+
+DEFAULT_RUNS      = 5
+DEFAULT_BUDGET_MS = 250
+DEFAULT_TOP       = 15
+
+# Modules that must only be imported once the feature that needs them is enabled
+LAZY_MODULES = ("matplotlib", "pandas", "numpy", "pigpio", "serial", "Dispenser")
+
+
+def measure_once():
+    """Run one cold import of main and return [(module, self_us, cumulative_us)]."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(REPO_ROOT), env.get("PYTHONPATH", "")])
+    env.pop("DISPLAY", None)
+    env.pop("WAYLAND_DISPLAY", None)
+
+    # run_core is put first on sys.path the same way `python run_core/main.py` does
+    code = f"import sys; sys.path.insert(0, {str(RUN_CORE)!r}); import main"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=RUN_CORE, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing main failed:\n{proc.stderr}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    p = argparse.ArgumentParser(description="Measure run_core startup import time")
+    p.add_argument("--runs",      default=DEFAULT_RUNS, type=int)
+    p.add_argument("--budget-ms", default=DEFAULT_BUDGET_MS, type=float)
+    p.add_argument("--top",       default=DEFAULT_TOP, type=int)
+    args = p.parse_args()
+
+    totals_ms = []
+    last_rows = []
+    for _ in range(args.runs):
+        rows = measure_once()
+        main_row = next(r for r in rows if r[0].strip() == "main")
+        totals_ms.append(main_row[2] / 1000)
+        last_rows = rows
+
+    median_ms = statistics.median(totals_ms)
+    print(f"main import (cumulative): median {median_ms:.1f} ms  "
+          f"min {min(totals_ms):.1f} ms  max {max(totals_ms):.1f} ms  ({args.runs} runs)")
+
+    print(f"\nSlowest {args.top} modules by self time (last run):")
+    print(f"{'self ms':>9} {'cum ms':>9}  module")
+    for name, self_us, cum_us in sorted(last_rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.2f} {cum_us / 1000:>9.2f}  {name}")
+
+    eager = sorted({
+        name.strip() for name, _, _ in last_rows
+        if name.strip().split(".")[0] in LAZY_MODULES
+    })
+
+    failed = False
+    if eager:
+        print(f"\n[FAIL] Optional modules imported at startup: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"\n[FAIL] Startup import time {median_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print(f"\n[OK] Headless startup within {args.budget_ms:.0f} ms budget")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
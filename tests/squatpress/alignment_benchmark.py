@@ -0,0 +1,117 @@
+"""
+Time-offset estimation benchmark
+================================
+Compares the old brute-force sweep from single_cycle_rolling_avg.py
+(400 offsets at 1 ms, one np.interp over the truth series each) with
+squatpress.analysis.alignment.find_time_offset() on synthetic lifts with a
+known offset. Ground truth is simulated the way it is captured: sparse
+240 fps keyframes (about 18 per second), or every frame with --dense-truth.
+
+With sparse keyframes the sweep only interpolates a few dozen points per
+offset, so it is already cheap (~5 ms on one 3.3 s cycle) and the gain is
+bounded by the fixed cost of the FFT path's NumPy calls (~0.4 ms): ~7x
+here, ~10x with --dense-truth, ~20x for 30 s of dense truth.
+
+Fails (exit code 1) if the FFT estimate is less than --min-speedup times
+faster than the sweep, takes more than --max-ms per call, or its median
+error exceeds --max-error-ms.
+
+USAGE:
+    python tests/squatpress/alignment_benchmark.py
+    python tests/squatpress/alignment_benchmark.py --trials 100 --duration 30
+    python tests/squatpress/alignment_benchmark.py --dense-truth
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.analysis.alignment import find_time_offset
+
+DEFAULT_TRIALS       = 30
+DEFAULT_DURATION     = 3.3      # seconds of capture per trial
+DEFAULT_MIN_SPEEDUP  = 5.0
+DEFAULT_MAX_MS       = 1.0      # per call, for the default 3.3 s cycle
+DEFAULT_MAX_ERROR_MS = 0.5
+
+
+def sweep_offset(sensor_t, sensor_pos, truth_t, truth_pos, search_range=0.2, resolution=0.001):
+    """The original find_time_offset() from single_cycle_rolling_avg.py."""
+    offsets = np.arange(-search_range, search_range, resolution)
+    errors = []
+    for offset in offsets:
+        interp_pos = np.interp(truth_t, sensor_t + offset, sensor_pos, left=np.nan, right=np.nan)
+        mask = ~np.isnan(interp_pos)
+        if mask.sum() < 5:
+            errors.append(np.inf)
+            continue
+        errors.append(np.sqrt(np.mean((interp_pos[mask] - truth_pos[mask]) ** 2)))
+    return offsets[int(np.argmin(errors))]
+
+
+def make_trial(rng, duration, dense_truth=False):
+    offset = rng.uniform(-0.15, 0.15)
+    period = 3.0
+    lift = lambda t: 12.5 * (1 - np.cos(2 * np.pi * np.mod(t, period) / period)) + 3 * np.sin(5 * t)
+    sensor_t = np.cumsum(rng.uniform(0.002, 0.008, int(duration / 0.005))) - 0.05
+    sensor_pos = lift(sensor_t) + rng.normal(0, 0.05, len(sensor_t))
+    frames = np.arange(int(duration * 240))
+    if not dense_truth:
+        frames = np.sort(rng.choice(frames, int(duration * 18), replace=False))
+    truth_t = frames / 240.0
+    return offset, sensor_t, sensor_pos, truth_t, lift(truth_t - offset)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Compare the brute-force offset sweep with FFT alignment")
+    p.add_argument("--trials", default=DEFAULT_TRIALS, type=int)
+    p.add_argument("--duration", default=DEFAULT_DURATION, type=float)
+    p.add_argument("--min-speedup", default=DEFAULT_MIN_SPEEDUP, type=float)
+    p.add_argument("--max-ms", default=DEFAULT_MAX_MS, type=float,
+                   help="per-call limit (scale it with --duration)")
+    p.add_argument("--max-error-ms", default=DEFAULT_MAX_ERROR_MS, type=float)
+    p.add_argument("--dense-truth", action="store_true", help="a truth point at every 240 fps frame")
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    sweep_s, fft_s, sweep_err, fft_err = [], [], [], []
+    for _ in range(args.trials):
+        offset, *signals = make_trial(rng, args.duration, args.dense_truth)
+        start = time.perf_counter()
+        found = sweep_offset(*signals)
+        sweep_s.append(time.perf_counter() - start)
+        sweep_err.append(abs(found - offset) * 1e3)
+
+        start = time.perf_counter()
+        found = find_time_offset(*signals).offset
+        fft_s.append(time.perf_counter() - start)
+        fft_err.append(abs(found - offset) * 1e3)
+
+    speedup = statistics.median(sweep_s) / statistics.median(fft_s)
+    print(f"trials: {args.trials} x {args.duration:.1f} s, {'dense' if args.dense_truth else 'sparse'} truth")
+    print(f"{'method':<8} {'median ms':>10} {'err p50 ms':>11} {'err max ms':>11}")
+    for name, times, errs in (("sweep", sweep_s, sweep_err), ("fft", fft_s, fft_err)):
+        print(f"{name:<8} {statistics.median(times) * 1e3:>10.2f} {statistics.median(errs):>11.3f} {max(errs):>11.3f}")
+    print(f"\nspeedup: {speedup:.0f}x")
+
+    if speedup < args.min_speedup:
+        print(f"[FAIL] FFT alignment is only {speedup:.0f}x faster than the sweep (want {args.min_speedup:.0f}x)")
+        sys.exit(1)
+    if statistics.median(fft_s) * 1e3 > args.max_ms:
+        print(f"[FAIL] FFT alignment takes {statistics.median(fft_s) * 1e3:.2f} ms per call "
+              f"(limit {args.max_ms} ms)")
+        sys.exit(1)
+    if statistics.median(fft_err) > args.max_error_ms:
+        print(f"[FAIL] Median offset error {statistics.median(fft_err):.3f} ms exceeds {args.max_error_ms} ms")
+        sys.exit(1)
+    print(f"[OK] FFT alignment {speedup:.0f}x faster with {statistics.median(fft_err):.3f} ms median error")
+
+
+if __name__ == "__main__":
+    main()
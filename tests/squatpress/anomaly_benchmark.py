@@ -0,0 +1,133 @@
+"""
+Anomalous cycle detection benchmark
+===================================
+Builds a synthetic session (default 5000 lifts of 110-120 samples with raw
+counts) and plants one kind of anomaly in every 25th cycle, in turn:
+
+  - partial lift (12-18 mm peak)        -> peak
+  - flat line at ~19.5 mm (stuck read)  -> shape
+  - one 0xFFFF raw value (parse junk)   -> invalid
+  - a +5000 count spike                 -> jump
+  - 20 samples missing mid-lift         -> gap
+  - lift held 1.5x as long              -> duration
+
+The capture is scored two ways: squatpress.analysis.anomaly.score() over
+the whole session, and run_core's LiftAnomalyDetector one lift at a time.
+
+Fails (exit code 1) if either misses a planted anomaly or its expected
+flag, flags more than --max-false-rate of the clean cycles, or if the
+batch pass takes longer than --max-ms.
+
+USAGE:
+    python tests/squatpress/anomaly_benchmark.py
+    python tests/squatpress/anomaly_benchmark.py --cycles 20000 --max-ms 2000
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "run_core"))
+from anomaly import LiftAnomalyDetector, LiftTrace
+from squatpress.analysis import anomaly, segmentation
+from squatpress.analysis.cache import Cache
+from squatpress.analysis.loader import Capture
+
+DEFAULT_CYCLES         = 5000
+DEFAULT_MAX_MS         = 1000.0
+DEFAULT_MAX_FALSE_RATE = 0.01
+PLANT_EVERY            = 25
+SAMPLE_S               = 0.015
+COUNTS_PER_MM          = 180
+ZERO_COUNTS            = 10650
+KINDS = [("partial", anomaly.Flag.PEAK), ("flat", anomaly.Flag.SHAPE), ("junk", anomaly.Flag.INVALID),
+         ("spike", anomaly.Flag.JUMP), ("gap", anomaly.Flag.GAP), ("slow", anomaly.Flag.DURATION)]
+
+
+def make_session(rng, cycles):
+    """Capture with restarting time, and the expected flag per cycle (0 = clean)."""
+    ts, mms, raws, expected = [], [], [], np.zeros(cycles, dtype=np.int64)
+    for i in range(cycles):
+        kind = KINDS[(i // PLANT_EVERY) % len(KINDS)][0] if i % PLANT_EVERY == PLANT_EVERY - 1 else None
+        n = int(rng.integers(110, 121)) * (3 if kind == "slow" else 2) // 2
+        t = np.arange(n) * SAMPLE_S
+        height = rng.uniform(12, 18) if kind == "partial" else rng.normal(23.0, 0.2)
+        mm = height * np.sin(np.pi * t / (n * SAMPLE_S)) ** 2 + rng.normal(0, 0.05, n)
+        if kind == "flat":
+            mm = 19.5 + rng.normal(0, 0.05, n)
+        raw = np.round(ZERO_COUNTS - COUNTS_PER_MM * mm).astype(np.int64)
+        if kind == "junk":
+            raw[n // 2] = 0xFFFF
+        elif kind == "spike":
+            raw[n // 2] += 5000
+        elif kind == "gap":
+            keep = np.ones(n, dtype=bool)
+            keep[n // 3:n // 3 + 20] = False
+            t, mm, raw = t[keep], mm[keep], raw[keep]
+        if kind is not None:
+            expected[i] = dict(KINDS)[kind]
+        ts.append(t), mms.append(mm), raws.append(raw)
+    capture = Capture(Path("synthetic.csv"), np.concatenate(ts), np.concatenate(mms), np.concatenate(raws),
+                      None, None)
+    return capture, expected
+
+
+def check(name, flags, expected, max_false_rate):
+    planted = expected != 0
+    missed = int(np.count_nonzero(planted & ((flags & expected) == 0)))
+    false_rate = np.count_nonzero(flags[~planted]) / max(np.count_nonzero(~planted), 1)
+    print(f"  {name:<9} {np.count_nonzero(flags)} flagged, {missed}/{planted.sum()} planted missed, "
+          f"{false_rate:.2%} of clean cycles flagged")
+    return missed == 0 and false_rate <= max_false_rate
+
+
+def main():
+    p = argparse.ArgumentParser(description="Planted anomalies against the batch and run_core detectors")
+    p.add_argument("--cycles", default=DEFAULT_CYCLES, type=int)
+    p.add_argument("--max-ms", default=DEFAULT_MAX_MS, type=float, help="limit for the batch pass")
+    p.add_argument("--max-false-rate", default=DEFAULT_MAX_FALSE_RATE, type=float)
+    args = p.parse_args()
+    logging.disable(logging.WARNING)
+
+    capture, expected = make_session(np.random.default_rng(0), args.cycles)
+    print(f"session: {args.cycles} cycles, {len(capture.t)} rows, {np.count_nonzero(expected)} planted anomalies")
+
+    start = time.perf_counter()
+    scores = anomaly.score(capture, cache=Cache(False))
+    batch_ms = (time.perf_counter() - start) * 1e3
+
+    offsets = segmentation.split(capture.t)
+    detector = LiftAnomalyDetector()
+    live = np.zeros(args.cycles, dtype=np.int64)
+    start = time.perf_counter()
+    for i, (a, b) in enumerate(zip(offsets[:-1], offsets[1:])):
+        trace = LiftTrace()
+        for t, mm, raw in zip(capture.t[a:b].tolist(), capture.mm[a:b].tolist(), capture.raw[a:b].tolist()):
+            trace.add(t, mm, raw)
+        live[i] = detector.score(trace).flags
+    live_ms = (time.perf_counter() - start) * 1e3 / args.cycles
+
+    print(f"  batch:    {batch_ms:7.1f} ms for the session")
+    print(f"  run_core: {live_ms:7.2f} ms per lift (collecting samples included)")
+    ok = check("batch", scores.flags, expected, args.max_false_rate)
+    # The live detector only scores peak/duration/shape after its first min_lifts lifts
+    warm = np.arange(args.cycles) >= detector.min_lifts
+    ok &= check("run_core", live[warm], expected[warm], args.max_false_rate)
+
+    if not ok:
+        print("[FAIL] Planted anomalies missed or too many clean cycles flagged")
+        sys.exit(1)
+    if batch_ms > args.max_ms:
+        print(f"[FAIL] Scoring took {batch_ms:.1f} ms (limit {args.max_ms} ms)")
+        sys.exit(1)
+    print(f"[OK] Every planted anomaly flagged by both detectors; {args.cycles} cycles scored in {batch_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
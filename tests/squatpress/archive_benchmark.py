@@ -0,0 +1,111 @@
+"""
+Raw-count archive benchmark
+===========================
+Packs a capture into the delta/varint archive and reports storage cost
+(bytes per sample, against the CSV and the columnar session it came
+from), encode and full-decode throughput, and the time to read a one
+second window from the middle of the archive.
+
+By default a synthetic capture of --rows rows is generated (400 Hz with
+timing jitter and sensor noise); pass --csv to measure a real capture.
+
+Fails (exit code 1) if the archive uses more than --max-bytes bytes per
+sample or the round trip does not reproduce the raw counts exactly.
+
+USAGE:
+    python tests/squatpress/archive_benchmark.py
+    python tests/squatpress/archive_benchmark.py --rows 5000000 --block-size 16384
+    python tests/squatpress/archive_benchmark.py --csv data/csv/2026.02.27/sensor2_20260227_134448.csv
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.archive import DEFAULT_BLOCK_SIZE, ArchiveReader, pack_session
+from squatpress.session import convert_csv, load_session
+
+DEFAULT_ROWS      = 1_000_000
+DEFAULT_RUNS      = 5
+DEFAULT_MAX_BYTES = 4.0
+
+
+def make_capture(path, rows):
+    rng = np.random.default_rng(0)
+    t = np.cumsum(rng.normal(0.0025, 0.00005, rows))
+    raw = (8300 + 2300 * np.cos(2 * np.pi * t / 4.0) + rng.normal(0, 3, rows)).astype(np.int64)
+    mm = (10600 - raw) / 180.0
+    pd.DataFrame({"time_s": t.round(6), "position_mm": mm.round(3), "raw_value": raw}).to_csv(path, index=False)
+
+
+def time_runs(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Measure size and speed of the raw-count archive")
+    p.add_argument("--csv", help="existing capture CSV with a raw column (default: generate a synthetic one)")
+    p.add_argument("--rows", default=DEFAULT_ROWS, type=int)
+    p.add_argument("--runs", default=DEFAULT_RUNS, type=int)
+    p.add_argument("--block-size", default=DEFAULT_BLOCK_SIZE, type=int)
+    p.add_argument("--max-bytes", default=DEFAULT_MAX_BYTES, type=float)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(args.csv) if args.csv else Path(tmp) / "synthetic.csv"
+        if not args.csv:
+            make_capture(csv_path, args.rows)
+        session_path = convert_csv(csv_path, Path(tmp) / "capture.session")
+        archive_path = Path(tmp) / "capture.sqa"
+
+        session = load_session(session_path)
+        rows = len(session)
+        encode_s = time_runs(lambda: (archive_path.unlink(missing_ok=True),
+                                      pack_session(session_path, archive_path, args.block_size)), args.runs)
+
+        reader = ArchiveReader(archive_path)
+        decoded = reader.read(with_mm=False)
+        exact = np.array_equal(decoded.raw, session["raw"]) and \
+            np.array_equal(np.round(decoded.t * 1e6), np.round(session["t_ns"] / 1000))
+        decode_s = time_runs(lambda: ArchiveReader(archive_path).read(with_mm=False), args.runs)
+        mid = decoded.t[len(decoded.t) // 2]
+        seek_s = time_runs(lambda: ArchiveReader(archive_path).read(mid, mid + 1.0), args.runs)
+
+        csv_bytes = csv_path.stat().st_size
+        session_bytes = sum(f.stat().st_size for f in session_path.iterdir())
+        archive_bytes = archive_path.stat().st_size
+
+    per_sample = archive_bytes / rows
+    print(f"rows: {rows}  blocks: {len(reader.index)} x {args.block_size}")
+    print(f"{'format':<10} {'size MB':>9} {'B/sample':>9}")
+    print(f"{'csv':<10} {csv_bytes / 1e6:>9.2f} {csv_bytes / rows:>9.2f}")
+    print(f"{'session':<10} {session_bytes / 1e6:>9.2f} {session_bytes / rows:>9.2f}")
+    print(f"{'archive':<10} {archive_bytes / 1e6:>9.2f} {per_sample:>9.2f}")
+    print(f"\nencode: {rows / encode_s / 1e6:.1f} Msamples/s")
+    print(f"decode: {rows / decode_s / 1e6:.1f} Msamples/s")
+    print(f"1 s window from the middle: {seek_s * 1e3:.2f} ms")
+
+    if not exact:
+        print("[FAIL] Archive round trip did not reproduce the raw counts and timestamps")
+        sys.exit(1)
+    if per_sample > args.max_bytes:
+        print(f"[FAIL] Archive uses {per_sample:.2f} bytes/sample (want <= {args.max_bytes:.1f})")
+        sys.exit(1)
+    print(f"[OK] Lossless round trip at {per_sample:.2f} bytes/sample")
+
+
+if __name__ == "__main__":
+    main()
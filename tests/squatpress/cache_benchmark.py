@@ -0,0 +1,144 @@
+"""
+Analysis cache benchmark
+========================
+Runs `python -m squatpress.analysis <capture> --timing` on a copy of a real
+capture and its ground truth, first against an empty cache and then again
+(best of --runs), as an interactive re-run would. Then:
+
+  - the warm output must be identical to the cold one,
+  - changing one sample of the copy must give a miss whose output equals a
+    --no-cache run (automatic invalidation),
+  - a Cache with a small size limit must evict least recently used entries
+    first,
+  - writing --puts small entries must average under --max-put-ms each (the
+    directory is not rescanned on every write),
+  - a cache directory that cannot be written must not fail memoize().
+
+Fails (exit code 1) if any check fails or the warm run is less than
+--min-speedup times faster than the cold one.
+
+USAGE:
+    python tests/squatpress/cache_benchmark.py
+    python tests/squatpress/cache_benchmark.py --capture data/csv/2026.4.13/sensor2_113644.csv --runs 7
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.analysis.cache import Cache
+from squatpress.analysis.loader import find_truth
+
+DEFAULT_CAPTURE     = REPO_ROOT / "data" / "csv" / "2026.04.09" / "sensor2_142307.csv"
+DEFAULT_RUNS        = 5
+DEFAULT_MIN_SPEEDUP = 1.5
+DEFAULT_PUTS        = 3000
+DEFAULT_MAX_PUT_MS  = 2.0
+
+
+def analyse(capture, cache_dir, *extra):
+    env = dict(os.environ, SQUATPRESS_CACHE_DIR=str(cache_dir))
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-m", "squatpress.analysis", str(capture), "--timing", *extra],
+                         cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - start, out
+
+
+def lru_evicts_oldest(directory) -> bool:
+    cache = Cache(directory, max_bytes=1 << 40)
+    blob = np.zeros(1000)
+    for i in range(4):
+        cache.put(f"{i:064x}", blob)
+        time.sleep(0.01)
+    cache.get(f"{0:064x}")                      # entry 0 is now the most recently used
+    cache.max_bytes = 2 * blob.nbytes + 2000
+    cache.put(f"{4:064x}", blob)
+    left = {path.stem for path, _, _ in cache.entries()}
+    return left == {f"{0:064x}", f"{4:064x}"}
+
+
+def put_ms(directory, puts) -> float:
+    cache = Cache(directory)
+    blob = np.zeros(100)
+    start = time.perf_counter()
+    for i in range(puts):
+        cache.put(f"{i:064x}", blob)
+    return (time.perf_counter() - start) * 1e3 / puts
+
+
+def unwritable_is_skipped(directory) -> bool:
+    directory.write_text("a file where the cache directory should be")
+    return Cache(directory).memoize("answer", [], lambda: 42) == 42
+
+
+def main():
+    p = argparse.ArgumentParser(description="Cold vs warm analysis runs through the disk cache")
+    p.add_argument("--capture", default=str(DEFAULT_CAPTURE))
+    p.add_argument("--runs", default=DEFAULT_RUNS, type=int)
+    p.add_argument("--min-speedup", default=DEFAULT_MIN_SPEEDUP, type=float)
+    p.add_argument("--puts", default=DEFAULT_PUTS, type=int)
+    p.add_argument("--max-put-ms", default=DEFAULT_MAX_PUT_MS, type=float)
+    args = p.parse_args()
+
+    capture = Path(args.capture).resolve()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        data, cache_dir = tmp / "data", tmp / "cache"
+        data.mkdir()
+        shutil.copy(capture, data / capture.name)
+        shutil.copy(find_truth(capture), data / "gt.csv")
+        copy = data / capture.name
+
+        cold, cold_out = analyse(copy, cache_dir)
+        warm_runs = [analyse(copy, cache_dir) for _ in range(args.runs)]
+        warm = min(t for t, _ in warm_runs)
+        speedup = cold / warm
+        print(f"Cold run: {cold * 1e3:.0f} ms")
+        print(f"Warm run: {warm * 1e3:.0f} ms (best of {args.runs})  ->  {speedup:.1f}x")
+
+        if any(out != cold_out for _, out in warm_runs):
+            print("[FAIL] Cached results differ from the computed ones")
+            sys.exit(1)
+
+        lines = copy.read_text().splitlines()
+        row = lines[len(lines) // 2].split(",")
+        row[1] = f"{float(row[1]) + 0.5:g}"
+        lines[len(lines) // 2] = ",".join(row)
+        copy.write_text("\n".join(lines) + "\n")
+        _, edited_out = analyse(copy, cache_dir)
+        _, fresh_out = analyse(copy, cache_dir, "--no-cache")
+        if edited_out == cold_out or edited_out != fresh_out:
+            print("[FAIL] Editing the capture did not invalidate its cached results")
+            sys.exit(1)
+
+        if not lru_evicts_oldest(tmp / "lru"):
+            print("[FAIL] Eviction did not remove the least recently used entries")
+            sys.exit(1)
+
+        per_put = put_ms(tmp / "puts", args.puts)
+        print(f"Writes:   {per_put:.2f} ms per entry over {args.puts} entries")
+        if per_put > args.max_put_ms:
+            print(f"[FAIL] Writing an entry takes {per_put:.2f} ms (limit {args.max_put_ms} ms)")
+            sys.exit(1)
+
+        if not unwritable_is_skipped(tmp / "unwritable"):
+            print("[FAIL] An unwritable cache directory broke memoize()")
+            sys.exit(1)
+
+    if speedup < args.min_speedup:
+        print(f"[FAIL] Warm run only {speedup:.1f}x faster (need {args.min_speedup}x)")
+        sys.exit(1)
+    print(f"[OK] Warm re-run {speedup:.1f}x faster, identical output, invalidated on edit, LRU eviction")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Batch cycle alignment benchmark
+===============================
+Aligns a synthetic multi-cycle session (default 500 lifts, each with its
+own known time offset) to one ground-truth cycle twice:
+
+  - loop:  find_time_offset() once per cycle
+  - batch: align_cycles() on the whole session (cycles x samples arrays)
+
+Ground truth is sparse 240 fps keyframes like the video captures.
+
+Fails (exit code 1) if the batch takes longer than --max-seconds, its
+median offset error exceeds --max-error-ms, or it disagrees with the
+per-cycle loop at the 99th percentile.
+
+USAGE:
+    python tests/squatpress/cycle_alignment_benchmark.py
+    python tests/squatpress/cycle_alignment_benchmark.py --cycles 2000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.analysis.alignment import align_cycles, find_time_offset
+
+DEFAULT_CYCLES       = 500
+DEFAULT_MAX_SECONDS  = 1.0
+DEFAULT_MAX_ERROR_MS = 0.5
+# The batch grid spans all cycles, so it samples each one at slightly different points than the
+# per-cycle loop; on a cycle with two near-equal error minima that can tip the polish either way
+MAX_DISAGREE_MS      = 0.05     # 99th percentile
+CYCLE_S              = 1.7
+
+
+def lift(t):
+    phase = np.clip(t / CYCLE_S, 0, 1)
+    return 11.5 * (1 - np.cos(2 * np.pi * phase)) + 2 * np.sin(3 * np.pi * phase) ** 2
+
+
+def make_session(rng, cycles):
+    """Flat (t, x, offsets) with per-cycle time origins, plus the true offsets and the truth keyframes."""
+    true_offsets = rng.uniform(-0.15, 0.05, cycles)
+    counts = rng.integers(320, 380, cycles)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    t = np.concatenate([np.sort(rng.uniform(0, CYCLE_S + 0.2, n)) for n in counts])
+    x = lift(t + np.repeat(true_offsets, counts)) + rng.normal(0, 0.05, len(t))
+    frames = np.sort(rng.choice(np.arange(int(CYCLE_S * 240)), 60, replace=False))
+    truth_t = frames / 240.0
+    return t, x, offsets, true_offsets, truth_t, lift(truth_t)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Compare per-cycle and batched alignment of a multi-cycle session")
+    p.add_argument("--cycles", default=DEFAULT_CYCLES, type=int)
+    p.add_argument("--max-seconds", default=DEFAULT_MAX_SECONDS, type=float)
+    p.add_argument("--max-error-ms", default=DEFAULT_MAX_ERROR_MS, type=float)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    t, x, offsets, true_offsets, truth_t, truth_pos = make_session(rng, args.cycles)
+
+    start = time.perf_counter()
+    loop = np.array([find_time_offset(t[a:b], x[a:b], truth_t, truth_pos).offset
+                     for a, b in zip(offsets[:-1], offsets[1:])])
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = align_cycles(t, x, offsets, truth_t, truth_pos)
+    batch_s = time.perf_counter() - start
+
+    err_ms = np.abs(batch.offsets - true_offsets) * 1e3
+    disagree_ms = np.abs(batch.offsets - loop) * 1e3
+    print(f"session: {args.cycles} cycles, {len(t)} samples, {len(truth_t)} truth points")
+    print(f"{'method':<8} {'total ms':>10} {'per cycle ms':>13}")
+    print(f"{'loop':<8} {loop_s * 1e3:>10.1f} {loop_s * 1e3 / args.cycles:>13.3f}")
+    print(f"{'batch':<8} {batch_s * 1e3:>10.1f} {batch_s * 1e3 / args.cycles:>13.3f}")
+    print(f"\noffset error: p50 {np.median(err_ms):.3f} ms, max {err_ms.max():.3f} ms; "
+          f"batch vs loop difference p99 {np.percentile(disagree_ms, 99):.4f} ms, max {disagree_ms.max():.4f} ms")
+    print(f"per-cycle RMS: median {np.median(batch.rms):.3f} mm, worst {np.max(batch.rms):.3f} mm "
+          f"(cycle {int(np.argmax(batch.rms))})")
+
+    if batch_s > args.max_seconds:
+        print(f"[FAIL] Batch alignment took {batch_s:.2f} s (limit {args.max_seconds} s)")
+        sys.exit(1)
+    if np.median(err_ms) > args.max_error_ms:
+        print(f"[FAIL] Median offset error {np.median(err_ms):.3f} ms exceeds {args.max_error_ms} ms")
+        sys.exit(1)
+    if np.percentile(disagree_ms, 99) > MAX_DISAGREE_MS:
+        print(f"[FAIL] Batch and per-cycle offsets differ by {np.percentile(disagree_ms, 99):.4f} ms (p99)")
+        sys.exit(1)
+    print(f"[OK] {args.cycles} cycles aligned in {batch_s * 1e3:.0f} ms ({loop_s / batch_s:.1f}x the per-cycle loop)")
+
+
+if __name__ == "__main__":
+    main()
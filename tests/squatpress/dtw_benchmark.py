@@ -0,0 +1,118 @@
+"""
+Banded DTW benchmark
+====================
+Warps a synthetic session (default 500 lifts) against one ground-truth
+cycle with squatpress.analysis.dtw.warp_cycles(). Each synthetic cycle lags
+the truth by a different known amount in its concentric and eccentric
+phases, blended smoothly around the peak, on top of a rigid offset.
+
+Also checks dtw() against a plain O(N^2) dynamic program on a few small
+random pairs.
+
+Fails (exit code 1) if the session takes longer than --max-seconds, the
+median error of the recovered eccentric - concentric lag difference exceeds
+--max-error-ms, or dtw() disagrees with the reference.
+
+USAGE:
+    python tests/squatpress/dtw_benchmark.py
+    python tests/squatpress/dtw_benchmark.py --cycles 2000 --window 0.15
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.analysis.dtw import PHASES, dtw, warp_cycles
+
+DEFAULT_CYCLES       = 500
+DEFAULT_WINDOW       = 0.1
+DEFAULT_MAX_SECONDS  = 1.0
+DEFAULT_MAX_ERROR_MS = 2.0
+CYCLE_S              = 1.7
+PEAK_S               = 0.6
+
+
+def lift(t):
+    """Fast concentric to PEAK_S, slower eccentric back to the floor."""
+    up = 23 * np.sin(np.pi / 2 * np.clip(t / PEAK_S, 0, 1)) ** 2
+    down = 23 * np.cos(np.pi / 2 * np.clip((t - PEAK_S) / (CYCLE_S - PEAK_S), 0, 1)) ** 2
+    return np.where(t < PEAK_S, up, down)
+
+
+def make_session(rng, cycles):
+    """Flat (t, x, offsets), the rigid offsets, the true per-phase lags (cycles x 2) and the truth."""
+    lags = rng.uniform(-0.03, 0.03, (cycles, 2))
+    rigid = rng.uniform(-0.1, 0.1, cycles)
+    counts = rng.integers(320, 380, cycles)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    t = np.concatenate([np.sort(rng.uniform(-0.2, CYCLE_S + 0.2, n)) for n in counts])
+    cycle = np.repeat(np.arange(cycles), counts)
+    # Delay blends from the concentric to the eccentric lag over 0.1 s around the peak
+    blend = np.clip((t - PEAK_S) / 0.1 + 0.5, 0, 1)
+    delay = lags[cycle, 0] * (1 - blend) + lags[cycle, 1] * blend
+    x = lift(t - delay) + rng.normal(0, 0.03, len(t))
+    truth_t = np.arange(int(CYCLE_S * 240)) / 240.0
+    return t - rigid[cycle], x, offsets, rigid, lags, truth_t, lift(truth_t)
+
+
+def reference_dtw(x, y, w):
+    n = len(x)
+    D = np.full((n + 1, n + 1), np.inf)
+    D[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(max(1, i - w), min(n, i + w) + 1):
+            D[i, j] = abs(x[i - 1] - y[j - 1]) + min(D[i - 1, j - 1], D[i - 1, j], D[i, j - 1])
+    return D[n, n] / n
+
+
+def main():
+    p = argparse.ArgumentParser(description="Banded DTW timing and per-phase lag recovery")
+    p.add_argument("--cycles", default=DEFAULT_CYCLES, type=int)
+    p.add_argument("--window", default=DEFAULT_WINDOW, type=float, help="band half-width (s)")
+    p.add_argument("--max-seconds", default=DEFAULT_MAX_SECONDS, type=float)
+    p.add_argument("--max-error-ms", default=DEFAULT_MAX_ERROR_MS, type=float)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    worst_ref = 0.0
+    for _ in range(20):
+        n, w = int(rng.integers(5, 80)), int(rng.integers(0, 15))
+        x, y = rng.normal(size=n).cumsum(), rng.normal(size=n).cumsum()
+        worst_ref = max(worst_ref, abs(dtw(x, y, w, path=False)[0][0] - reference_dtw(x, y, min(w, n - 1))))
+
+    t, x, offsets, _, lags, truth_t, truth_pos = make_session(rng, args.cycles)
+    start = time.perf_counter()
+    warp = warp_cycles(t, x, offsets, truth_t, truth_pos, window=args.window)
+    elapsed = time.perf_counter() - start
+
+    # Lag is measured after the rigid offset, which absorbs some blend of both phase lags,
+    # so what is checked is the difference between them (eccentric - concentric)
+    err_ms = np.abs(np.diff(warp.phase_lag, axis=1) - np.diff(lags, axis=1))[:, 0] * 1e3
+    band = 2 * int(round(args.window / 0.005)) + 1
+    print(f"session: {args.cycles} cycles, {len(warp.grid)} grid samples, band {band} cells")
+    print(f"warp_cycles: {elapsed * 1e3:.0f} ms ({elapsed * 1e3 / args.cycles:.2f} ms/cycle), "
+          f"traceback {args.cycles * len(warp.grid) * band / 1e6:.1f} MB")
+    print(f"{PHASES[1]} - {PHASES[0]} lag error: p50 {np.median(err_ms):.2f} ms, "
+          f"p95 {np.percentile(err_ms, 95):.2f} ms")
+    print(f"dtw() vs O(N^2) reference: max difference {worst_ref:.2e}")
+
+    if worst_ref > 1e-9:
+        print("[FAIL] Banded DTW disagrees with the reference dynamic program")
+        sys.exit(1)
+    if elapsed > args.max_seconds:
+        print(f"[FAIL] Warping took {elapsed:.2f} s (limit {args.max_seconds} s)")
+        sys.exit(1)
+    if np.median(err_ms) > args.max_error_ms:
+        print(f"[FAIL] Median phase lag difference error {np.median(err_ms):.2f} ms exceeds {args.max_error_ms} ms")
+        sys.exit(1)
+    print(f"[OK] {args.cycles} cycles warped in {elapsed * 1e3:.0f} ms, "
+          f"median phase lag difference error {np.median(err_ms):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Ensemble statistics / template lift benchmark
+=============================================
+Writes a synthetic multi-cycle capture CSV (default 5000 lifts of ~115
+samples, time_s restarting at 0 every cycle; one lift in ten never
+reaches full height) and builds its template two ways:
+
+  - in memory: load_capture() + pipeline.session_cycles() + ensemble()
+  - streamed: ensemble.stream() reading --chunk-rows rows at a time
+
+Fails (exit code 1) if:
+  - the two disagree on the cycles, mean or SD, or on the percentiles by
+    more than one histogram bin;
+  - a percentile band is further than 2 x QUANTILE_RESOLUTION_MM from the
+    exact np.percentile of the resampled cycles;
+  - the bootstrap CI of the mean is not about 2 x 1.96 SD / sqrt(n) wide;
+  - the streamed build's peak traced memory on the whole capture is more
+    than --max-memory-growth above its peak on the first quarter (memory
+    has to stay bounded by the chunk and the grid, not the capture).
+
+USAGE:
+    python tests/squatpress/ensemble_benchmark.py
+    python tests/squatpress/ensemble_benchmark.py --cycles 20000 --chunk-rows 50000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.analysis import ensemble, pipeline, segmentation
+from squatpress.analysis.cache import Cache
+from squatpress.analysis.loader import load_capture
+
+DEFAULT_CYCLES           = 5000
+DEFAULT_CHUNK_ROWS       = 20_000
+DEFAULT_MAX_MEMORY_GROWTH = 0.1
+CI_WIDTH_TOLERANCE       = 0.25     # relative, against the normal approximation
+SAMPLE_S                 = 0.015
+
+
+def write_capture(path, rng, cycles):
+    """CSV of cycles of 100-130 samples; one in ten peaks at 12-18 mm instead of ~23."""
+    counts = rng.integers(100, 131, cycles)
+    t = segmentation.relative(np.arange(counts.sum()) * SAMPLE_S, np.concatenate([[0], np.cumsum(counts)]))
+    span = np.repeat(counts * SAMPLE_S, counts)
+    height = np.where(rng.random(cycles) >= 0.1, rng.normal(23.0, 0.3, cycles), rng.uniform(12, 18, cycles))
+    mm = np.repeat(height, counts) * np.sin(np.pi * t / span) ** 2 + rng.normal(0, 0.05, len(t))
+    pd.DataFrame({"time_s": t, "position_mm": mm}).to_csv(path, index=False, float_format="%.5f")
+
+
+def traced(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def in_memory(path):
+    cycles = pipeline.session_cycles(load_capture(path), cache=Cache(False))
+    return ensemble.ensemble(cycles), cycles
+
+
+def main():
+    p = argparse.ArgumentParser(description="Streamed template lift against the in-memory build")
+    p.add_argument("--cycles", default=DEFAULT_CYCLES, type=int)
+    p.add_argument("--chunk-rows", default=DEFAULT_CHUNK_ROWS, type=int)
+    p.add_argument("--max-memory-growth", default=DEFAULT_MAX_MEMORY_GROWTH, type=float)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sensor_synthetic.csv"
+        quarter = Path(tmp) / "sensor_synthetic_quarter.csv"
+        write_capture(path, np.random.default_rng(0), args.cycles)
+        write_capture(quarter, np.random.default_rng(0), args.cycles // 4)
+        print(f"capture: {args.cycles} cycles, {path.stat().st_size / 1e6:.1f} MB CSV")
+
+        (whole, cycles), whole_s, whole_peak = traced(lambda: in_memory(path))
+        _, _, quarter_peak = traced(lambda: ensemble.stream(quarter, chunk_rows=args.chunk_rows))
+        streamed, stream_s, stream_peak = traced(lambda: ensemble.stream(path, chunk_rows=args.chunk_rows))
+        saved = ensemble.save_template(streamed, Path(tmp) / "synthetic.template.npz")
+        loaded, _ = ensemble.load_template(saved)
+        size_kb = saved.stat().st_size / 1e3
+
+    print(f"  in memory: {whole_s:6.2f} s, peak {whole_peak / 1e6:7.1f} MB")
+    print(f"  streamed:  {stream_s:6.2f} s, peak {stream_peak / 1e6:7.1f} MB  ({args.chunk_rows} rows per chunk; "
+          f"{quarter_peak / 1e6:.1f} MB on a quarter of the cycles)")
+    print(f"  template:  {streamed.cycles} cycles x {len(streamed.grid)} points, {size_kb:.0f} kB")
+
+    values, mask = ensemble.resample(cycles, ensemble.time_grid())
+    covered = whole.count >= 2
+    exact = np.nanpercentile(np.where(mask, values, np.nan)[:, covered], whole.levels, axis=0)
+    percentile_error = np.max(np.abs(whole.percentiles[:, covered] - exact))
+    ci_width = (streamed.ci[1] - streamed.ci[0])[covered]
+    normal_width = 2 * 1.96 * streamed.sd[covered] / np.sqrt(streamed.count[covered])
+    ci_error = np.median(np.abs(ci_width / normal_width - 1))
+    print(f"  largest percentile error {percentile_error:.4f} mm, median CI width error {ci_error:.1%}")
+
+    agree = (streamed.cycles == whole.cycles and np.array_equal(streamed.count, whole.count)
+             and np.allclose(streamed.mean, whole.mean, atol=1e-4, equal_nan=True)
+             and np.allclose(streamed.sd, whole.sd, atol=1e-4, equal_nan=True)
+             and np.allclose(streamed.percentiles, whole.percentiles, atol=ensemble.QUANTILE_RESOLUTION_MM,
+                            equal_nan=True)
+             and np.array_equal(loaded.mean, streamed.mean, equal_nan=True))
+    if not agree:
+        print("[FAIL] Streamed template differs from the in-memory one")
+        sys.exit(1)
+    if percentile_error > 2 * ensemble.QUANTILE_RESOLUTION_MM:
+        print(f"[FAIL] Percentiles off by {percentile_error:.4f} mm")
+        sys.exit(1)
+    if ci_error > CI_WIDTH_TOLERANCE:
+        print(f"[FAIL] Bootstrap CI width off by {ci_error:.1%} from the normal approximation")
+        sys.exit(1)
+    if stream_peak > (1 + args.max_memory_growth) * quarter_peak:
+        print(f"[FAIL] Streaming memory grows with the capture ({quarter_peak / 1e6:.1f} MB for a quarter, "
+              f"{stream_peak / 1e6:.1f} MB for all of it)")
+        sys.exit(1)
+    print(f"[OK] {streamed.cycles}-cycle template streamed in {stream_s:.2f} s in bounded memory "
+          f"({stream_peak / whole_peak:.0%} of the in-memory peak); {size_kb:.0f} kB artifact")
+
+
+if __name__ == "__main__":
+    main()
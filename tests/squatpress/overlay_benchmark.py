@@ -0,0 +1,99 @@
+"""
+Multi-cycle overlay rendering benchmark
+=======================================
+Draws a synthetic session (default 500 lifts of ~115 samples) on the Agg
+canvas and saves it as a PNG three ways:
+
+  - per cycle: one ax.plot and one ax.scatter for every cycle, as
+    all_cycles_vs_gt.py used to do
+  - plotting.cycles() with lines: one LineCollection
+  - plotting.cycles() as a density map
+
+Fails (exit code 1) if the LineCollection path is less than --min-speedup
+times faster than the per-cycle one, or if either of the new paths adds
+more than a handful of artists.
+
+USAGE:
+    python tests/squatpress/overlay_benchmark.py
+    python tests/squatpress/overlay_benchmark.py --cycles 2000 --min-speedup 10
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from matplotlib.figure import Figure
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.analysis import plotting
+
+DEFAULT_CYCLES      = 500
+DEFAULT_MIN_SPEEDUP = 5.0
+MAX_ARTISTS         = 5
+SAMPLE_S            = 0.015
+
+
+def make_session(rng, cycles):
+    counts = rng.integers(100, 131, cycles)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    t = np.arange(offsets[-1]) * SAMPLE_S
+    t -= np.repeat(t[offsets[:-1]], counts)
+    span = np.repeat(counts * SAMPLE_S, counts)
+    x = 23 * np.sin(np.pi * t / span) ** 2 + rng.normal(0, 0.1, len(t))
+    return t, x, offsets, rng.normal(0, 0.01, cycles)
+
+
+def per_cycle(ax, t, x, offsets, shifts):
+    colors = matplotlib.colormaps["viridis"](np.linspace(0, 1, len(shifts)))
+    for i, (a, b) in enumerate(zip(offsets[:-1], offsets[1:])):
+        ax.plot(t[a:b] + shifts[i], x[a:b], linewidth=1.5, alpha=0.7, color=colors[i])
+        ax.scatter(t[a:b] + shifts[i], x[a:b], s=8, alpha=0.5, color=colors[i])
+
+
+def timed(draw, out):
+    start = time.perf_counter()
+    fig = Figure(figsize=(14, 7))
+    ax = fig.subplots()
+    draw(ax)
+    fig.savefig(out, dpi=100)
+    artists = len(ax.lines) + len(ax.collections)
+    return time.perf_counter() - start, artists
+
+
+def main():
+    p = argparse.ArgumentParser(description="Per-cycle artists vs one LineCollection / density map")
+    p.add_argument("--cycles", default=DEFAULT_CYCLES, type=int)
+    p.add_argument("--min-speedup", default=DEFAULT_MIN_SPEEDUP, type=float)
+    args = p.parse_args()
+
+    t, x, offsets, shifts = make_session(np.random.default_rng(0), args.cycles)
+    with tempfile.TemporaryDirectory() as tmp:
+        old, old_artists = timed(lambda ax: per_cycle(ax, t, x, offsets, shifts), Path(tmp) / "old.png")
+        lines, line_artists = timed(lambda ax: plotting.cycles(ax, t, x, offsets, shifts, density=False),
+                                    Path(tmp) / "lines.png")
+        density, density_artists = timed(lambda ax: plotting.cycles(ax, t, x, offsets, shifts, density=True),
+                                         Path(tmp) / "density.png")
+
+    print(f"session: {args.cycles} cycles, {len(t)} samples")
+    print(f"  per-cycle plot + scatter: {old:6.2f} s  ({old_artists} artists)")
+    print(f"  LineCollection:           {lines:6.2f} s  ({line_artists} artists)  ->  {old / lines:.1f}x")
+    print(f"  density map:              {density:6.2f} s  ({density_artists} artists)  ->  {old / density:.1f}x")
+
+    if max(line_artists, density_artists) > MAX_ARTISTS:
+        print(f"[FAIL] Artist count grows with the cycles ({line_artists} / {density_artists})")
+        sys.exit(1)
+    if old / lines < args.min_speedup:
+        print(f"[FAIL] LineCollection only {old / lines:.1f}x faster (need {args.min_speedup}x)")
+        sys.exit(1)
+    print(f"[OK] {args.cycles} cycles rendered {old / lines:.1f}x faster as one LineCollection, "
+          f"{old / density:.1f}x as a density map")
+
+
+if __name__ == "__main__":
+    main()
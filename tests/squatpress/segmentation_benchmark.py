@@ -0,0 +1,120 @@
+"""
+Cycle segmentation benchmark
+============================
+Builds a synthetic multi-cycle capture (default 10k lifts, each logged
+with time_s restarting at 0 and a GPIO cycle column; one lift in ten never
+reaches full height) and segments it three ways with
+squatpress.analysis.segmentation: by time reset, by cycle column and by
+lift detection, then filters to full-height cycles and packs them.
+
+The previous approach (cycle_id = cumsum of resets, a groupby loop and a
+per-cycle .loc[...].copy() peak filter, as all_cycles_vs_gt.py used to do)
+runs on the first --reference-cycles cycles as the reference and for
+timing.
+
+Fails (exit code 1) if the three splits or the filter disagree with the
+reference / the known cycles, or if segmenting and filtering the whole
+capture takes longer than --max-ms.
+
+USAGE:
+    python tests/squatpress/segmentation_benchmark.py
+    python tests/squatpress/segmentation_benchmark.py --cycles 50000 --reference-cycles 500
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.analysis import segmentation
+
+DEFAULT_CYCLES           = 10_000
+DEFAULT_REFERENCE_CYCLES = 1_000
+DEFAULT_MAX_MS           = 100.0
+PEAK_THRESHOLD_MM        = 19.5
+SAMPLE_S                 = 0.015
+
+
+def make_capture(rng, cycles):
+    """(time_s, position_mm, cycle, full-height mask) of a capture with cycles of 100-130 samples."""
+    counts = rng.integers(100, 131, cycles)
+    cycle = np.repeat(np.arange(1, cycles + 1), counts)
+    t = segmentation.relative(np.arange(counts.sum()) * SAMPLE_S, np.concatenate([[0], np.cumsum(counts)]))
+    span = np.repeat(counts * SAMPLE_S, counts)
+    full = rng.random(cycles) >= 0.1
+    height = np.where(full, 23.0, rng.uniform(12, 18, cycles))
+    mm = np.repeat(height, counts) * np.sin(np.pi * t / span) ** 2 + rng.normal(0, 0.05, len(t))
+    return t, mm, cycle, full
+
+
+def reference(df):
+    """all_cycles_vs_gt.py before the segmentation module: (start, inclusive end) of the kept cycles."""
+    df = df.copy()
+    df["cycle_id"] = (df["time_s"].diff().fillna(0) < -0.5).cumsum()
+    kept = []
+    for _, grp in df.groupby("cycle_id"):
+        segment = df.loc[grp.index[0]:grp.index[-1]].copy()
+        if segment["position_mm"].max() >= PEAK_THRESHOLD_MM and segment["time_s"].iloc[-1] > segment["time_s"].iloc[0]:
+            kept.append((grp.index[0], grp.index[-1]))
+    return kept
+
+
+def main():
+    p = argparse.ArgumentParser(description="Vectorized cycle segmentation against the groupby loop")
+    p.add_argument("--cycles", default=DEFAULT_CYCLES, type=int)
+    p.add_argument("--reference-cycles", default=DEFAULT_REFERENCE_CYCLES, type=int)
+    p.add_argument("--max-ms", default=DEFAULT_MAX_MS, type=float, help="limit for split + filter + pack")
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    t, mm, cycle, full = make_capture(rng, args.cycles)
+    print(f"capture: {args.cycles} cycles, {len(t)} rows")
+
+    start = time.perf_counter()
+    offsets = segmentation.split(t)
+    keep = segmentation.filter_cycles(t, mm, offsets, min_peak=PEAK_THRESHOLD_MM)
+    (_, packed_mm), packed = segmentation.gather(offsets, keep, t, mm)
+    elapsed_ms = (time.perf_counter() - start) * 1e3
+
+    timings = {}
+    for name, split in (("time reset", lambda: segmentation.by_time_reset(t)),
+                        ("cycle column", lambda: segmentation.by_cycle_column(cycle)),
+                        ("lift detection", lambda: segmentation.by_lift(mm))):
+        start = time.perf_counter()
+        timings[name] = (split(), (time.perf_counter() - start) * 1e3)
+        print(f"  {name:<15} {len(timings[name][0]) - 1:>7} cycles in {timings[name][1]:6.1f} ms")
+    print(f"  split + filter + pack: {keep.sum()} full-height cycles in {elapsed_ms:.1f} ms")
+
+    n_ref = min(args.reference_cycles, args.cycles)
+    rows_ref = int(offsets[n_ref])
+    df = pd.DataFrame({"time_s": t[:rows_ref], "position_mm": mm[:rows_ref]})
+    start = time.perf_counter()
+    kept_ref = reference(df)
+    ref_ms = (time.perf_counter() - start) * 1e3
+    print(f"  groupby + .loc loop on {n_ref} cycles: {ref_ms:.0f} ms "
+          f"(~{ref_ms * args.cycles / n_ref / elapsed_ms:.0f}x slower when scaled to {args.cycles})")
+
+    starts, ends = segmentation.select(offsets[:n_ref + 1], keep[:n_ref])
+    same_as_reference = [(int(a), int(b) - 1) for a, b in zip(starts, ends)] == kept_ref
+    splits_agree = (np.array_equal(timings["time reset"][0], timings["cycle column"][0])
+                    and len(timings["lift detection"][0]) - 1 == args.cycles)
+    packed_ok = (np.array_equal(keep, full) and packed[-1] == len(packed_mm)
+                 and np.array_equal(segmentation.peaks(packed_mm, packed), segmentation.peaks(mm, offsets)[keep]))
+
+    if not (same_as_reference and splits_agree and packed_ok):
+        print(f"[FAIL] Segmentation mismatch (reference {same_as_reference}, splits {splits_agree}, "
+              f"filter/pack {packed_ok})")
+        sys.exit(1)
+    if elapsed_ms > args.max_ms:
+        print(f"[FAIL] Segmenting took {elapsed_ms:.1f} ms (limit {args.max_ms} ms)")
+        sys.exit(1)
+    print(f"[OK] {args.cycles} cycles segmented, filtered and packed in {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
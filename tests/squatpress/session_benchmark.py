@@ -0,0 +1,104 @@
+"""
+Session format load benchmark
+=============================
+Compares loading a capture with pd.read_csv against load_session() on the
+same data converted to the columnar session format. Both sides end with
+the time and position columns as numpy arrays and touch every value, so
+lazily mapped pages are counted too.
+
+By default a synthetic capture of --rows rows is generated (layout
+time_s,position_mm,raw_value); pass --csv to measure a real capture.
+
+Fails (exit code 1) if the session load is less than --min-speedup times
+faster than pd.read_csv.
+
+USAGE:
+    python tests/squatpress/session_benchmark.py
+    python tests/squatpress/session_benchmark.py --rows 2000000 --runs 7
+    python tests/squatpress/session_benchmark.py --csv data/csv/2026.02.27/sensor2_20260227_134448.csv
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+from squatpress.session import convert_csv, load_session
+
+DEFAULT_ROWS        = 1_000_000
+DEFAULT_RUNS        = 5
+DEFAULT_MIN_SPEEDUP = 10.0
+
+
+def make_capture(path, rows):
+    rng = np.random.default_rng(0)
+    t = np.arange(rows) * 0.0025
+    raw = (8300 + 2300 * np.cos(2 * np.pi * t / 4.0) + rng.normal(0, 3, rows)).astype(np.int64)
+    mm = (10600 - raw) / 180.0
+    pd.DataFrame({"time_s": t.round(4), "position_mm": mm.round(3), "raw_value": raw}).to_csv(path, index=False)
+
+
+def time_runs(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def load_csv(path):
+    df = pd.read_csv(path)
+    t = df["time_s"].to_numpy()
+    mm = df["position_mm"].to_numpy()
+    return float(t.sum() + mm.sum())
+
+
+def load_columnar(path):
+    session = load_session(path)
+    return float(session.t.sum() + session.mm.sum())
+
+
+def main():
+    p = argparse.ArgumentParser(description="Compare pd.read_csv with the columnar session loader")
+    p.add_argument("--csv", help="existing capture CSV (default: generate a synthetic one)")
+    p.add_argument("--rows", default=DEFAULT_ROWS, type=int)
+    p.add_argument("--runs", default=DEFAULT_RUNS, type=int)
+    p.add_argument("--min-speedup", default=DEFAULT_MIN_SPEEDUP, type=float)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(args.csv) if args.csv else Path(tmp) / "synthetic.csv"
+        if not args.csv:
+            make_capture(csv_path, args.rows)
+        session_path = convert_csv(csv_path, Path(tmp) / "capture.session")
+        rows = len(load_session(session_path))
+
+        csv_bytes = csv_path.stat().st_size
+        session_bytes = sum(f.stat().st_size for f in session_path.iterdir())
+
+        csv_s = time_runs(lambda: load_csv(csv_path), args.runs)
+        session_s = time_runs(lambda: load_columnar(session_path), args.runs)
+
+    speedup = csv_s / session_s
+    print(f"rows: {rows}")
+    print(f"{'format':<10} {'size MB':>9} {'load ms':>9} {'Mrows/s':>9}")
+    print(f"{'csv':<10} {csv_bytes / 1e6:>9.2f} {csv_s * 1e3:>9.2f} {rows / csv_s / 1e6:>9.1f}")
+    print(f"{'session':<10} {session_bytes / 1e6:>9.2f} {session_s * 1e3:>9.2f} {rows / session_s / 1e6:>9.1f}")
+    print(f"\nspeedup: {speedup:.1f}x")
+
+    if speedup < args.min_speedup:
+        print(f"[FAIL] Session load is only {speedup:.1f}x faster than pd.read_csv (want {args.min_speedup:.0f}x)")
+        sys.exit(1)
+    print(f"[OK] Session load at least {args.min_speedup:.0f}x faster than pd.read_csv")
+
+
+if __name__ == "__main__":
+    main()